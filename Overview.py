@@ -1,11 +1,15 @@
-from data.db_handler import DatabaseHandler
-import data.db_handler as db
+from data.farm_cache import farm_cache
+from logging_config import configure_logging
+from view.diagnostics import show_diagnostics
 from models.farm import Farm
 from models.gender import Gender
 from models.calf import FatteningCalf, BreedingCalf
 
 import streamlit as st
 import datetime as dt
+import logging
+
+logger = logging.getLogger("view.overview")
 
 
 DB_PATH = "data/calves.sqlite"
@@ -62,11 +66,6 @@ CONFIG = {
 }
 
 
-def save(db_path, db_type, farm):
-    with DatabaseHandler(db_name=db_path, db_type=db_type) as dbh:
-        dbh.save_farm(farm)
-
-
 # -------------- SIDEBAR --------------
 def create_sidebar(farm):
     st.sidebar.header("Filter")
@@ -97,11 +96,11 @@ def create_sidebar(farm):
         else:
             raise Exception(f"Unknown calf type: {calf_type}")
 
-        farm.add_calf(new_calf)
-
-        # We have to safe the whole farm incase other calves were changed
-        # This happens when we have to set the ringworm
-        save(DB_PATH, DB_TYPE, farm)
+        # Other calves might have changed as well
+        # This happens when we have to set the ringworm.
+        # Only the calves which have been added, changed or deleted are written.
+        with farm_cache.edit_farm(DB_PATH, DB_TYPE) as farm:
+            farm.add_calf(new_calf)
         st.rerun()
 
 
@@ -130,7 +129,7 @@ def main(farm: Farm) -> Farm:
     # st.write(st.session_state["st_edited_calf_data"])
 
     st_edited_rows = st.session_state["st_edited_calf_data"]["edited_rows"]
-    print(f"st_edited_rows: {st_edited_rows}")
+    logger.debug("st_edited_rows: %s", st_edited_rows)
     delete_rows = []
     edited_rows = []
 
@@ -172,185 +171,185 @@ def main(farm: Farm) -> Farm:
                         continue
                     edited_rows.append(row_number)
 
-    print(f"delete_rows: {delete_rows}")
-    print(f"edited_rows: {edited_rows}")
+    logger.debug("delete_rows: %s", delete_rows)
+    logger.debug("edited_rows: %s", edited_rows)
 
     if len(delete_rows) > 0 or len(edited_rows) > 0:
         if st.button("Submit"):
-            delete_ear_tags = []
-            edited_eartags = []
-
-            if len(delete_rows) > 0:
-                for row in delete_rows:
-                    ear_tag = displayed_data[row][1]
-                    delete_ear_tags.append(ear_tag)
-
-                print(f"Delete calves: {delete_ear_tags}")
-                farm.delete_calves(delete_ear_tags)
-
-            if len(edited_rows) > 0:
-                for row in edited_rows:
-                    ear_tag = displayed_data[row][1]
-
-                    edited_cells = st_edited_rows[row].copy()
-
-                    # There might be a case where the user edits a cell, and then edits it back to the original value
-                    # While he also edited another cell
-                    for key, value in st_edited_rows[row].items():
-                        if str(value) == str(displayed_data[row][int(key)]):
-                            del edited_cells[key]
-
-                    if "0" in edited_cells:
-                        del edited_cells["0"]
-
-                    print(f"Edit calf: {ear_tag} - {edited_cells}")
-                    for key, value in edited_cells.items():
-                        calf = farm.get_calf(ear_tag)
-                        print(f"Edit calf: {ear_tag} - {key} - {value}")
-
-                        # TODO: Check if I can use a match statement here
-                        #       It might be a problem that we need to edit the calf in a certain order
-                        if key == "2":
-                            # Calf type changed
-                            # We need to delete the calf and add it again with the new type
-                            # This needs to be done first, because we need to retrieve the old calf
-                            print(f"Delete calf: {farm.get_calf(ear_tag)}")
-                            # Before we delete the calf, we need to retrieve all available treatments
-                            farm.delete_calf(ear_tag, set_ringworm=False)
-                            if value == "breeding":
-                                new_calf = BreedingCalf(
-                                    displayed_data[row][3],
-                                    displayed_data[row][4],
-                                    ear_tag,
-                                    displayed_data[row][5],
-                                )
-
-                            elif value == "fattening":
-                                new_calf = FatteningCalf(
-                                    displayed_data[row][3],
-                                    displayed_data[row][4],
-                                    ear_tag,
-                                    displayed_data[row][5],
-                                )
-
-                            else:
-                                raise Exception(f"Unknown calf type: {value}")
-
-                            new_calf.birth = calf.birth
-                            new_calf.bovalto_1 = calf.bovalto_1
-                            new_calf.dehorn = calf.dehorn
-                            new_calf.restall = calf.restall
-
-                            print(f"Add calf: {new_calf}")
-                            farm.add_calf(new_calf)
-
-                        elif key == "1":
-                            # Ear tag changes
-                            calf.change_ear_tag(value)
-
-                        elif key == "3":
-                            date = dt.datetime.strptime(value, "%Y-%m-%d").date()
-                            calf.edit_birth(date)
-                        elif key == "4":
-                            calf.edit_gender(Gender.from_string(value))
-                        elif key == "5":
-                            calf.reset_dehorn(displayed_data[row][7], value)
-                        elif key == "6":
-                            date = dt.datetime.strptime(value, "%Y-%m-%d").date()
-                            calf.edit_bovalto1(date)
-                        elif key == "7":
-                            if value is not None:
+            # Other sessions wait until the changes are saved
+            with farm_cache.edit_farm(DB_PATH, DB_TYPE) as farm:
+                delete_ear_tags = []
+                edited_eartags = []
+
+                if len(delete_rows) > 0:
+                    for row in delete_rows:
+                        ear_tag = displayed_data[row][1]
+                        delete_ear_tags.append(ear_tag)
+
+                    logger.debug("Delete calves: %s", delete_ear_tags)
+                    farm.delete_calves(delete_ear_tags)
+
+                if len(edited_rows) > 0:
+                    for row in edited_rows:
+                        ear_tag = displayed_data[row][1]
+
+                        edited_cells = st_edited_rows[row].copy()
+
+                        # There might be a case where the user edits a cell, and then edits it back to the original value
+                        # While he also edited another cell
+                        for key, value in st_edited_rows[row].items():
+                            if str(value) == str(displayed_data[row][int(key)]):
+                                del edited_cells[key]
+
+                        if "0" in edited_cells:
+                            del edited_cells["0"]
+
+                        logger.debug("Edit calf: %s - %s", ear_tag, edited_cells)
+                        for key, value in edited_cells.items():
+                            calf = farm.get_calf(ear_tag)
+                            logger.debug("Edit calf: %s - %s - %s", ear_tag, key, value)
+
+                            # TODO: Check if I can use a match statement here
+                            #       It might be a problem that we need to edit the calf in a certain order
+                            if key == "2":
+                                # Calf type changed
+                                # We need to delete the calf and add it again with the new type
+                                # This needs to be done first, because we need to retrieve the old calf
+                                logger.debug("Delete calf: %s", farm.get_calf(ear_tag))
+                                # Before we delete the calf, we need to retrieve all available treatments
+                                farm.delete_calf(ear_tag, set_ringworm=False)
+                                if value == "breeding":
+                                    new_calf = BreedingCalf(
+                                        displayed_data[row][3],
+                                        displayed_data[row][4],
+                                        ear_tag,
+                                        displayed_data[row][5],
+                                    )
+
+                                elif value == "fattening":
+                                    new_calf = FatteningCalf(
+                                        displayed_data[row][3],
+                                        displayed_data[row][4],
+                                        ear_tag,
+                                        displayed_data[row][5],
+                                    )
+
+                                else:
+                                    raise Exception(f"Unknown calf type: {value}")
+
+                                new_calf.birth = calf.birth
+                                new_calf.bovalto_1 = calf.bovalto_1
+                                new_calf.dehorn = calf.dehorn
+                                new_calf.restall = calf.restall
+
+                                logger.debug("Add calf: %s", new_calf)
+                                farm.add_calf(new_calf)
+
+                            elif key == "1":
+                                # Ear tag changes
+                                farm.change_ear_tag(ear_tag, value)
+                                ear_tag = value
+
+                            elif key == "3":
                                 date = dt.datetime.strptime(value, "%Y-%m-%d").date()
-                                calf.edit_dehorn(date)
-                            else:
-                                calf.delete_dehorn()
-                        elif key == "8":
-                            if value is not None:
+                                calf.edit_birth(date)
+                            elif key == "4":
+                                calf.edit_gender(Gender.from_string(value))
+                            elif key == "5":
+                                calf.reset_dehorn(displayed_data[row][7], value)
+                            elif key == "6":
                                 date = dt.datetime.strptime(value, "%Y-%m-%d").date()
-                                calf.edit_restall(date)
-                            else:
-                                st.error("Umstallen muss gesetzt werden")
-                        elif key == "9":
-                            if calf.calf_type == "fattening":
+                                calf.edit_bovalto1(date)
+                            elif key == "7":
                                 if value is not None:
-                                    date = dt.datetime.strptime(
-                                        value, "%Y-%m-%d"
-                                    ).date()
-                                    calf.edit_sell(date)
+                                    date = dt.datetime.strptime(value, "%Y-%m-%d").date()
+                                    calf.edit_dehorn(date)
                                 else:
-                                    st.error("Verkaufsdatum muss gesetzt werden")
-                            else:
-                                # Do nothing
-                                # A breeding calf cannot be sold
-                                continue
-                        elif key == "10":
-                            if calf.calf_type == "breeding":
+                                    calf.delete_dehorn()
+                            elif key == "8":
                                 if value is not None:
-                                    date = dt.datetime.strptime(
-                                        value, "%Y-%m-%d"
-                                    ).date()
-                                    calf.edit_bovalto2(date)
+                                    date = dt.datetime.strptime(value, "%Y-%m-%d").date()
+                                    calf.edit_restall(date)
                                 else:
-                                    st.error("Bovalto 2 muss gesetzt werden")
-                            else:
-                                # Do nothing
-                                # A fattening calf does not have a second bovalto
-                                continue
-                        elif key == "11":
-                            if calf.calf_type == "breeding":
-                                if value is not None:
-                                    date = dt.datetime.strptime(
-                                        value, "%Y-%m-%d"
-                                    ).date()
-                                    calf.edit_ringworm1(date)
+                                    st.error("Umstallen muss gesetzt werden")
+                            elif key == "9":
+                                if calf.calf_type == "fattening":
+                                    if value is not None:
+                                        date = dt.datetime.strptime(
+                                            value, "%Y-%m-%d"
+                                        ).date()
+                                        calf.edit_sell(date)
+                                    else:
+                                        st.error("Verkaufsdatum muss gesetzt werden")
                                 else:
-                                    calf.delete_ringworm1()
-                            else:
-                                # Do nothing
-                                # A fattening calf does not have a ringworm
-                                continue
-                        elif key == "12":
-                            if calf.calf_type == "breeding":
-                                if value is not None:
-                                    date = dt.datetime.strptime(
-                                        value, "%Y-%m-%d"
-                                    ).date()
-                                    calf.edit_ringworm2(date)
+                                    # Do nothing
+                                    # A breeding calf cannot be sold
+                                    continue
+                            elif key == "10":
+                                if calf.calf_type == "breeding":
+                                    if value is not None:
+                                        date = dt.datetime.strptime(
+                                            value, "%Y-%m-%d"
+                                        ).date()
+                                        calf.edit_bovalto2(date)
+                                    else:
+                                        st.error("Bovalto 2 muss gesetzt werden")
+                                else:
+                                    # Do nothing
+                                    # A fattening calf does not have a second bovalto
+                                    continue
+                            elif key == "11":
+                                if calf.calf_type == "breeding":
+                                    if value is not None:
+                                        date = dt.datetime.strptime(
+                                            value, "%Y-%m-%d"
+                                        ).date()
+                                        calf.edit_ringworm1(date)
+                                    else:
+                                        calf.delete_ringworm1()
+                                else:
+                                    # Do nothing
+                                    # A fattening calf does not have a ringworm
+                                    continue
+                            elif key == "12":
+                                if calf.calf_type == "breeding":
+                                    if value is not None:
+                                        date = dt.datetime.strptime(
+                                            value, "%Y-%m-%d"
+                                        ).date()
+                                        calf.edit_ringworm2(date)
+                                    else:
+                                        calf.delete_ringworm2()
                                 else:
-                                    calf.delete_ringworm2()
-                            else:
-                                # Do nothing
-                                # A fattening calf does not have a ringworm
-                                continue
+                                    # Do nothing
+                                    # A fattening calf does not have a ringworm
+                                    continue
 
-                        print(f"Edited calf: {calf}")
+                            logger.debug("Edited calf: %s", calf)
 
-            print(f"New farm: {farm}")
+                        # The calf was edited directly, so the jobs of the farm are updated.
+                        # The ringworm treatments are kept as entered.
+                        farm.refresh_calf(ear_tag, set_ringworm=False)
+
+                logger.debug("New farm: %s", farm)
             return farm
 
     return None
 
 
 if __name__ == "__main__":
+    configure_logging()
     st.set_page_config(page_title="Kälberliste", page_icon="🐮", layout="wide")
     st.title("All Calves")
+    show_diagnostics()
 
-    calves = []
-
-    with DatabaseHandler(db_name=DB_PATH, db_type="sqlite") as dbh:
-        calves = dbh.fetch_all_calves()
-
-    farm = Farm()
-
-    # Since the data directly comes from the database,
-    # we don't need to set the ringworm
-    farm.add_calves(calves, set_ringworm=False)
+    # The farm is only loaded again if the database changed since the last run
+    farm = farm_cache.get_farm(DB_PATH, DB_TYPE)
     max_ear_tag = farm.get_max_breeding_calf_ear_tag()
 
     create_sidebar(farm)
     new_farm = main(farm)
 
+    # The changes have already been saved
     if new_farm is not None:
-        db.delete(DB_PATH)
-        save(DB_PATH, DB_TYPE, new_farm)
         st.rerun()
@@ -0,0 +1,45 @@
+"""
+Opens a DatabaseHandler for every small query, like the pages do on each rerun, and reports the time per handler.
+
+Usage: python benchmarks/bench_connections.py [number of handlers]
+"""
+import os
+import sys
+
+# This code snippet does the following:
+#     1. It adjusts the Python path to include the parent directory
+#        (which contains models and other packages).
+#        This allows Python to locate and import modules from these directories.
+#     2. Then, it imports the necessary modules from the models package.
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import tempfile
+import time
+from benchmarks.herd import generate_herd
+from data.db_handler import DatabaseHandler
+from models.farm import Farm
+
+
+def main(count: int = 2000):
+    farm = Farm()
+    farm.add_calves(generate_herd(1000), set_ringworm=False)
+    ear_tags = sorted(farm.get_all_ear_tags())
+
+    with tempfile.TemporaryDirectory() as directory:
+        db_name = os.path.join(directory, "calves.sqlite")
+
+        with DatabaseHandler(db_name=db_name, db_type="sqlite") as db:
+            db.save_farm(farm)
+
+        start = time.perf_counter()
+        for i in range(count):
+            with DatabaseHandler(db_name=db_name, db_type="sqlite") as db:
+                db.fetch_calf(ear_tags[i % len(ear_tags)])
+        total_time = time.perf_counter() - start
+
+    print(f"{count} handlers")
+    print(f"Handler with fetch_calf: {total_time / count * 1e6:.0f} µs")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 2000)
@@ -0,0 +1,52 @@
+"""
+Compares the memory of a Farm with its FarmFrame and the time to find the calves
+with jobs in a calendar week.
+
+Usage: python benchmarks/bench_farm_frame.py [number of calves]
+"""
+import os
+import sys
+
+# This code snippet does the following:
+#     1. It adjusts the Python path to include the parent directory
+#        (which contains models and other packages).
+#        This allows Python to locate and import modules from these directories.
+#     2. Then, it imports the necessary modules from the models package.
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import time
+import tracemalloc
+from benchmarks.herd import generate_herd
+from models.farm import Farm
+from models.farm_frame import FarmFrame
+
+
+def main(size: int = 10000):
+    tracemalloc.start()
+    farm = Farm()
+    farm.add_calves(generate_herd(size), set_ringworm=False)
+    farm_bytes = tracemalloc.get_traced_memory()[0]
+
+    tracemalloc.reset_peak()
+    before = tracemalloc.get_traced_memory()[0]
+    frame = FarmFrame.from_farm(farm)
+    frame_bytes = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+
+    start = time.perf_counter()
+    for calendar_week in range(1, 53):
+        farm.get_jobs_in_week(calendar_week)
+    farm_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for calendar_week in range(1, 53):
+        frame.jobs_in_week(calendar_week)
+    frame_time = time.perf_counter() - start
+
+    print(f"{size} calves")
+    print(f"Farm:      {farm_bytes / size:>8.0f} bytes per calf, 52 weeks of jobs in {farm_time:.3f} s")
+    print(f"FarmFrame: {frame_bytes / size:>8.0f} bytes per calf, 52 weeks of jobs in {frame_time:.3f} s")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 10000)
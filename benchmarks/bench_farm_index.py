@@ -0,0 +1,54 @@
+"""
+Loads synthetic herds of growing size into a Farm to show that adding,
+looking up and deleting calves grows linearly with the number of calves.
+
+Usage: python benchmarks/bench_farm_index.py [largest number of calves]
+"""
+import os
+import sys
+
+# This code snippet does the following:
+#     1. It adjusts the Python path to include the parent directory
+#        (which contains models and other packages).
+#        This allows Python to locate and import modules from these directories.
+#     2. Then, it imports the necessary modules from the models package.
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import time
+from benchmarks.herd import generate_herd
+from models.farm import Farm
+
+
+def main(max_size: int = 100000):
+    calves = generate_herd(max_size)
+
+    print(f"{'Calves':>8} {'add_calves':>12} {'per calf':>10} {'get_calf':>10} {'delete':>10}")
+    size = max_size // 8
+    while size <= max_size:
+        herd = calves[:size]
+        farm = Farm()
+
+        # Ringworm groups are not part of this benchmark
+        start = time.perf_counter()
+        farm.add_calves(herd, set_ringworm=False)
+        add_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        for calf in herd:
+            farm.get_calf(calf.ear_tag)
+        get_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        for calf in herd:
+            farm.delete_calf(calf.ear_tag, set_ringworm=False)
+        delete_time = time.perf_counter() - start
+
+        print(
+            f"{size:>8} {add_time:>10.3f} s {add_time / size * 1e6:>7.2f} us"
+            f" {get_time:>8.3f} s {delete_time:>8.3f} s"
+        )
+        size *= 2
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 100000)
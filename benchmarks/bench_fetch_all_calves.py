@@ -0,0 +1,49 @@
+"""
+Compares loading the whole herd with one fetch_calf call per ear tag against fetch_all_calves.
+
+Usage: python benchmarks/bench_fetch_all_calves.py [number of calves]
+"""
+import os
+import sys
+
+# This code snippet does the following:
+#     1. It adjusts the Python path to include the parent directory
+#        (which contains models and other packages).
+#        This allows Python to locate and import modules from these directories.
+#     2. Then, it imports the necessary modules from the models package.
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import tempfile
+import time
+from benchmarks.herd import generate_herd
+from data.db_handler import DatabaseHandler
+from models.farm import Farm
+
+
+def main(size: int = 5000):
+    farm = Farm()
+    farm.add_calves(generate_herd(size), set_ringworm=False)
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        db_path = os.path.join(tmp_dir, "bench.sqlite")
+        with DatabaseHandler(db_name=db_path, db_type="sqlite") as db:
+            db.save_farm(farm)
+
+            start = time.perf_counter()
+            per_calf = [db.fetch_calf(ear_tag) for ear_tag in sorted(farm.get_all_ear_tags())]
+            per_calf_time = time.perf_counter() - start
+
+            start = time.perf_counter()
+            bulk = db.fetch_all_calves()
+            bulk_time = time.perf_counter() - start
+
+    assert [calf.as_tuple() for calf in per_calf] == [calf.as_tuple() for calf in bulk]
+
+    print(f"Calves:            {size}")
+    print(f"fetch_calf loop:   {per_calf_time:.3f} s")
+    print(f"fetch_all_calves:  {bulk_time:.3f} s")
+    print(f"Speedup:           {per_calf_time / bulk_time:.1f}x")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 5000)
@@ -0,0 +1,61 @@
+"""
+Compares the weekly job list read with fetch_jobs to loading the whole farm first, for growing herds.
+
+Usage: python benchmarks/bench_fetch_jobs.py [number of calves ...]
+"""
+import os
+import sys
+
+# This code snippet does the following:
+#     1. It adjusts the Python path to include the parent directory
+#        (which contains models and other packages).
+#        This allows Python to locate and import modules from these directories.
+#     2. Then, it imports the necessary modules from the models package.
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import datetime as dt
+import tempfile
+import time
+from benchmarks.herd import generate_herd
+from data.db_handler import DatabaseHandler
+from models.farm import Farm
+
+
+def main(sizes: list[int]):
+    for size in sizes:
+        farm = Farm()
+        farm.add_calves(generate_herd(size), set_ringworm=False)
+
+        with tempfile.TemporaryDirectory() as directory:
+            db_name = os.path.join(directory, "calves.sqlite")
+
+            with DatabaseHandler(db_name=db_name, db_type="sqlite") as db:
+                db.save_farm(farm)
+
+                # A week in the middle of the herd's history
+                db.cursor.execute("SELECT MIN(planned), MAX(planned) FROM birth")
+                first, last = db.cursor.fetchone()
+                year, week, _ = dt.date.fromordinal(
+                    dt.date(1970, 1, 1).toordinal() + (first + last) // 2
+                ).isocalendar()
+                start_date = dt.date.fromisocalendar(year, week, 1)
+
+                start = time.perf_counter()
+                loaded_farm = Farm()
+                loaded_farm.add_calves(db.fetch_all_calves(), set_ringworm=False)
+                farm_jobs = loaded_farm.get_jobs_in_week(week, year)
+                farm_time = time.perf_counter() - start
+
+                start = time.perf_counter()
+                jobs = db.fetch_jobs(start_date, start_date + dt.timedelta(days=6))
+                fetch_time = time.perf_counter() - start
+
+        assert jobs == farm_jobs
+
+        print(f"{size} calves, {len(jobs)} jobs")
+        print(f"  Load farm + get_jobs_in_week: {farm_time * 1e3:9.1f} ms")
+        print(f"  fetch_jobs:                   {fetch_time * 1e3:9.1f} ms")
+
+
+if __name__ == "__main__":
+    main([int(size) for size in sys.argv[1:]] or [1000, 10000, 100000])
@@ -0,0 +1,74 @@
+"""
+Times the growth of the herd for weekly weigh-ins: loading the weight table, fitting the
+daily gains and the cached growth of a later page run.
+
+Usage: python benchmarks/bench_growth.py [number of calves] [weigh-ins per calf]
+"""
+import os
+import sys
+
+# This code snippet does the following:
+#     1. It adjusts the Python path to include the parent directory
+#        (which contains models and other packages).
+#        This allows Python to locate and import modules from these directories.
+#     2. Then, it imports the necessary modules from the models package.
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import datetime as dt
+import random
+import tempfile
+import time
+from benchmarks.herd import generate_herd
+from data.db_handler import DatabaseHandler, connection_pool
+from data.growth_cache import GrowthCache, load_growth
+from models.farm import Farm
+
+
+def main(size: int, weigh_ins: int):
+    random_generator = random.Random(0)
+    calves = generate_herd(size)
+    farm = Farm()
+    farm.add_calves(calves, set_ringworm=False)
+
+    with tempfile.TemporaryDirectory() as directory:
+        db_name = os.path.join(directory, "calves.sqlite")
+        with DatabaseHandler(db_name=db_name, db_type="sqlite") as db:
+            db.save_farm(farm)
+            db.save_weights(
+                (
+                    calf.ear_tag,
+                    calf.birthday + dt.timedelta(days=7 * week),
+                    40 + 7 * week + random_generator.randint(-3, 3),
+                )
+                for calf in calves
+                for week in range(weigh_ins)
+            )
+
+            start = time.perf_counter()
+            rows = db.fetch_weight_table()
+            fetch_time = time.perf_counter() - start
+
+            start = time.perf_counter()
+            growth = load_growth(db)
+            load_time = time.perf_counter() - start - fetch_time
+
+        cache = GrowthCache()
+        start = time.perf_counter()
+        cache.get_growth(db_name)
+        cache.get_sell_weights(db_name)
+        first_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        cache.get_growth(db_name)
+        cached_time = time.perf_counter() - start
+        connection_pool.forget(db_name)
+
+    print(f"{size} calves, {len(rows)} weights, median daily gain {growth.get_percentiles()[50]:.2f} kg")
+    print(f"  Read the weight table:          {fetch_time * 1e3:9.1f} ms")
+    print(f"  Arrays and fits:                {load_time * 1e3:9.1f} ms")
+    print(f"  First run with sell weights:    {first_time * 1e3:9.1f} ms")
+    print(f"  Cached run:                     {cached_time * 1e3:9.1f} ms")
+
+
+if __name__ == "__main__":
+    main(*[int(arg) for arg in sys.argv[1:3]] or [10000, 50])
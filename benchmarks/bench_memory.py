@@ -0,0 +1,39 @@
+"""
+Measures the memory per calf of the calves alone and of a Farm holding them.
+
+Usage: python benchmarks/bench_memory.py [number of calves]
+"""
+import os
+import sys
+
+# This code snippet does the following:
+#     1. It adjusts the Python path to include the parent directory
+#        (which contains models and other packages).
+#        This allows Python to locate and import modules from these directories.
+#     2. Then, it imports the necessary modules from the models package.
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import tracemalloc
+from benchmarks.herd import generate_herd
+from models.farm import Farm
+
+
+def main(size: int = 100000):
+    tracemalloc.start()
+
+    herd = generate_herd(size)
+    calves_bytes = tracemalloc.get_traced_memory()[0]
+
+    farm = Farm()
+    farm.add_calves(herd, set_ringworm=False)
+    farm_bytes = tracemalloc.get_traced_memory()[0]
+
+    tracemalloc.stop()
+
+    print(f"{size} calves")
+    print(f"Calves:            {calves_bytes / size:>8.0f} bytes per calf")
+    print(f"Calves with Farm:  {farm_bytes / size:>8.0f} bytes per calf")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 100000)
@@ -0,0 +1,60 @@
+"""
+Compares regrouping all ringworm cohorts with the incremental regrouping done by
+Farm.add_calf, Farm.edit_calf and Farm.delete_calf for a single calf.
+
+Usage: python benchmarks/bench_ringworm.py [number of calves]
+"""
+import os
+import sys
+
+# This code snippet does the following:
+#     1. It adjusts the Python path to include the parent directory
+#        (which contains models and other packages).
+#        This allows Python to locate and import modules from these directories.
+#     2. Then, it imports the necessary modules from the models package.
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import random
+import time
+from benchmarks.herd import generate_herd
+from models.calf import BreedingCalf
+from models.farm import Farm
+from models.treatment import Bovalto2
+
+ROUNDS = 100
+
+
+def main(size: int = 10000):
+    herd = [calf for calf in generate_herd(size) if isinstance(calf, BreedingCalf)]
+    farm = Farm()
+    farm.add_calves(herd[:-ROUNDS], set_ringworm=False)
+    rng = random.Random(0)
+
+    start = time.perf_counter()
+    farm.set_ringworm()
+    full_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for calf in herd[-ROUNDS:]:
+        farm.add_calf(calf)
+    add_time = (time.perf_counter() - start) / ROUNDS
+
+    start = time.perf_counter()
+    for calf in rng.sample(herd, ROUNDS):
+        farm.edit_calf(calf.ear_tag, Bovalto2, calf.bovalto_2.expected_date, True)
+    edit_time = (time.perf_counter() - start) / ROUNDS
+
+    start = time.perf_counter()
+    for calf in rng.sample(herd, ROUNDS):
+        farm.delete_calf(calf.ear_tag)
+    delete_time = (time.perf_counter() - start) / ROUNDS
+
+    print(f"{len(herd)} breeding calves")
+    print(f"set_ringworm:  {full_time * 1e3:>8.2f} ms")
+    print(f"add_calf:      {add_time * 1e3:>8.2f} ms")
+    print(f"edit_calf:     {edit_time * 1e3:>8.2f} ms")
+    print(f"delete_calf:   {delete_time * 1e3:>8.2f} ms")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 10000)
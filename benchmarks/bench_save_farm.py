@@ -0,0 +1,40 @@
+"""
+Saves a synthetic herd into a new SQLite file and reports the throughput.
+
+Usage: python benchmarks/bench_save_farm.py [number of calves]
+"""
+import os
+import sys
+
+# This code snippet does the following:
+#     1. It adjusts the Python path to include the parent directory
+#        (which contains models and other packages).
+#        This allows Python to locate and import modules from these directories.
+#     2. Then, it imports the necessary modules from the models package.
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import tempfile
+import time
+from benchmarks.herd import generate_herd
+from data.db_handler import DatabaseHandler
+from models.farm import Farm
+
+
+def main(size: int = 50000):
+    farm = Farm()
+    farm.add_calves(generate_herd(size), set_ringworm=False)
+
+    with tempfile.TemporaryDirectory() as directory:
+        db_name = os.path.join(directory, "calves.sqlite")
+
+        with DatabaseHandler(db_name=db_name, db_type="sqlite") as db:
+            start = time.perf_counter()
+            db.save_farm(farm)
+            save_time = time.perf_counter() - start
+
+    print(f"{size} calves")
+    print(f"save_farm: {save_time:.3f} s, {size / save_time:,.0f} calves/s")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 50000)
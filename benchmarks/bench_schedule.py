@@ -0,0 +1,46 @@
+"""
+Compares planning the treatments of many new calves one object at a time with
+models.schedule.calculate_schedule.
+
+Usage: python benchmarks/bench_schedule.py [number of calves]
+"""
+import os
+import sys
+
+# This code snippet does the following:
+#     1. It adjusts the Python path to include the parent directory
+#        (which contains models and other packages).
+#        This allows Python to locate and import modules from these directories.
+#     2. Then, it imports the necessary modules from the models package.
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import time
+import numpy as np
+from benchmarks.herd import generate_herd
+from models.farm_frame import CALF_TYPES
+from models.gender import Gender
+from models.schedule import calculate_schedule
+
+
+def main(size: int = 100000):
+    herd = generate_herd(size)
+    birthdays = np.array([calf.birthday for calf in herd], dtype="datetime64[D]")
+    dehorning_required = np.array([calf.dehorning_required for calf in herd])
+    calf_types = np.array([CALF_TYPES.index(type(calf)) for calf in herd])
+
+    start = time.perf_counter()
+    for calf in herd:
+        type(calf)(calf.birthday, Gender.Male, calf.ear_tag, calf.dehorning_required)
+    object_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    calculate_schedule(birthdays, dehorning_required, calf_types)
+    batch_time = time.perf_counter() - start
+
+    print(f"{size} calves")
+    print(f"Objects:            {object_time:.3f} s")
+    print(f"calculate_schedule: {batch_time:.3f} s")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 100000)
@@ -0,0 +1,56 @@
+import os
+import sys
+
+# This code snippet does the following:
+#     1. It adjusts the Python path to include the parent directory
+#        (which contains models and other packages).
+#        This allows Python to locate and import modules from these directories.
+#     2. Then, it imports the necessary modules from the models package.
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import random
+import datetime as dt
+from models.calf import FatteningCalf, BreedingCalf
+from models.gender import Gender
+
+
+def generate_herd(
+    size: int,
+    seed: int = 0,
+    fattening_ratio: float = 0.3,
+    dehorning_ratio: float = 0.8,
+    start: dt.date = dt.date(2023, 1, 2),
+    days: int = 365,
+) -> list[FatteningCalf | BreedingCalf]:
+    """
+    Generates a deterministic list of synthetic calves.
+
+    :param size: Number of calves to generate
+    :param seed: Seed of the random generator, the same seed and options always return the same herd
+    :param fattening_ratio: Share of fattening calves, the others are breeding calves
+    :param dehorning_ratio: Share of calves which need to be dehorned
+    :param start: Earliest birthday
+    :param days: Number of days over which the birthdays are spread
+    :return: list of BreedingCalf and FatteningCalf objects with unique ear tags
+    """
+    rng = random.Random(seed)
+
+    # Fattening calves are tagged above 99000 (see data/importer.py) and above all breeding calves
+    fattening_offset = max(99000, size)
+
+    calves = []
+    for i in range(size):
+        birthday = start + dt.timedelta(days=rng.randrange(days))
+        gender = rng.choice([Gender.Female, Gender.Male])
+        dehorning_required = rng.random() < dehorning_ratio
+
+        if rng.random() < fattening_ratio:
+            calf = FatteningCalf(
+                birthday, gender, fattening_offset + i + 1, dehorning_required
+            )
+        else:
+            calf = BreedingCalf(birthday, gender, i + 1, dehorning_required)
+
+        calves.append(calf)
+
+    return calves
@@ -0,0 +1,245 @@
+"""
+Times the main operations of the Farm and the DatabaseHandler for synthetic herds of several sizes.
+
+The results are written as JSON. When compared with an earlier run, the suite fails (exit code 1)
+if a scenario got slower than the tolerance allows.
+
+Usage:
+    python benchmarks/suite.py --output results.json
+    python benchmarks/suite.py --sizes 1000 10000 --compare baseline.json --tolerance 0.25
+"""
+import os
+import sys
+
+# This code snippet does the following:
+#     1. It adjusts the Python path to include the parent directory
+#        (which contains models and other packages).
+#        This allows Python to locate and import modules from these directories.
+#     2. Then, it imports the necessary modules from the models package.
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import argparse
+import contextlib
+import datetime as dt
+import json
+import platform
+import sqlite3
+import tempfile
+import time
+from typing import Callable
+from benchmarks.herd import generate_herd
+from data.db_handler import DatabaseHandler, connection_pool
+from models.calf import FatteningCalf, BreedingCalf
+from models.farm import Farm
+
+SIZES = [1000, 10000, 100000]
+
+# Slowdowns smaller than this are measurement noise, not regressions
+MIN_REGRESSION_SECONDS = 0.005
+
+
+def create_farm(calves: list[FatteningCalf | BreedingCalf]) -> Farm:
+    farm = Farm()
+    farm.add_calves(calves, set_ringworm=False)
+    return farm
+
+
+@contextlib.contextmanager
+def database(calves: list[FatteningCalf | BreedingCalf] | None = None):
+    # A new database file, with the calves if given
+    with tempfile.TemporaryDirectory() as directory:
+        db_name = os.path.join(directory, "calves.sqlite")
+        with DatabaseHandler(db_name=db_name, db_type="sqlite") as db:
+            if calves is not None:
+                db.save_farm(create_farm(calves))
+            yield db
+
+        connection_pool.forget(db_name)
+
+
+def time_add_calves(calves: list[FatteningCalf | BreedingCalf]) -> float:
+    farm = Farm()
+    start = time.perf_counter()
+    farm.add_calves(calves, set_ringworm=False)
+    return time.perf_counter() - start
+
+
+def time_set_ringworm(calves: list[FatteningCalf | BreedingCalf]) -> float:
+    farm = create_farm(calves)
+    start = time.perf_counter()
+    farm.set_ringworm()
+    return time.perf_counter() - start
+
+
+def time_get_jobs_in_week(calves: list[FatteningCalf | BreedingCalf]) -> float:
+    # Average of all weeks in which the herd was born
+    farm = create_farm(calves)
+    weeks = sorted({calf.birthday.isocalendar()[:2] for calf in calves})
+    start = time.perf_counter()
+    for year, week in weeks:
+        farm.get_jobs_in_week(week, year)
+    return (time.perf_counter() - start) / len(weeks)
+
+
+def time_get_calves_as_tuple(calves: list[FatteningCalf | BreedingCalf]) -> float:
+    farm = create_farm(calves)
+    start = time.perf_counter()
+    farm.get_calves_as_tuple()
+    return time.perf_counter() - start
+
+
+def time_save_farm(calves: list[FatteningCalf | BreedingCalf]) -> float:
+    farm = create_farm(calves)
+    with database() as db:
+        start = time.perf_counter()
+        db.save_farm(farm)
+        return time.perf_counter() - start
+
+
+def time_fetch_all_calves(calves: list[FatteningCalf | BreedingCalf]) -> float:
+    with database(calves) as db:
+        start = time.perf_counter()
+        db.fetch_all_calves()
+        return time.perf_counter() - start
+
+
+def time_delete_calves(calves: list[FatteningCalf | BreedingCalf]) -> float:
+    # Every tenth calf leaves the farm
+    farm = create_farm(calves)
+    ear_tags = [calf.ear_tag for calf in calves[::10]]
+    start = time.perf_counter()
+    farm.delete_calves(ear_tags)
+    return time.perf_counter() - start
+
+
+# Name -> function which times the scenario for a new herd
+scenarios: dict[str, Callable[[list[FatteningCalf | BreedingCalf]], float]] = {
+    "add_calves": time_add_calves,
+    "set_ringworm": time_set_ringworm,
+    "get_jobs_in_week": time_get_jobs_in_week,
+    "get_calves_as_tuple": time_get_calves_as_tuple,
+    "save_farm": time_save_farm,
+    "fetch_all_calves": time_fetch_all_calves,
+    "delete_calves": time_delete_calves,
+}
+
+
+def run(
+    sizes: list[int],
+    scenario_names: list[str],
+    repeat: int = 3,
+    herd_options: dict | None = None,
+) -> dict:
+    """
+    Runs the scenarios for every size.
+
+    Every run gets a new herd, since the scenarios change the calves.
+    The fastest run is kept, the slower ones were disturbed by something else on the machine.
+    :param sizes: Numbers of calves
+    :param scenario_names: Names of the scenarios to run
+    :param repeat: Number of runs per scenario and size
+    :param herd_options: Keyword arguments of generate_herd
+    :return: The results, as written to the JSON file
+    """
+    herd_options = herd_options or {}
+    results = {name: {} for name in scenario_names}
+    for size in sizes:
+        for name in scenario_names:
+            times = []
+            for _ in range(repeat):
+                calves = generate_herd(size, **herd_options)
+                times.append(scenarios[name](calves))
+
+            results[name][str(size)] = min(times)
+            print(f"{name:<20} {size:>7} calves: {min(times) * 1e3:10.1f} ms")
+
+    return {
+        "created": dt.datetime.now().isoformat(timespec="seconds"),
+        "environment": {
+            "python": platform.python_version(),
+            "sqlite": sqlite3.sqlite_version,
+            "machine": platform.machine(),
+        },
+        "herd": {
+            key: str(value) if isinstance(value, dt.date) else value
+            for key, value in herd_options.items()
+        },
+        "repeat": repeat,
+        "results": results,
+    }
+
+
+def compare(baseline: dict, current: dict, tolerance: float) -> list[tuple[str, str, float, float]]:
+    """
+    Returns (scenario, size, baseline seconds, current seconds) of every scenario which got slower.
+
+    :param baseline: Results of an earlier run
+    :param current: Results of this run
+    :param tolerance: Allowed slowdown, e.g. 0.25 for 25 %
+    :return: The regressions, scenarios or sizes which only one run has are skipped
+    """
+    regressions = []
+    for name, sizes in current["results"].items():
+        for size, seconds in sizes.items():
+            baseline_seconds = baseline["results"].get(name, {}).get(size)
+            if baseline_seconds is None:
+                continue
+
+            if (
+                seconds > baseline_seconds * (1 + tolerance)
+                and seconds - baseline_seconds > MIN_REGRESSION_SECONDS
+            ):
+                regressions.append((name, size, baseline_seconds, seconds))
+
+    return regressions
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=SIZES)
+    parser.add_argument(
+        "--scenarios", nargs="+", choices=list(scenarios), default=list(scenarios)
+    )
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--fattening-ratio", type=float, default=0.3)
+    parser.add_argument("--dehorning-ratio", type=float, default=0.8)
+    parser.add_argument("--days", type=int, default=365, help="Spread of the birthdays")
+    parser.add_argument("--output", help="JSON file for the results")
+    parser.add_argument("--compare", help="JSON file of an earlier run")
+    parser.add_argument(
+        "--tolerance", type=float, default=0.25, help="Allowed slowdown, 0.25 = 25 %%"
+    )
+    args = parser.parse_args(argv)
+
+    herd_options = {
+        "seed": args.seed,
+        "fattening_ratio": args.fattening_ratio,
+        "dehorning_ratio": args.dehorning_ratio,
+        "days": args.days,
+    }
+    current = run(args.sizes, args.scenarios, args.repeat, herd_options)
+
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump(current, file, indent=2)
+
+    if args.compare:
+        with open(args.compare) as file:
+            baseline = json.load(file)
+
+        regressions = compare(baseline, current, args.tolerance)
+        for name, size, baseline_seconds, seconds in regressions:
+            print(
+                f"Regression: {name} with {size} calves took {seconds * 1e3:.1f} ms "
+                f"instead of {baseline_seconds * 1e3:.1f} ms"
+            )
+
+        if len(regressions) > 0:
+            return 1
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -8,8 +8,11 @@ import sys
 #     2. Then, it imports the necessary modules from the models package.
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
 
+import logging
 import sqlite3
+import threading
 from models.treatment import (
+    Treatment,
     Birth,
     Bovalto1,
     Dehorn,
@@ -21,91 +24,418 @@ from models.treatment import (
 )
 from models.gender import Gender
 from models.calf import BreedingCalf, FatteningCalf
+from models.protocol import PLAN
 from models.farm import Farm
+from data.query_stats import (
+    QueryStats,
+    ProfilingCursor,
+    get_query_stats,
+    profile_method,
+)
 import datetime as dt
+from typing import Iterable, Iterator
+
+
+logger = logging.getLogger(__name__)
+
+# Dates are stored as the number of days since 1970-01-01 (like numpy's datetime64[D]),
+# missing dates as NULL. In SQL, date(planned * 86400, 'unixepoch') shows a date as text.
+EPOCH_ORDINAL = dt.date(1970, 1, 1).toordinal()
+
+
+def date_to_days(date: dt.date | None) -> int | None:
+    return None if date is None else date.toordinal() - EPOCH_ORDINAL
+
 
+def days_to_date(days: int | None) -> dt.date | None:
+    return None if days is None else dt.date.fromordinal(days + EPOCH_ORDINAL)
 
-database_creation_script = f"""
--- Create the calf table
-CREATE TABLE calf (
+
+def convert_text_dates(table_name: str, columns: list[str]) -> str:
+    # Older databases stored dates as 'YYYY-MM-DD' and missing dates as the string 'None'
+    assignments = ",\n  ".join(
+        f"{column} = CASE WHEN typeof({column}) = 'text' "
+        f"THEN CAST(julianday({column}) - 2440587.5 AS INTEGER) ELSE {column} END"
+        for column in columns
+    )
+    return f"UPDATE {table_name} SET\n  {assignments};\n"
+
+
+treatment_types = [
+    Birth,
+    Bovalto1,
+    Dehorn,
+    Restall,
+    Sell,
+    Bovalto2,
+    Ringworm1,
+    Ringworm2,
+]
+treatment_table_names = [treatment.__name__.lower() for treatment in treatment_types]
+# Table name -> name of the treatment, e.g. "ringworm1" -> "Ringworm1"
+display_names = {
+    treatment.__name__.lower(): treatment.display_name for treatment in treatment_types
+}
+
+# Columns of each table. All tables refer to the calf, so deleting a calf deletes all of its rows.
+table_definitions = {
+    "calf": """
   ear_tag INTEGER PRIMARY KEY,
   gender TEXT,
-  type TEXT
-);
-
--- Create the weight table
-CREATE TABLE weight (
+  type TEXT""",
+    "weight": """
   ear_tag INTEGER,
-  date TIMESTAMP,
+  date INTEGER,
   kg INTEGER,
   PRIMARY KEY (ear_tag, date),
-  FOREIGN KEY (ear_tag) REFERENCES calf(ear_tag)
-);
-
--- Create the bovalto1 table
-CREATE TABLE {Birth.__name__.lower()} (
+  FOREIGN KEY (ear_tag) REFERENCES calf(ear_tag) ON DELETE CASCADE""",
+}
+for table_name in treatment_table_names:
+    table_definitions[table_name] = """
   ear_tag INTEGER PRIMARY KEY,
-  planned TIMESTAMP,
-  actual TIMESTAMP,
-  FOREIGN KEY (ear_tag) REFERENCES calf(ear_tag)
-);
+  planned INTEGER,
+  actual INTEGER,
+  FOREIGN KEY (ear_tag) REFERENCES calf(ear_tag) ON DELETE CASCADE"""
+
+# Indexes for date range queries, e.g. all dehorns planned for next week
+treatment_index_creation_script = "".join(
+    f"CREATE INDEX {table_name}_planned ON {table_name} (planned);\n"
+    f"CREATE INDEX {table_name}_actual ON {table_name} (actual);\n"
+    for table_name in treatment_table_names
+)
+index_creation_script = (
+    "CREATE INDEX weight_date ON weight (date);\n" + treatment_index_creation_script
+)
 
--- Create the bovalto1 table
-CREATE TABLE {Bovalto1.__name__.lower()} (
-  ear_tag INTEGER PRIMARY KEY,
-  planned TIMESTAMP,
-  actual TIMESTAMP,
-  FOREIGN KEY (ear_tag) REFERENCES calf(ear_tag)
-);
 
--- Create the dehorn table
-CREATE TABLE {Dehorn.__name__.lower()} (
-  ear_tag INTEGER PRIMARY KEY,
-  planned TIMESTAMP,
-  actual TIMESTAMP,
-  FOREIGN KEY (ear_tag) REFERENCES calf(ear_tag)
-);
+def rebuild_table(table_name: str) -> str:
+    # SQLite can't change the constraints of a table, so it's copied into a new one.
+    # Rows of calves which don't exist anymore are dropped.
+    return (
+        f"CREATE TABLE new_{table_name} ({table_definitions[table_name]}\n);\n"
+        f"INSERT INTO new_{table_name} SELECT * FROM {table_name} "
+        f"WHERE ear_tag IN (SELECT ear_tag FROM calf);\n"
+        f"DROP TABLE {table_name};\n"
+        f"ALTER TABLE new_{table_name} RENAME TO {table_name};\n"
+    )
+
+
+# Number of jobs per day and treatment, kept up to date by triggers on the treatments.
+# A job is counted at its actual date, or its planned date if it hasn't been done yet.
+workload_table_creation_script = """CREATE TABLE IF NOT EXISTS workload (
+  day INTEGER,
+  kind TEXT,
+  jobs INTEGER,
+  PRIMARY KEY (day, kind)
+) WITHOUT ROWID;
+"""
+job_table_names = [
+    table_name for table_name in treatment_table_names if table_name != Birth.__name__.lower()
+]
+
+
+def workload_triggers(table_name: str, kind: str, condition: str = "1") -> str:
+    """
+    Triggers which count the rows of a treatment table in the workload table.
+
+    :param table_name: The table of the treatments
+    :param kind: SQL of the treatment name, with {row} for new or old
+    :param condition: SQL for the rows which are jobs, with {row} for new or old
+    :return: The script
+    """
+
+    def add(row: str) -> str:
+        return (
+            f"INSERT INTO workload (day, kind, jobs) "
+            f"VALUES (coalesce({row}.actual, {row}.planned), {kind.format(row=row)}, 1) "
+            f"ON CONFLICT (day, kind) DO UPDATE SET jobs = jobs + 1;"
+        )
 
--- Create the restall table
-CREATE TABLE {Restall.__name__.lower()} (
-  ear_tag INTEGER PRIMARY KEY,
-  planned TIMESTAMP,
-  actual TIMESTAMP,
-  FOREIGN KEY (ear_tag) REFERENCES calf(ear_tag)
-);
+    def remove(row: str) -> str:
+        return (
+            f"UPDATE workload SET jobs = jobs - 1 "
+            f"WHERE day = coalesce({row}.actual, {row}.planned) AND kind = {kind.format(row=row)};"
+        )
 
--- Create the sell table
-CREATE TABLE {Sell.__name__.lower()} (
-  ear_tag INTEGER PRIMARY KEY,
-  planned TIMESTAMP,
-  actual TIMESTAMP,
-  FOREIGN KEY (ear_tag) REFERENCES calf(ear_tag)
-);
+    return (
+        f"CREATE TRIGGER IF NOT EXISTS {table_name}_workload_insert AFTER INSERT ON {table_name}\n"
+        f"WHEN {condition.format(row='new')} BEGIN {add('new')} END;\n"
+        f"CREATE TRIGGER IF NOT EXISTS {table_name}_workload_delete AFTER DELETE ON {table_name}\n"
+        f"WHEN {condition.format(row='old')} BEGIN {remove('old')} END;\n"
+        f"CREATE TRIGGER IF NOT EXISTS {table_name}_workload_update AFTER UPDATE OF planned, actual ON {table_name}\n"
+        f"WHEN {condition.format(row='new')} "
+        f"AND coalesce(old.actual, old.planned) IS NOT coalesce(new.actual, new.planned) "
+        f"BEGIN {remove('old')} {add('new')} END;\n"
+    )
+
+
+def count_workload(jobs: str) -> str:
+    # Counts all jobs again, jobs is a query for (kind, day)
+    return (
+        "DELETE FROM workload;\n"
+        f"INSERT INTO workload (day, kind, jobs) SELECT day, kind, COUNT(*) FROM ({jobs}) GROUP BY day, kind;\n"
+    )
+
+
+workload_script = (
+    workload_table_creation_script
+    + "".join(
+        workload_triggers(table_name, f"'{table_name}'") for table_name in job_table_names
+    )
+    + count_workload(
+        " UNION ALL ".join(
+            f"SELECT '{table_name}' AS kind, coalesce(actual, planned) AS day FROM {table_name}"
+            for table_name in job_table_names
+        )
+    )
+)
 
--- Create the bovalto2 table
-CREATE TABLE {Bovalto2.__name__.lower()} (
-  ear_tag INTEGER PRIMARY KEY,
-  planned TIMESTAMP,
-  actual TIMESTAMP,
-  FOREIGN KEY (ear_tag) REFERENCES calf(ear_tag)
-);
+# Scripts which update a database from one version (PRAGMA user_version) to the next
+schema_migrations = [
+    # 0 -> 1: Dates as days since 1970-01-01 instead of text
+    convert_text_dates("weight", ["date"])
+    + "".join(
+        convert_text_dates(table_name, ["planned", "actual"])
+        for table_name in treatment_table_names
+    ),
+    # 1 -> 2: ON DELETE CASCADE and indexes on the dates
+    "".join(rebuild_table(table_name) for table_name in ["weight"] + treatment_table_names)
+    + index_creation_script,
+    # 2 -> 3: Workload table, its triggers are created for the layout of the database
+    workload_table_creation_script,
+]
+SCHEMA_VERSION = len(schema_migrations)
+WORKLOAD_VERSION = 3  # Version which added the workload table
+
+database_creation_script = (
+    "".join(
+        f"-- Create the {table_name} table\n"
+        f"CREATE TABLE {table_name} ({columns}\n);\n\n"
+        for table_name, columns in table_definitions.items()
+    )
+    + index_creation_script
+    + workload_script
+    + f"\nPRAGMA user_version = {SCHEMA_VERSION};\n"
+)
 
--- Create the ringworm1 table
-CREATE TABLE {Ringworm1.__name__.lower()} (
-  ear_tag INTEGER PRIMARY KEY,
-  planned TIMESTAMP,
-  actual TIMESTAMP,
-  FOREIGN KEY (ear_tag) REFERENCES calf(ear_tag)
-);
 
--- Create the ringworm2 table
-CREATE TABLE {Ringworm2.__name__.lower()} (
-  ear_tag INTEGER PRIMARY KEY,
-  planned TIMESTAMP,
-  actual TIMESTAMP,
-  FOREIGN KEY (ear_tag) REFERENCES calf(ear_tag)
-);
-"""
+# Optional layout with all treatments in one table, kind is the name of the treatment table (e.g. 'dehorn')
+event_table_definition = """
+  ear_tag INTEGER,
+  kind TEXT,
+  planned INTEGER,
+  actual INTEGER,
+  PRIMARY KEY (ear_tag, kind),
+  FOREIGN KEY (ear_tag) REFERENCES calf(ear_tag) ON DELETE CASCADE"""
+
+event_index_creation_script = (
+    "CREATE INDEX treatment_event_planned ON treatment_event (planned);\n"
+    "CREATE INDEX treatment_event_actual ON treatment_event (actual);\n"
+)
+
+event_workload_script = (
+    workload_table_creation_script
+    + workload_triggers("treatment_event", "{row}.kind", "{row}.kind != 'birth'")
+    + count_workload(
+        "SELECT kind, coalesce(actual, planned) AS day FROM treatment_event WHERE kind != 'birth'"
+    )
+)
+
+# Treatments done between :start and :end, or planned between them and not done yet.
+# This is COALESCE(actual, planned) BETWEEN :start AND :end, written so that it can use the indexes on both columns.
+# The + keeps SQLite from looking up all treatments which aren't done yet in the index on actual.
+effective_date_condition = """(
+    {table}.actual BETWEEN :start AND :end
+    OR ({table}.planned BETWEEN :start AND :end AND +{table}.actual IS NULL)
+)"""
+
+event_database_creation_script = (
+    "".join(
+        f"-- Create the {table_name} table\n"
+        f"CREATE TABLE {table_name} ({table_definitions[table_name]}\n);\n\n"
+        for table_name in ["calf", "weight"]
+    )
+    + "-- Create the treatment_event table\n"
+    + f"CREATE TABLE treatment_event ({event_table_definition}\n);\n\n"
+    + "CREATE INDEX weight_date ON weight (date);\n"
+    + event_index_creation_script
+    + event_workload_script
+    + f"\nPRAGMA user_version = {SCHEMA_VERSION};\n"
+)
+
+# Scripts which move the treatments from one layout to the other
+tables_to_events_script = (
+    f"CREATE TABLE treatment_event ({event_table_definition}\n);\n"
+    + "".join(
+        f"INSERT INTO treatment_event SELECT ear_tag, '{table_name}', planned, actual FROM {table_name};\n"
+        f"DROP TABLE {table_name};\n"
+        for table_name in treatment_table_names
+    )
+    + event_index_creation_script
+    + event_workload_script
+)
+events_to_tables_script = (
+    "".join(
+        f"CREATE TABLE {table_name} ({table_definitions[table_name]}\n);\n"
+        f"INSERT INTO {table_name} SELECT ear_tag, planned, actual FROM treatment_event "
+        f"WHERE kind = '{table_name}';\n"
+        for table_name in treatment_table_names
+    )
+    + "DROP TABLE treatment_event;\n"
+    + treatment_index_creation_script
+    + workload_script
+)
+
+
+def is_file_path(db_name: str) -> bool:
+    # In-memory databases and URIs (e.g. "file:calves.sqlite?mode=ro") are passed to SQLite as they are
+    return db_name != ":memory:" and not db_name.startswith("file:")
+
+
+def get_database_path(db_name: str) -> str:
+    return os.path.abspath(db_name) if is_file_path(db_name) else db_name
+
+
+# Number of writes to each database file by this process (see data/farm_cache.py)
+_write_counts: dict[str, int] = {}
+
+
+def get_write_count(db_name: str) -> int:
+    return _write_counts.get(get_database_path(db_name), 0)
+
+
+# PRAGMAs set on every connection to a database file.
+# In WAL mode, readers don't block the writer and the writer doesn't block readers.
+SQLITE_PRAGMAS = {
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",  # Safe in WAL mode, a power loss can only lose the last commits
+    "cache_size": -16000,  # Negative values are KiB, i.e. 16 MB
+    "mmap_size": 64 * 1024 * 1024,
+    "temp_store": "MEMORY",
+}
+
+
+class ConnectionPool:
+    """
+    Keeps one open connection per thread and database file, so a connection is reused by all
+    DatabaseHandlers of a thread instead of being opened for every one of them.
+
+    A connection is opened again if its database file was deleted or replaced.
+    The connections of a thread are closed when the thread ends.
+    """
+
+    _local: threading.local
+    _checked_schemas: dict[tuple[str, int, int], str]  # (path, device, inode) -> layout of up-to-date databases
+    _lock: threading.Lock
+
+    def __init__(self):
+        self._local = threading.local()
+        self._checked_schemas = {}
+        self._lock = threading.Lock()
+
+    def __get_connections(self) -> dict:
+        # path -> (connection, (device, inode), pragmas)
+        if not hasattr(self._local, "connections"):
+            self._local.connections = {}
+
+        return self._local.connections
+
+    def get_connection(self, db_name: str, pragmas: dict) -> sqlite3.Connection:
+        """
+        Returns the connection of this thread to a database file, opening it if necessary.
+
+        ":memory:" and "file:" URIs are not pooled, each call opens a new connection,
+        so every handler of an in-memory database gets its own database.
+        :param db_name: Path of the database file, ":memory:" or a "file:" URI
+        :param pragmas: PRAGMAs to set on the connection
+        :return: The connection
+        """
+        if not is_file_path(db_name):
+            connection = sqlite3.connect(db_name, uri=db_name.startswith("file:"))
+            apply_pragmas(connection, pragmas)
+            return connection
+
+        key = get_database_path(db_name)
+        connections = self.__get_connections()
+        if key in connections:
+            connection, file_id, applied_pragmas = connections[key]
+            if get_file_id(key) == file_id:
+                if applied_pragmas != pragmas:
+                    apply_pragmas(connection, pragmas)
+                    connections[key] = (connection, file_id, dict(pragmas))
+                return connection
+
+            # The file was deleted or replaced
+            connection.close()
+            del connections[key]
+
+        connection = sqlite3.connect(key, uri=key.startswith("file:"))
+        apply_pragmas(connection, pragmas)
+        connections[key] = (connection, get_file_id(key), dict(pragmas))
+        return connection
+
+    def release(self, connection: sqlite3.Connection):
+        # The connection stays open for the next handler, but without an open transaction
+        if connection.in_transaction:
+            connection.rollback()
+
+    def get_checked_layout(self, db_name: str) -> str | None:
+        # The layout of the treatments, or None if the schema wasn't checked yet
+        key = (get_database_path(db_name),) + get_file_id(db_name)
+        with self._lock:
+            return self._checked_schemas.get(key)
+
+    def set_schema_checked(self, db_name: str, layout: str):
+        # Every handler has its own in-memory database, so its schema is always checked
+        if not is_file_path(db_name):
+            return
+
+        key = (get_database_path(db_name),) + get_file_id(db_name)
+        with self._lock:
+            self._checked_schemas[key] = layout
+
+    def forget(self, db_name: str):
+        """
+        Closes the connection of this thread to a database file and checks its schema again on the next
+        connection. A deleted file's inode can be reused by the next file at the same path.
+        """
+        self.close(db_name)
+        key = get_database_path(db_name)
+        with self._lock:
+            self._checked_schemas = {
+                checked: layout
+                for checked, layout in self._checked_schemas.items()
+                if checked[0] != key
+            }
+
+    def close(self, db_name: str | None = None):
+        """
+        Closes the connections of this thread to a database file, or to all files if db_name is None.
+        """
+        connections = self.__get_connections()
+        keys = list(connections) if db_name is None else [get_database_path(db_name)]
+        for key in keys:
+            if key in connections:
+                connections.pop(key)[0].close()
+
+
+def get_file_id(path: str) -> tuple[int, int]:
+    if not is_file_path(path):
+        return 0, 0
+
+    try:
+        stat = os.stat(path)
+        return stat.st_dev, stat.st_ino
+    except FileNotFoundError:
+        return 0, 0
+
+
+def apply_pragmas(connection: sqlite3.Connection, pragmas: dict):
+    for name, value in pragmas.items():
+        connection.execute(f"PRAGMA {name} = {value}")
+
+
+connection_pool = ConnectionPool()
 
 
 def create_database():
@@ -123,69 +453,507 @@ def create_database():
 
 def delete(database_file):
     if os.path.exists(database_file):
+        connection_pool.forget(database_file)
         os.remove(database_file)
-        print(f"{database_file} has been deleted.")
+        for suffix in ["-wal", "-shm"]:
+            if os.path.exists(database_file + suffix):
+                os.remove(database_file + suffix)
+        logger.info("%s has been deleted.", database_file)
     else:
-        print(f"{database_file} does not exist.")
+        logger.info("%s does not exist.", database_file)
+
+
+class WriteBatch:
+    """
+    Rows to write to the database, grouped per table.
+    """
+
+    deleted_rows: dict[str, list[int]]  # table -> ear tags
+    renamed_calves: list[tuple[int, int]]  # (stored ear_tag, new ear_tag)
+    calves: list[tuple[int, str, str]]  # (ear_tag, gender, type)
+    treatments: dict[str, list[tuple[int, int, int | None]]]  # table -> (ear_tag, planned, actual)
+    weights: list[tuple[int, int, int]]  # (ear_tag, date, kg)
+
+    def __init__(self):
+        self.deleted_rows = {}
+        self.renamed_calves = []
+        self.calves = []
+        self.treatments = {table_name: [] for table_name in treatment_table_names}
+        self.weights = []
+
+    def __len__(self):
+        return (
+            sum(len(ear_tags) for ear_tags in self.deleted_rows.values())
+            + len(self.renamed_calves)
+            + len(self.calves)
+            + sum(len(rows) for rows in self.treatments.values())
+            + len(self.weights)
+        )
+
+    def __delete_row(self, table_name: str, ear_tag: int):
+        self.deleted_rows.setdefault(table_name, []).append(ear_tag)
+
+    def add_calf(self, calf: BreedingCalf | FatteningCalf):
+        # The calf and all of its treatments
+        if calf.calf_type not in ["breeding", "fattening"]:
+            raise ValueError("Invalid calf type")
+
+        self.calves.append((calf.ear_tag, str(calf.gender), calf.calf_type))
+        for treatment in [calf.birth] + calf.treatments:
+            if treatment is not None:
+                self.add_treatment(calf.ear_tag, treatment)
+
+    def add_treatment(self, ear_tag: int, treatment: Treatment):
+        self.treatments[treatment.name].append(
+            (
+                ear_tag,
+                date_to_days(treatment.expected_date),
+                date_to_days(treatment.actual_date),
+            )
+        )
+
+    def add_weight(self, ear_tag: int, date: dt.date, weight: int):
+        self.weights.append((ear_tag, date_to_days(date), weight))
+
+    def delete_weights(self, ear_tag: int):
+        # All weights of the calf, the weights added to the batch are written afterwards
+        self.__delete_row("weight", ear_tag)
+
+    def delete_missing_treatments(self, calf: BreedingCalf | FatteningCalf):
+        # Remove the entries of treatments the calf doesn't have (anymore), e.g. a deleted dehorning
+        existing_tables = [
+            treatment.name
+            for treatment in [calf.birth] + calf.treatments
+            if treatment is not None
+        ]
+
+        for table_name in treatment_table_names:
+            if table_name not in existing_tables:
+                self.__delete_row(table_name, calf.ear_tag)
+
+    def delete_calf(self, ear_tag: int):
+        # The weights and treatments are deleted with the calf (ON DELETE CASCADE)
+        self.__delete_row("calf", ear_tag)
+
+    def rename_calf(self, stored_ear_tag: int, new_ear_tag: int):
+        # The ear tag of the calf, its weights and its treatments are changed in place
+        self.renamed_calves.append((stored_ear_tag, new_ear_tag))
+
+
+class TreatmentTables:
+    """
+    Stores the treatments in one table per treatment (birth, bovalto1, ...). This is the default layout.
+    """
+
+    layout = "tables"
+    table_names = treatment_table_names
+    creation_script = database_creation_script
+    conversion_script = events_to_tables_script  # From the other layout
+    workload_script = workload_script
+
+    def delete_treatments(self, cursor: sqlite3.Cursor, kind: str, ear_tags: list[int]):
+        cursor.executemany(
+            f"DELETE FROM {kind} WHERE ear_tag = ?",
+            [(ear_tag,) for ear_tag in ear_tags],
+        )
+
+    def save_treatments(
+        self, cursor: sqlite3.Cursor, kind: str, rows: list[tuple[int, int, int | None]]
+    ):
+        cursor.executemany(
+            f"""
+            INSERT INTO {kind} (ear_tag, planned, actual) VALUES (?, ?, ?)
+            ON CONFLICT (ear_tag) DO UPDATE SET planned = excluded.planned, actual = excluded.actual
+            """,
+            rows,
+        )
+
+    def select_calves(self, ear_tag: int | None = None) -> tuple[str, tuple]:
+        """
+        Query for calves with (planned, actual) of every treatment table, in the order of treatment_table_names.
+
+        A missing treatment (e.g. no dehorning) results in NULL for both of its columns.
+        :param ear_tag: Only select this calf, or all calves if None
+        :return: The query and its parameters
+        """
+        columns = ", ".join(
+            f"{table_name}.planned, {table_name}.actual"
+            for table_name in self.table_names
+        )
+        joins = "\n".join(
+            f"LEFT JOIN {table_name} ON {table_name}.ear_tag = calf.ear_tag"
+            for table_name in self.table_names
+        )
+        where, parameters = ("WHERE calf.ear_tag = ?", (ear_tag,)) if ear_tag is not None else ("", ())
+        query = f"""
+            SELECT calf.ear_tag, calf.gender, calf.type, {columns}
+            FROM calf
+            {joins}
+            {where}
+            ORDER BY calf.ear_tag
+        """
+        return query, parameters
+
+    def select_jobs(self) -> str:
+        """
+        Query for (ear tag, kind, planned, calf type, planned birth) of the treatments between :start and :end.
+        """
+        jobs = "\n            UNION ALL\n".join(
+            f"SELECT ear_tag, '{table_name}' AS kind, planned FROM {table_name} "
+            f"WHERE {effective_date_condition.format(table=table_name)}"
+            for table_name in self.table_names
+            if table_name != Birth.__name__.lower()
+        )
+        return f"""
+            SELECT jobs.ear_tag, jobs.kind, jobs.planned, calf.type, birth.planned
+            FROM ({jobs}) AS jobs
+            JOIN calf ON calf.ear_tag = jobs.ear_tag
+            JOIN birth ON birth.ear_tag = jobs.ear_tag
+        """
+
+    def select_births(self) -> str:
+        """
+        Query for (ear tag, calf type, gender, planned birth) of all calves.
+        """
+        return """
+            SELECT calf.ear_tag, calf.type, calf.gender, birth.planned
+            FROM calf
+            JOIN birth ON birth.ear_tag = calf.ear_tag
+        """
+
+    def select_breeding_calves_by_birth(self) -> str:
+        """
+        Query for (ear tag, planned birth, planned bovalto2) of the breeding calves, ordered by birth and ear tag.
+
+        Only the :limit calves after (:birth, :ear_tag) are selected, so the calves can be read page by page.
+        """
+        return """
+            SELECT calf.ear_tag, birth.planned, bovalto2.planned
+            FROM birth
+            JOIN calf ON calf.ear_tag = birth.ear_tag
+            JOIN bovalto2 ON bovalto2.ear_tag = birth.ear_tag
+            WHERE calf.type = 'breeding' AND (birth.planned, birth.ear_tag) > (:birth, :ear_tag)
+            ORDER BY birth.planned, birth.ear_tag
+            LIMIT :limit
+        """
+
+    def select_treatment_dates(self, kind: str) -> tuple[str, tuple]:
+        """
+        Query for (ear tag, actual or else planned date) of one treatment of all calves.
+        """
+        return f"SELECT ear_tag, coalesce(actual, planned) FROM {kind}", ()
+
+    def select_previous_dates(self, kind: str, previous_kinds: tuple[str, ...]) -> str:
+        """
+        Query for (ear tag, planned, previous) of one treatment of all calves.
+
+        previous is the actual or else planned date of the first of the previous treatments which the calf has.
+        """
+        previous = ", ".join(
+            f"(SELECT coalesce(actual, planned) FROM {previous_kind} WHERE {previous_kind}.ear_tag = {kind}.ear_tag)"
+            for previous_kind in previous_kinds
+        )
+        return f"SELECT ear_tag, planned, coalesce({previous}, NULL) AS previous FROM {kind}"
+
+
+class TreatmentEvents:
+    """
+    Stores all treatments in the treatment_event table, with the name of the treatment table as kind.
+
+    Queries across all treatments (e.g. all jobs between two dates) only need one index scan.
+    """
+
+    layout = "events"
+    table_names = ["treatment_event"]
+    creation_script = event_database_creation_script
+    conversion_script = tables_to_events_script  # From the other layout
+    workload_script = event_workload_script
+
+    def delete_treatments(self, cursor: sqlite3.Cursor, kind: str, ear_tags: list[int]):
+        cursor.executemany(
+            "DELETE FROM treatment_event WHERE ear_tag = ? AND kind = ?",
+            [(ear_tag, kind) for ear_tag in ear_tags],
+        )
+
+    def save_treatments(
+        self, cursor: sqlite3.Cursor, kind: str, rows: list[tuple[int, int, int | None]]
+    ):
+        cursor.executemany(
+            """
+            INSERT INTO treatment_event (ear_tag, kind, planned, actual) VALUES (?, ?, ?, ?)
+            ON CONFLICT (ear_tag, kind) DO UPDATE SET planned = excluded.planned, actual = excluded.actual
+            """,
+            [(ear_tag, kind, planned, actual) for ear_tag, planned, actual in rows],
+        )
+
+    def select_calves(self, ear_tag: int | None = None) -> tuple[str, tuple]:
+        # Same columns as TreatmentTables.select_calves, one row per calf
+        columns = ", ".join(
+            f"MAX(CASE WHEN kind = '{table_name}' THEN planned END), "
+            f"MAX(CASE WHEN kind = '{table_name}' THEN actual END)"
+            for table_name in treatment_table_names
+        )
+        where, parameters = ("WHERE calf.ear_tag = ?", (ear_tag,)) if ear_tag is not None else ("", ())
+        query = f"""
+            SELECT calf.ear_tag, calf.gender, calf.type, {columns}
+            FROM calf
+            LEFT JOIN treatment_event ON treatment_event.ear_tag = calf.ear_tag
+            {where}
+            GROUP BY calf.ear_tag
+            ORDER BY calf.ear_tag
+        """
+        return query, parameters
+
+    def select_jobs(self) -> str:
+        # Same columns as TreatmentTables.select_jobs
+        return f"""
+            SELECT jobs.ear_tag, jobs.kind, jobs.planned, calf.type, birth.planned
+            FROM treatment_event AS jobs
+            JOIN calf ON calf.ear_tag = jobs.ear_tag
+            JOIN treatment_event AS birth ON birth.ear_tag = jobs.ear_tag AND birth.kind = 'birth'
+            WHERE jobs.kind != 'birth' AND {effective_date_condition.format(table="jobs")}
+        """
+
+    def select_births(self) -> str:
+        # Same columns as TreatmentTables.select_births
+        return """
+            SELECT calf.ear_tag, calf.type, calf.gender, birth.planned
+            FROM calf
+            JOIN treatment_event AS birth ON birth.ear_tag = calf.ear_tag AND birth.kind = 'birth'
+        """
+
+    def select_breeding_calves_by_birth(self) -> str:
+        # Same columns as TreatmentTables.select_breeding_calves_by_birth
+        return """
+            SELECT calf.ear_tag, birth.planned, bovalto2.planned
+            FROM treatment_event AS birth
+            JOIN calf ON calf.ear_tag = birth.ear_tag
+            JOIN treatment_event AS bovalto2 ON bovalto2.ear_tag = birth.ear_tag AND bovalto2.kind = 'bovalto2'
+            WHERE birth.kind = 'birth' AND calf.type = 'breeding'
+                AND (birth.planned, birth.ear_tag) > (:birth, :ear_tag)
+            ORDER BY birth.planned, birth.ear_tag
+            LIMIT :limit
+        """
+
+    def select_treatment_dates(self, kind: str) -> tuple[str, tuple]:
+        # Same columns as TreatmentTables.select_treatment_dates
+        return (
+            "SELECT ear_tag, coalesce(actual, planned) FROM treatment_event WHERE kind = ?",
+            (kind,),
+        )
+
+    def select_previous_dates(self, kind: str, previous_kinds: tuple[str, ...]) -> str:
+        # Same columns as TreatmentTables.select_previous_dates
+        previous = ", ".join(
+            f"(SELECT coalesce(actual, planned) FROM treatment_event AS previous "
+            f"WHERE previous.ear_tag = treatment.ear_tag AND previous.kind = '{previous_kind}')"
+            for previous_kind in previous_kinds
+        )
+        return (
+            f"SELECT ear_tag, planned, coalesce({previous}, NULL) AS previous "
+            f"FROM treatment_event AS treatment WHERE kind = '{kind}'"
+        )
+
+
+treatment_stores = {
+    TreatmentTables.layout: TreatmentTables(),
+    TreatmentEvents.layout: TreatmentEvents(),
+}
 
 
 class DatabaseHandler:
+    # Tables of every layout, the treatments are stored by the treatment store
     required_tables = [
         "calf",
         "weight",
-        "birth",
-        "bovalto1",
-        "dehorn",
-        "restall",
-        "sell",
-        "bovalto2",
-        "ringworm1",
-        "ringworm2",
+    ]
+    treatment_tables = treatment_table_names
+    # Public methods whose calls are recorded if the stats are turned on
+    profiled_methods = [
+        "fetch_calf",
+        "fetch_all_calves",
+        "fetch_jobs",
+        "fetch_births",
+        "fetch_workload",
+        "fetch_weekly_workload",
+        "fetch_calf_weights",
+        "save_calf",
+        "save_farm",
+        "save_changes",
+        "delete_calf",
+        "save_calf_weight",
+        "save_calf_weights",
+        "fetch_weights",
+        "fetch_latest_weights",
+        "fetch_weight_table",
+        "fetch_treatment_dates",
+        "save_weights",
     ]
 
-    def __init__(self, db_name="data/calf_data.db", db_type="sqlite"):
+    def __init__(
+        self,
+        db_name="data/calf_data.db",
+        db_type="sqlite",
+        pragmas=None,
+        layout=None,
+        stats: QueryStats | None = None,
+    ):
+        """
+        :param db_name: Path of the database file
+        :param db_type: "sqlite" for a database file, "memory" for a new in-memory database
+        :param pragmas: PRAGMAs of the connection to a database file, SQLITE_PRAGMAS by default
+        :param layout: "tables" or "events" (see TreatmentTables and TreatmentEvents), an existing
+            database is converted if it uses the other one. None keeps the layout of an existing
+            database and creates new ones with "tables".
+        :param stats: Records the statements and method calls of this handler. By default, the stats
+            of the process if they are turned on (see data/query_stats.py), otherwise nothing is recorded.
+        """
         self.db_type = db_type
         self.db_name = db_name
+        self.pragmas = SQLITE_PRAGMAS if pragmas is None else pragmas
+        self.layout = layout
+        self.stats = stats
+        self.treatment_store = treatment_stores[layout or TreatmentTables.layout]
         self.connection = None
         self.cursor = None
 
     def __enter__(self):
-        print("Connecting to database...")
+        logger.debug("Connecting to database %s...", self.db_name)
         self.connection = self.connect()
         self.cursor = self.connection.cursor()
 
+        if self.stats is None:
+            self.stats = get_query_stats()
+        if self.stats is not None:
+            self.__enable_stats()
+
         # WARNING: This creates a difference between different types of databases
         if self.db_type == "memory" or self.db_type == "sqlite":
-            # Sanity check: Check if the database is not initialized yet
-            if not self.check_all_tables_exist():
-                # Create the database
-                self.execute_query(database_creation_script)
+            # Files are only checked once per process, a new in-memory database always
+            layout = None
+            if self.db_type == "sqlite":
+                layout = connection_pool.get_checked_layout(self.db_name)
+
+            if layout is None or self.layout not in [None, layout]:
+                layout = self.check_schema()
+                if self.db_type == "sqlite":
+                    connection_pool.set_schema_checked(self.db_name, layout)
+
+            self.treatment_store = treatment_stores[layout]
 
         return self
 
+    def __enable_stats(self):
+        # Only a handler with stats uses the wrapped cursor and methods
+        self.cursor = ProfilingCursor(self.cursor, self.stats)
+        for name in self.profiled_methods:
+            setattr(self, name, profile_method(getattr(self, name), self.stats))
+
     def __exit__(self, exc_type, exc_val, exc_tb):
-        print("Closing database connection...")
+        logger.debug("Closing database connection...")
         self.close()
 
-    def check_all_tables_exist(self) -> bool:
-        all_tables_exist = True
-        existing_tables = []
+    def check_schema(self) -> str:
+        """
+        Creates the tables of a new database, or migrates an existing one and converts it to the requested layout.
+
+        :return: The layout of the treatments
+        """
+        layout = self.get_layout()
+        if layout is None:
+            # Sanity check: The database is not initialized yet
+            layout = self.layout or TreatmentTables.layout
+            self.execute_query(treatment_stores[layout].creation_script)
+        else:
+            self.migrate(layout)
+            if self.layout is not None and self.layout != layout:
+                self.convert_layout(self.layout)
+                layout = self.layout
+
+        return layout
+
+    def get_layout(self) -> str | None:
+        """
+        Returns the layout of the treatments, or None if not all tables exist.
+        """
         # Retrieve the list of tables in the database
         self.cursor.execute("SELECT name FROM sqlite_master WHERE type='table';")
-        rows = self.cursor.fetchall()
-        for row in rows:
-            existing_tables.append(row[0])
+        existing_tables = [row[0] for row in self.cursor.fetchall()]
+
+        for layout, store in treatment_stores.items():
+            required_tables = self.required_tables + store.table_names
+            if all(table in existing_tables for table in required_tables):
+                return layout
 
-        # Check if all required tables exist
-        for table in self.required_tables:
-            if table not in existing_tables:
-                all_tables_exist = False
+        return None
 
-        return all_tables_exist
+    def check_all_tables_exist(self) -> bool:
+        return self.get_layout() is not None
+
+    def convert_layout(self, layout: str):
+        """
+        Moves the treatments into the other layout, in one transaction.
+
+        :param layout: "tables" or "events"
+        :return: None
+        """
+        logger.info("Converting the treatments to the %s layout...", layout)
+        self.__count_write()
+        query = "BEGIN;\n" + treatment_stores[layout].conversion_script + "COMMIT;"
+
+        try:
+            self.cursor.executescript(query)
+        except sqlite3.Error:
+            self.connection.rollback()
+            raise
+
+        self.treatment_store = treatment_stores[layout]
+        if self.db_type == "sqlite":
+            connection_pool.set_schema_checked(self.db_name, layout)
+
+    def get_schema_version(self) -> int:
+        self.cursor.execute("PRAGMA user_version")
+        return self.cursor.fetchone()[0]
+
+    def migrate(self, layout: str = "tables"):
+        """
+        Updates the tables of an existing database to the current schema version.
+
+        All migrations run in one transaction, so a failed migration leaves the database unchanged.
+        The migrations are written for the tables layout, the events layout is newer than all of them
+        except for the workload table.
+        :param layout: The layout of the treatments, which the workload triggers are created for
+        """
+        version = self.get_schema_version()
+        if version >= SCHEMA_VERSION:
+            return
+
+        logger.info(
+            "Migrating database from version %s to %s...", version, SCHEMA_VERSION
+        )
+        self.__count_write()
+        query = "BEGIN;\n"
+        query += "".join(schema_migrations[version:])
+        if version < WORKLOAD_VERSION:
+            query += treatment_stores[layout].workload_script
+        query += f"PRAGMA user_version = {SCHEMA_VERSION};\n"
+        query += "COMMIT;"
+
+        # Tables can only be rebuilt without foreign key enforcement,
+        # which can't be changed inside a transaction
+        self.connection.execute("PRAGMA foreign_keys = OFF")
+        try:
+            self.cursor.executescript(query)
+        except sqlite3.Error:
+            self.connection.rollback()
+            raise
+        finally:
+            self.connection.execute("PRAGMA foreign_keys = ON")
 
     def connect(self) -> sqlite3.Connection:
         if self.db_type == "sqlite":
-            self.connection = sqlite3.connect(self.db_name)
+            # Reuses the connection of this thread, if there is one
+            self.connection = connection_pool.get_connection(self.db_name, self.pragmas)
             self.cursor = self.connection.cursor()
         elif self.db_type == "questdb":
             # Implement connection logic for QuestDB here
@@ -196,20 +964,33 @@ class DatabaseHandler:
         else:
             raise ValueError("Unsupported database type")
 
-        print("Connected to SQLite database")
+        # SQLite doesn't enforce foreign keys (and doesn't cascade deletes) unless asked to
+        self.connection.execute("PRAGMA foreign_keys = ON")
+        logger.debug("Connected to SQLite database")
 
         return self.connection
 
     def close(self):
-        # if self.cursor:
-        #     self.cursor.close()
+        if self.cursor:
+            # Resets unfinished queries, which would keep a read transaction open
+            self.cursor.close()
         if self.connection:
-            self.connection.close()
-            print("Database connection closed")
+            if self.db_type == "sqlite" and is_file_path(self.db_name):
+                # The pooled connection stays open
+                connection_pool.release(self.connection)
+            else:
+                self.connection.close()
+            logger.debug("Database connection closed")
+
+    def __count_write(self):
+        if self.db_type == "sqlite":
+            key = get_database_path(self.db_name)
+            _write_counts[key] = _write_counts.get(key, 0) + 1
 
     def execute_query(self, query: str):
         if self.connection:
             # Execute the SQL script
+            self.__count_write()
             self.cursor.executescript(query)
 
             # Commit changes and close connection
@@ -217,352 +998,169 @@ class DatabaseHandler:
         else:
             raise Exception("Database connection is not established")
 
-    # Functions to interact with the database can be added below
-    def __fetch_data(self, table_name: str, ear_tag: int | None = None) -> list[tuple]:
-        # if self.connection is None or self.cursor is None:
-        #     self.connect()
-
-        # Fetch data from a table
-        if ear_tag is None:
-            query = f"SELECT * FROM {table_name}"
-        else:
-            query = f"SELECT * FROM {table_name} WHERE ear_tag={ear_tag}"
-
-        self.cursor.execute(query)
-        result = self.cursor.fetchall()
-
-        return result
-
-    def __insert_treatment_data(
-        self,
-        table_name: str,
-        ear_tag: int,
-        planned: dt.date,
-        actual: dt.date | None = None,
-    ) -> str:
-        # Insert data in a table
-        query = f"""
-            INSERT OR REPLACE INTO {table_name} (ear_tag, planned, actual)
-            VALUES ({ear_tag}, '{planned}', '{actual}');
-        """
-
-        return query
+    def convert_date(self, value: int | None) -> dt.date | None:
+        return days_to_date(value)
 
     def convert_treatment_entries(self, entries: list[tuple]) -> list[tuple]:
-        # Convert the date strings to datetime.date objects
+        # Convert the stored days to datetime.date objects
         converted_entries = []
         for entry in entries:
             converted_entry = (
                 entry[0],
-                dt.datetime.strptime(entry[1], "%Y-%m-%d").date(),
-                (
-                    dt.datetime.strptime(entry[2], "%Y-%m-%d").date()
-                    if entry[2] != str(None)
-                    else None
-                ),
-            )
-            converted_entries.append(converted_entry)
-
-        return converted_entries
-
-    def __fetch_calf_data(self, ear_tag: int | None = None) -> list[tuple]:
-        # Fetch data related to a specific calf from the 'calf' table
-        retrieved_entries = self.__fetch_data("calf", ear_tag)
-
-        converted_entries = []
-        for entry in retrieved_entries:
-            converted_entry = (
-                entry[0],
-                Gender.from_str(entry[1]),
-                entry[2],
-            )
-            converted_entries.append(converted_entry)
-
-        return converted_entries
-
-    def __fetch_weight_data(
-        self, ear_tag: int | None = None
-    ) -> list[tuple[dt.date, int]]:
-        # Fetch data related to a specific calf from the 'weight' table
-        retrieved_entries = self.__fetch_data("weight", ear_tag)
-
-        # Convert the date strings to datetime.date objects
-        converted_entries = []
-        for entry in retrieved_entries:
-            converted_entry = (
-                dt.datetime.strptime(entry[1], "%Y-%m-%d").date(),
-                entry[2],
+                self.convert_date(entry[1]),
+                self.convert_date(entry[2]),
             )
             converted_entries.append(converted_entry)
 
         return converted_entries
 
-    def __fetch_birth_data(self, ear_tag: int | None = None) -> list[tuple]:
-        # Fetch data related to a specific calf from the 'birth' table
-        retrieved_entries = self.__fetch_data(Birth.__name__.lower(), ear_tag)
-
-        # Convert the date strings to datetime.date objects
-        return self.convert_treatment_entries(retrieved_entries)
-
-    def __fetch_bovalto1_data(self, ear_tag: int | None = None) -> list[tuple]:
-        # Fetch data related to a specific calf from the 'bovalto1' table
-        retrieved_entries = self.__fetch_data(Bovalto1.__name__.lower(), ear_tag)
-
-        # Convert the date strings to datetime.date objects
-        return self.convert_treatment_entries(retrieved_entries)
-
-    def __fetch_dehorn_data(self, ear_tag: int | None = None) -> list[tuple]:
-        # Fetch data related to a specific calf from the 'dehorn' table
-        retrieved_entries = self.__fetch_data(Dehorn.__name__.lower(), ear_tag)
-
-        # Convert the date strings to datetime.date objects
-        return self.convert_treatment_entries(retrieved_entries)
-
-    def __fetch_restall_data(self, ear_tag: int | None = None) -> list[tuple]:
-        # Fetch data related to a specific calf from the 'restall' table
-        retrieved_entries = self.__fetch_data(Restall.__name__.lower(), ear_tag)
-
-        # Convert the date strings to datetime.date objects
-        return self.convert_treatment_entries(retrieved_entries)
-
-    def __fetch_sell_data(self, ear_tag: int | None = None) -> list[tuple]:
-        # Fetch data related to a specific calf from the 'sell' table
-        retrieved_entries = self.__fetch_data(Sell.__name__.lower(), ear_tag)
-
-        # Convert the date strings to datetime.date objects
-        return self.convert_treatment_entries(retrieved_entries)
-
-    def __fetch_bovalto2_data(self, ear_tag: int | None = None) -> list[tuple]:
-        # Fetch data related to a specific calf from the 'bovalto2' table
-        retrieved_entries = self.__fetch_data(Bovalto2.__name__.lower(), ear_tag)
-
-        # Convert the date strings to datetime.date objects
-        return self.convert_treatment_entries(retrieved_entries)
-
-    def __fetch_ringworm1_data(self, ear_tag: int | None = None) -> list[tuple]:
-        # Fetch data related to a specific calf from the 'ringworm1' table
-        retrieved_entries = self.__fetch_data(Ringworm1.__name__.lower(), ear_tag)
-
-        # Convert the date strings to datetime.date objects
-        return self.convert_treatment_entries(retrieved_entries)
-
-    def __fetch_ringworm2_data(self, ear_tag: int | None = None) -> list[tuple]:
-        # Fetch data related to a specific calf from the 'ringworm2' table
-        retrieved_entries = self.__fetch_data(Ringworm2.__name__.lower(), ear_tag)
-
-        # Convert the date strings to datetime.date objects
-        return self.convert_treatment_entries(retrieved_entries)
-
-    def __insert_calf_data(self, ear_tag: int, gender: Gender, calf_type: str) -> str:
-        if calf_type not in ["breeding", "fattening"]:
-            raise ValueError("Invalid calf type")
-
-        query = f"""
-            INSERT OR REPLACE INTO calf (ear_tag, gender, type)
-            VALUES ({ear_tag}, '{gender}', '{calf_type}');
+    def write(self, batch: WriteBatch):
         """
+        Writes a batch in one transaction, with one prepared statement per table.
 
-        return query
-
-    def __insert_weight(self, ear_tag: int, date: dt.date, weight: int) -> str:
-        query = f"""
-            INSERT OR REPLACE INTO calf (ear_tag, date, kg)
-            VALUES ({ear_tag}, '{date}', '{weight}');
+        Existing rows are updated in place instead of being replaced, so deleting and inserting
+        a row doesn't touch anything which refers to it.
+        :param batch: The rows to write
+        :return: None
         """
+        self.write_batches([batch])
 
-        return query
-
-    def __insert_birth_data(
-        self, ear_tag: int, planned: dt.date, actual: dt.date | None = None
-    ) -> str:
-        return self.__insert_treatment_data(
-            Birth.__name__.lower(), ear_tag, planned, actual
-        )
-
-    def __insert_bovalto1_data(
-        self, ear_tag: int, planned: dt.date, actual: dt.date | None = None
-    ) -> str:
-        return self.__insert_treatment_data(
-            Bovalto1.__name__.lower(), ear_tag, planned, actual
-        )
-
-    def __insert_dehorn_data(
-        self, ear_tag: int, planned: dt.date, actual: dt.date | None = None
-    ) -> str:
-        return self.__insert_treatment_data(
-            Dehorn.__name__.lower(), ear_tag, planned, actual
-        )
-
-    def __insert_restall_data(
-        self, ear_tag: int, planned: dt.date, actual: dt.date | None = None
-    ) -> str:
-        return self.__insert_treatment_data(
-            Restall.__name__.lower(), ear_tag, planned, actual
-        )
-
-    def __insert_sell_data(
-        self, ear_tag: int, planned: dt.date, actual: dt.date | None = None
-    ) -> str:
-        return self.__insert_treatment_data(
-            Sell.__name__.lower(), ear_tag, planned, actual
-        )
-
-    def __insert_bovalto2_data(
-        self, ear_tag: int, planned: dt.date, actual: dt.date | None = None
-    ) -> str:
-        return self.__insert_treatment_data(
-            Bovalto2.__name__.lower(), ear_tag, planned, actual
-        )
+    def write_batches(self, batches: Iterable[WriteBatch]):
+        """
+        Writes batches one after the other in one transaction (see write).
 
-    def __insert_ringworm1_data(
-        self, ear_tag: int, planned: dt.date | None, actual: dt.date | None = None
-    ) -> str:
-        return self.__insert_treatment_data(
-            Ringworm1.__name__.lower(), ear_tag, planned, actual
+        The batches can be created while they are written, e.g. from the chunks of a file,
+        so only one of them is held at a time.
+        :param batches: The batches to write
+        :return: None
+        """
+        self.__count_write()
+        with self.connection:  # Commits, or rolls back if a statement fails
+            for batch in batches:
+                self.__write_rows(batch)
+
+    def __write_rows(self, batch: WriteBatch):
+        for table_name, ear_tags in batch.deleted_rows.items():
+            if table_name in treatment_table_names:
+                self.treatment_store.delete_treatments(self.cursor, table_name, ear_tags)
+            else:
+                self.cursor.executemany(
+                    f"DELETE FROM {table_name} WHERE ear_tag = ?",
+                    [(ear_tag,) for ear_tag in ear_tags],
+                )
+
+        if len(batch.renamed_calves) > 0:
+            self.__rename_calves(batch.renamed_calves)
+
+        self.cursor.executemany(
+            """
+            INSERT INTO calf (ear_tag, gender, type) VALUES (?, ?, ?)
+            ON CONFLICT (ear_tag) DO UPDATE SET gender = excluded.gender, type = excluded.type
+            """,
+            batch.calves,
         )
 
-    def __insert_ringworm2_data(
-        self, ear_tag: int, planned: dt.date | None, actual: dt.date | None = None
-    ) -> str:
-        return self.__insert_treatment_data(
-            Ringworm2.__name__.lower(), ear_tag, planned, actual
-        )
+        for table_name, rows in batch.treatments.items():
+            self.treatment_store.save_treatments(self.cursor, table_name, rows)
 
-    def __generate_breeding_calf_query(self, calf: BreedingCalf):
-        query = ""
-        query += self.__insert_calf_data(calf.ear_tag, calf.gender, calf.calf_type)
-        query += self.__insert_birth_data(
-            calf.ear_tag, calf.birth.expected_date, calf.birth.actual_date
-        )
-        query += self.__insert_bovalto1_data(
-            calf.ear_tag, calf.bovalto_1.expected_date, calf.bovalto_1.actual_date
-        )
-        if calf.dehorn:
-            query += self.__insert_dehorn_data(
-                calf.ear_tag, calf.dehorn.expected_date, calf.dehorn.actual_date
-            )
-        query += self.__insert_restall_data(
-            calf.ear_tag, calf.restall.expected_date, calf.restall.actual_date
-        )
-        query += self.__insert_bovalto2_data(
-            calf.ear_tag, calf.bovalto_2.expected_date, calf.bovalto_2.actual_date
+        self.cursor.executemany(
+            """
+            INSERT INTO weight (ear_tag, date, kg) VALUES (?, ?, ?)
+            ON CONFLICT (ear_tag, date) DO UPDATE SET kg = excluded.kg
+            """,
+            batch.weights,
         )
 
-        if calf.ringworm_1:
-            query += self.__insert_ringworm1_data(
-                calf.ear_tag, calf.ringworm_1.expected_date, calf.ringworm_1.actual_date
-            )
-
-        if calf.ringworm_2:
-            query += self.__insert_ringworm2_data(
-                calf.ear_tag, calf.ringworm_2.expected_date, calf.ringworm_2.actual_date
-            )
-
-        return query
-
-    def __generate_fattening_calf_query(self, calf: FatteningCalf):
-        query = ""
-        query += self.__insert_calf_data(calf.ear_tag, calf.gender, calf.calf_type)
-        query += self.__insert_birth_data(
-            calf.ear_tag, calf.birth.expected_date, calf.birth.actual_date
-        )
-        query += self.__insert_bovalto1_data(
-            calf.ear_tag, calf.bovalto_1.expected_date, calf.bovalto_1.actual_date
-        )
-        if calf.dehorn:
-            query += self.__insert_dehorn_data(
-                calf.ear_tag, calf.dehorn.expected_date, calf.dehorn.actual_date
-            )
-        query += self.__insert_restall_data(
-            calf.ear_tag, calf.restall.expected_date, calf.restall.actual_date
-        )
-        query += self.__insert_sell_data(
-            calf.ear_tag, calf.sell.expected_date, calf.sell.actual_date
-        )
-
-        return query
-
-    def save_calf(
-        self, calf: BreedingCalf | FatteningCalf, execute: bool = True
-    ) -> str | None:
-        query = ""
-        if isinstance(calf, BreedingCalf):
-            query += self.__generate_breeding_calf_query(calf)
-        elif isinstance(calf, FatteningCalf):
-            query += self.__generate_fattening_calf_query(calf)
-        else:
-            raise ValueError("Unsupported calf type")
-
-        if execute:
-            self.cursor.executescript(query)
-            self.connection.commit()
-            return None
-        else:
-            return query
+    def __rename_calves(self, renamed_calves: list[tuple[int, int]]):
+        # The rows refer to the calf until the end of the transaction, where the foreign keys are checked
+        self.cursor.execute("PRAGMA defer_foreign_keys = ON")
+
+        # Over a temporary negative ear tag first, so two calves can swap their ear tags
+        temporary = [(stored, -stored - 1) for stored, _ in renamed_calves]
+        final = [(-stored - 1, new) for stored, new in renamed_calves]
+        for ear_tags in [temporary, final]:
+            for table_name in ["calf", "weight"] + list(self.treatment_store.table_names):
+                self.cursor.executemany(
+                    f"UPDATE {table_name} SET ear_tag = ? WHERE ear_tag = ?",
+                    [(new, old) for old, new in ear_tags],
+                )
+
+    def save_calf(self, calf: BreedingCalf | FatteningCalf):
+        batch = WriteBatch()
+        batch.add_calf(calf)
+        self.write(batch)
 
     def save_farm(self, farm: Farm):
-        query = "BEGIN;\n"
+        batch = WriteBatch()
         for calf in farm.get_calves():
-            query += self.save_calf(calf, execute=False)
-
-        query += "COMMIT;"
-        self.cursor.executescript(query)
+            batch.add_calf(calf)
 
-        self.connection.commit()
+        self.write(batch)
 
-    def fetch_calf(self, ear_tag: int) -> BreedingCalf | FatteningCalf | None:
+    def save_changes(self, farm: Farm):
         """
-        Fetches a calf from the database and returns it as a BreedingCalf or FatteningCalf object.
+        Saves only the calves and treatments which changed since the farm was loaded or last saved.
 
-        When fetching data from the database it is supposed to be complete.
-        Hence, we will strictly use the data from the database to create the calf object.
-        :param ear_tag: The ear tag of the calf to fetch
-        :return: BreedingCalf or FatteningCalf object, and None if the ear tag is not found
+        All changes are written in one transaction. Afterwards, the farm is marked as saved.
+        :param farm: The farm to save
+        :return: None
         """
-        calf_data = self.__fetch_calf_data(ear_tag)[0]
-        if len(calf_data) == 0:
-            return None
+        batch = WriteBatch()
+        for ear_tag in farm.get_deleted_ear_tags():
+            batch.delete_calf(ear_tag)
+
+        for new_ear_tag, stored_ear_tag in farm.get_renamed_ear_tags().items():
+            batch.rename_calf(stored_ear_tag, new_ear_tag)
+
+        for calf in farm.get_changed_calves():
+            if calf.is_dirty:
+                # The calf itself changed, so all of its entries are rewritten
+                batch.add_calf(calf)
+                batch.delete_missing_treatments(calf)
+            else:
+                for treatment in calf.get_dirty_treatments():
+                    batch.add_treatment(calf.ear_tag, treatment)
 
-        birth_data = self.__fetch_birth_data(ear_tag)[0]
-        bovalto1_data = self.__fetch_bovalto1_data(ear_tag)[0]
-        dehorn_data = self.__fetch_dehorn_data(ear_tag)  # Might be empty
-        restall_data = self.__fetch_restall_data(ear_tag)[0]
+        self.write(batch)
 
-        gender = calf_data[1]
-        calf_type = calf_data[2]
+        farm.mark_clean()
 
-        birth_planned = birth_data[1]
-        birth_actual = birth_data[2]
+    def __create_calf(
+        self,
+        ear_tag: int,
+        gender: Gender,
+        calf_type: str,
+        treatment_data: dict[str, tuple[dt.date, dt.date | None]],
+    ) -> BreedingCalf | FatteningCalf:
+        """
+        Creates a BreedingCalf or FatteningCalf object from the stored treatment dates.
+
+        :param ear_tag: The ear tag of the calf
+        :param gender: The gender of the calf
+        :param calf_type: Either "breeding" or "fattening"
+        :param treatment_data: (planned, actual) per treatment table, tables without an entry are missing
+        :return: BreedingCalf or FatteningCalf object
+        """
+        birth_planned, birth_actual = treatment_data[Birth.__name__.lower()]
         birth = Birth(birth_planned)
         birth.reset(birth_planned, birth_actual)
 
-        bovalto1_planned = bovalto1_data[1]
-        bovalto1_actual = bovalto1_data[2]
         bovalto1 = Bovalto1(birth)
-        bovalto1.reset(bovalto1_planned, bovalto1_actual)
-
-        restall_planned = restall_data[1]
-        restall_actual = restall_data[2]
+        bovalto1.reset(*treatment_data[Bovalto1.__name__.lower()])
 
-        if len(dehorn_data) > 0:
-            dehorn_data = dehorn_data[0]
-            dehorn_planned = dehorn_data[1]
-            dehorn_actual = dehorn_data[2]
+        dehorn_data = treatment_data.get(Dehorn.__name__.lower())  # Might be missing
+        if dehorn_data is not None:
             dehorning_required = True
             dehorn = Dehorn(bovalto1)
-            dehorn.reset(dehorn_planned, dehorn_actual)
+            dehorn.reset(*dehorn_data)
 
             restall = Restall(dehorn)
-            restall.reset(restall_planned, restall_actual)
         else:
-            dehorn_planned = None
-            dehorn_actual = None
             dehorning_required = False
-
             dehorn = None
 
             restall = Restall(bovalto1)
-            restall.reset(restall_planned, restall_actual)
+        restall.reset(*treatment_data[Restall.__name__.lower()])
 
         if calf_type == "breeding":
             calf = BreedingCalf(
@@ -572,35 +1170,22 @@ class DatabaseHandler:
                 dehorning_required,
             )
 
-            bovalto2_data = self.__fetch_bovalto2_data(ear_tag)[0]
-            ringworm1_data = self.__fetch_ringworm1_data(ear_tag)  # Might be empty
-            ringworm2_data = self.__fetch_ringworm2_data(ear_tag)  # Might be empty
-
-            bovalto2_planned = bovalto2_data[1]
-            bovalto2_actual = bovalto2_data[2]
             bovalto2 = Bovalto2(bovalto1)
-            bovalto2.reset(bovalto2_planned, bovalto2_actual)
+            bovalto2.reset(*treatment_data[Bovalto2.__name__.lower()])
 
-            if len(ringworm1_data) > 0:
-                ringworm1_data = ringworm1_data[0]
-                ringworm1_planned = ringworm1_data[1]
-                ringworm1_actual = ringworm1_data[2]
+            # Ringworm treatments are only set for calves in a group of five or more
+            ringworm1_data = treatment_data.get(Ringworm1.__name__.lower())
+            if ringworm1_data is not None:
                 ringworm1 = Ringworm1(bovalto2)
-                ringworm1.reset(ringworm1_planned, ringworm1_actual)
+                ringworm1.reset(*ringworm1_data)
             else:
-                ringworm1_planned = None
-                ringworm1_actual = None
                 ringworm1 = None
 
-            if len(ringworm2_data) > 0:
-                ringworm2_data = ringworm2_data[0]
-                ringworm2_planned = ringworm2_data[1]
-                ringworm2_actual = ringworm2_data[2]
+            ringworm2_data = treatment_data.get(Ringworm2.__name__.lower())
+            if ringworm2_data is not None:
                 ringworm2 = Ringworm2(ringworm1)
-                ringworm2.reset(ringworm2_planned, ringworm2_actual)
+                ringworm2.reset(*ringworm2_data)
             else:
-                ringworm2_planned = None
-                ringworm2_actual = None
                 ringworm2 = None
 
             calf.reset(birth, bovalto1, dehorn, restall, bovalto2, ringworm1, ringworm2)
@@ -613,88 +1198,373 @@ class DatabaseHandler:
                 dehorning_required,
             )
 
-            sell_data = self.__fetch_sell_data(ear_tag)[0]
-            sell_planned = sell_data[1]
-            sell_actual = sell_data[2]
-
             sell = Sell(calf.birth)
-            sell.reset(sell_planned, sell_actual)
+            sell.reset(*treatment_data[Sell.__name__.lower()])
 
             calf.reset(birth, bovalto1, dehorn, restall, sell)
 
         else:
             raise ValueError("Unsupported calf type")
 
-        # TODO: Implement the weight of a calf
-        # Fetch weight data
-        # weight_data = self.fetch_weight_data(ear_tag)
-        # for entry in weight_data:
-        #     calf.add_weight(entry[1], entry[2])
+        # The calf is exactly what is stored in the database
+        calf.mark_clean()
 
         return calf
 
+    def fetch_calf(self, ear_tag: int) -> BreedingCalf | FatteningCalf | None:
+        """
+        Fetches a calf from the database and returns it as a BreedingCalf or FatteningCalf object.
+
+        When fetching data from the database it is supposed to be complete.
+        Hence, we will strictly use the data from the database to create the calf object.
+        :param ear_tag: The ear tag of the calf to fetch
+        :return: BreedingCalf or FatteningCalf object, and None if the ear tag is not found
+        """
+        rows = self.__fetch_calf_rows(ear_tag)
+        if len(rows) == 0:
+            return None
+
+        return self.__create_calf_from_row(rows[0])
+
+    def __fetch_calf_rows(self, ear_tag: int | None = None) -> list[tuple]:
+        # The calves with all of their treatments, one query for the whole herd
+        query, parameters = self.treatment_store.select_calves(ear_tag)
+        self.cursor.execute(query, parameters)
+        return self.cursor.fetchall()
+
+    def __create_calf_from_row(self, row: tuple) -> BreedingCalf | FatteningCalf:
+        ear_tag, gender, calf_type = row[0], Gender.from_str(row[1]), row[2]
+
+        treatment_data = {}
+        for i, table_name in enumerate(self.treatment_tables):
+            planned, actual = row[3 + 2 * i], row[4 + 2 * i]
+            if planned is None:
+                # The calf has no entry in this table
+                continue
+
+            treatment_data[table_name] = (
+                self.convert_date(planned),
+                self.convert_date(actual),
+            )
+
+        return self.__create_calf(ear_tag, gender, calf_type, treatment_data)
+
     def fetch_all_calves(self) -> list[BreedingCalf | FatteningCalf]:
         """
         Fetches all calves from the database and returns them as a list of BreedingCalf and FatteningCalf objects.
 
         When fetching data from the database it is supposed to be complete.
         Hence, we will strictly use the data from the database to create the calf object.
+        All tables are read in a single query instead of one query per calf and table.
         :return: list of BreedingCalf and FatteningCalf objects
         """
-        calves = []
-        calf_data = self.__fetch_calf_data()
-        for calf in calf_data:
-            ear_tag = calf[0]
-            calf = self.fetch_calf(ear_tag)
-            calves.append(calf)
+        return [self.__create_calf_from_row(row) for row in self.__fetch_calf_rows()]
+
+    def fetch_jobs(
+        self, start_date: dt.date, end_date: dt.date
+    ) -> list[tuple[int, str, dt.date]]:
+        """
+        Returns (ear tag, treatment, expected date) for all treatments between two dates, like Farm.get_jobs_in_week.
+
+        A treatment is found by its actual date, or its expected date if it hasn't been done yet.
+        Only the treatments in the date range are read, not the whole farm.
+        Breeding calves come first, ordered by birth, then fattening calves, ordered by ear tag.
+        :param start_date: First day of the range
+        :param end_date: Last day of the range (inclusive)
+        :return: list of jobs
+        """
+        self.cursor.execute(
+            self.treatment_store.select_jobs(),
+            {"start": date_to_days(start_date), "end": date_to_days(end_date)},
+        )
+        rows = self.cursor.fetchall()
+
+        # The treatments of a calf are ordered like calf.treatments
+        positions = {table_name: i for i, table_name in enumerate(treatment_table_names)}
+        rows.sort(
+            key=lambda row: (
+                row[3] == "fattening",
+                row[4] if row[3] == "breeding" else 0,
+                row[0],
+                positions[row[1]],
+            )
+        )
 
-        return calves
+        return [
+            (ear_tag, display_names[kind], self.convert_date(planned))
+            for ear_tag, kind, planned, _, _ in rows
+        ]
 
-    def delete_calf(self, ear_tag: int):
-        query = f"""
-            DELETE FROM calf WHERE ear_tag = {ear_tag};
-            DELETE FROM weight WHERE ear_tag = {ear_tag};
-            DELETE FROM {Birth.__name__.lower()} WHERE ear_tag = {ear_tag};
-            DELETE FROM {Bovalto1.__name__.lower()} WHERE ear_tag = {ear_tag};
-            DELETE FROM {Dehorn.__name__.lower()} WHERE ear_tag = {ear_tag};
-            DELETE FROM {Restall.__name__.lower()} WHERE ear_tag = {ear_tag};
-            DELETE FROM {Sell.__name__.lower()} WHERE ear_tag = {ear_tag};
-            DELETE FROM {Bovalto2.__name__.lower()} WHERE ear_tag = {ear_tag};
-            DELETE FROM {Ringworm1.__name__.lower()} WHERE ear_tag = {ear_tag};
-            DELETE FROM {Ringworm2.__name__.lower()} WHERE ear_tag = {ear_tag};
+    def fetch_workload(
+        self, start_date: dt.date, end_date: dt.date
+    ) -> list[tuple[dt.date, str, int]]:
+        """
+        Returns the number of jobs per day and treatment between two dates, from the workload table.
+
+        :param start_date: First day of the range
+        :param end_date: Last day of the range (inclusive)
+        :return: list of (day, treatment, jobs), ordered by day and treatment
+        """
+        self.cursor.execute(
+            """
+            SELECT day, kind, jobs FROM workload
+            WHERE day BETWEEN ? AND ? AND jobs > 0
+            ORDER BY day, kind
+            """,
+            (date_to_days(start_date), date_to_days(end_date)),
+        )
+        return [
+            (self.convert_date(day), display_names[kind], jobs)
+            for day, kind, jobs in self.cursor.fetchall()
+        ]
+
+    def fetch_weekly_workload(
+        self, start_date: dt.date, weeks: int
+    ) -> list[tuple[dt.date, str, int]]:
+        """
+        Returns the number of jobs per ISO week and treatment, from the workload table.
+
+        :param start_date: A day of the first week
+        :param weeks: Number of weeks
+        :return: list of (Monday of the week, treatment, jobs), ordered by week and treatment
+        """
+        monday = start_date - dt.timedelta(days=start_date.weekday())
+        # 1970-01-01 was a Thursday, so (day + 3) % 7 is the weekday with Monday = 0
+        self.cursor.execute(
+            """
+            SELECT day - (day + 3) % 7 AS monday, kind, SUM(jobs) FROM workload
+            WHERE day BETWEEN ? AND ? AND jobs > 0
+            GROUP BY monday, kind
+            ORDER BY monday, kind
+            """,
+            (date_to_days(monday), date_to_days(monday) + 7 * weeks - 1),
+        )
+        return [
+            (self.convert_date(day), display_names[kind], jobs)
+            for day, kind, jobs in self.cursor.fetchall()
+        ]
+
+    def fetch_births(self) -> dict[int, tuple[str, str, dt.date]]:
+        """
+        Returns (calf type, gender, birthday) per ear tag of all calves, without creating the calves.
+
+        :return: dict of ear tag -> (calf type, gender, birthday)
+        """
+        self.cursor.execute(self.treatment_store.select_births())
+        return {
+            ear_tag: (calf_type, gender, self.convert_date(birthday))
+            for ear_tag, calf_type, gender, birthday in self.cursor.fetchall()
+        }
+
+    def fetch_treatment_dates(self, kind: str) -> dict[int, dt.date]:
+        """
+        Returns the date of a treatment per ear tag, the actual date if it was done, else the planned date.
+
+        :param kind: Name of the treatment table, e.g. "sell"
+        :return: dict of ear tag -> date, calves without the treatment are missing
+        """
+        self.cursor.execute(*self.treatment_store.select_treatment_dates(kind))
+        return {
+            ear_tag: self.convert_date(date) for ear_tag, date in self.cursor.fetchall()
+        }
+
+    def fetch_plan_deviations(self) -> list[tuple[int, str, dt.date | None, dt.date | None]]:
+        """
+        Returns the treatments whose planned date doesn't follow the protocol, e.g. after the protocol was changed.
+
+        The dates of the protocol are calculated by SQLite from the previous treatments, with the compiled plan.
+        Treatments which the farm plans for cohorts (ringworm) are left out.
+        :return: list of (ear tag, treatment, planned date, date of the protocol), ordered by ear tag
+        """
+        treatments = "\n            UNION ALL\n".join(
+            f"SELECT ear_tag, {position} AS position, '{step.name}' AS kind, planned, "
+            f"{step.to_sql('previous')} AS expected "
+            f"FROM ({self.treatment_store.select_previous_dates(step.name, step.previous)})"
+            for position, step in enumerate(PLAN.steps)
+            if not step.cohort
+        )
+        self.cursor.execute(
+            f"""
+            SELECT ear_tag, kind, planned, expected FROM ({treatments})
+            WHERE planned IS NOT expected
+            ORDER BY ear_tag, position
+            """
+        )
+        return [
+            (ear_tag, display_names[kind], self.convert_date(planned), self.convert_date(expected))
+            for ear_tag, kind, planned, expected in self.cursor.fetchall()
+        ]
+
+    def fetch_max_breeding_calf_ear_tag(self) -> int:
+        # Like Farm.get_max_breeding_calf_ear_tag, without loading the calves
+        self.cursor.execute(
+            """
+            SELECT ear_tag FROM calf
+            WHERE type = 'breeding' AND CAST(ear_tag AS TEXT) NOT LIKE '99%'
+            ORDER BY ear_tag DESC LIMIT 1
+            """
+        )
+        row = self.cursor.fetchone()
+        return 0 if row is None else row[0]
+
+    def count_calves(self) -> int:
+        self.cursor.execute("SELECT count(*) FROM calf")
+        return self.cursor.fetchone()[0]
+
+    def fetch_breeding_calves_by_birth(
+        self, page_size: int = 1000
+    ) -> Iterator[list[tuple[int, int, int]]]:
         """
+        Reads (ear tag, planned birth, planned bovalto2) of the breeding calves, ordered by birth and ear tag.
+
+        The calves are read in pages, each page with its own query, so the database can be written
+        between two pages and only one page is held at a time.
+        :param page_size: Maximum number of calves per page
+        :return: The pages, the dates as days since 1970-01-01
+        """
+        query = self.treatment_store.select_breeding_calves_by_birth()
+        # Before the first calf
+        parameters = {"birth": -(2**62), "ear_tag": -(2**62), "limit": page_size}
+        while True:
+            self.cursor.execute(query, parameters)
+            rows = self.cursor.fetchall()
+            if len(rows) == 0:
+                return
+
+            yield rows
+            parameters["ear_tag"], parameters["birth"], _ = rows[-1]
+
+    def delete_calf(self, ear_tag: int):
+        batch = WriteBatch()
+        batch.delete_calf(ear_tag)
 
         try:
-            self.cursor.executescript(query)
-            self.connection.commit()
+            self.write(batch)
         except sqlite3.Error as e:
-            print(f"Error deleting entries: {e}")
+            logger.error("Error deleting entries: %s", e)
 
-    def fetch_calf_weights(self, ear_tag: int) -> list[tuple[dt.date, int]]:
-        return self.__fetch_weight_data(ear_tag)
+    def fetch_calf_weights(
+        self,
+        ear_tag: int,
+        start_date: dt.date | None = None,
+        end_date: dt.date | None = None,
+    ) -> list[tuple[dt.date, int]]:
+        """
+        Returns the (date, kg) of the weights of a calf, ordered by date.
 
-    def save_calf_weight(
-        self, ear_tag: int, date: dt.date, weight: int, execute: bool = True
-    ) -> str | None:
-        query = self.__insert_weight(ear_tag, date, weight)
+        :param ear_tag: The ear tag of the calf
+        :param start_date: First day of the range, or None for all earlier weights
+        :param end_date: Last day of the range (inclusive), or None for all later weights
+        :return: list of weights
+        """
+        self.cursor.execute(
+            """
+            SELECT date, kg FROM weight
+            WHERE ear_tag = :ear_tag
+            AND date BETWEEN coalesce(:start, date) AND coalesce(:end, date)
+            ORDER BY date
+            """,
+            {
+                "ear_tag": ear_tag,
+                "start": date_to_days(start_date),
+                "end": date_to_days(end_date),
+            },
+        )
+        return [(self.convert_date(date), kg) for date, kg in self.cursor.fetchall()]
 
-        if execute:
-            self.cursor.executescript(query)
-            self.connection.commit()
-            return None
+    def fetch_weights(
+        self, start_date: dt.date, end_date: dt.date
+    ) -> list[tuple[int, dt.date, int]]:
+        """
+        Returns the (ear tag, date, kg) of all weights between two dates, ordered by date and ear tag.
+
+        :param start_date: First day of the range
+        :param end_date: Last day of the range (inclusive)
+        :return: list of weights
+        """
+        self.cursor.execute(
+            """
+            SELECT ear_tag, date, kg FROM weight
+            WHERE date BETWEEN ? AND ?
+            ORDER BY date, ear_tag
+            """,
+            (date_to_days(start_date), date_to_days(end_date)),
+        )
+        return [
+            (ear_tag, self.convert_date(date), kg)
+            for ear_tag, date, kg in self.cursor.fetchall()
+        ]
+
+    def fetch_latest_weights(self) -> dict[int, tuple[dt.date, int]]:
+        """
+        Returns the (date, kg) of the latest weight per ear tag, for the whole herd in one query.
+
+        Calves without a weight are missing.
+        :return: dict of ear tag -> (date, kg)
+        """
+        # With MAX, SQLite takes kg from the row with the latest date
+        self.cursor.execute("SELECT ear_tag, MAX(date), kg FROM weight GROUP BY ear_tag")
+        return {
+            ear_tag: (self.convert_date(date), kg)
+            for ear_tag, date, kg in self.cursor.fetchall()
+        }
+
+    def fetch_weight_table(self) -> list[tuple[int, int, int]]:
+        """
+        Returns all weights as stored, ordered by ear tag and date, e.g. to load them into arrays.
 
-        return query
+        :return: list of (ear tag, days since 1970-01-01, kg)
+        """
+        self.cursor.execute("SELECT ear_tag, date, kg FROM weight ORDER BY ear_tag, date")
+        return self.cursor.fetchall()
+
+    def save_calf_weight(self, ear_tag: int, date: dt.date, weight: int):
+        batch = WriteBatch()
+        batch.add_weight(ear_tag, date, weight)
+        self.write(batch)
 
     def save_calf_weights(self, ear_tag: int, data: list[tuple[dt.date, int]]) -> None:
-        query = ""
+        """
+        Replaces all weights of a calf, e.g. after they were edited in a table.
+
+        :param ear_tag: The ear tag of the calf
+        :param data: (date, kg) of all weights of the calf
+        :return: None
+        """
+        batch = WriteBatch()
+        batch.delete_weights(ear_tag)
+        for date, weight in data:
+            batch.add_weight(ear_tag, date, weight)
+
+        self.write(batch)
 
-        for entry in data:
-            print(entry)
-            query += self.save_calf_weight(ear_tag, entry[0], entry[1], execute=False)
+    def save_weights(self, readings: Iterable[tuple[int, dt.date, int]]) -> int:
+        """
+        Saves many weights of any calves in one transaction, e.g. all readings of a scale.
+
+        A reading of a calf at a date which already has a weight replaces it. Readings of ear tags
+        which are not in the database are skipped and logged, as they would fail the whole transaction.
+        :param readings: (ear tag, date, kg) of every reading
+        :return: Number of saved readings
+        """
+        self.cursor.execute("SELECT ear_tag FROM calf")
+        ear_tags = {ear_tag for (ear_tag,) in self.cursor.fetchall()}
+
+        batch = WriteBatch()
+        unknown_ear_tags = set()
+        for ear_tag, date, weight in readings:
+            if ear_tag in ear_tags:
+                batch.add_weight(ear_tag, date, weight)
+            else:
+                unknown_ear_tags.add(ear_tag)
+
+        if len(unknown_ear_tags) > 0:
+            logger.warning(
+                "Skipped the weights of unknown calves: %s", sorted(unknown_ear_tags)
+            )
 
-        print(query)
-        # self.cursor.executescript(query)
-        # self.connection.commit()
+        self.write(batch)
+        return len(batch.weights)
 
 
 if __name__ == "__main__":
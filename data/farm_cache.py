@@ -0,0 +1,147 @@
+import os
+import sys
+
+# This code snippet does the following:
+#     1. It adjusts the Python path to include the parent directory
+#        (which contains models and other packages).
+#        This allows Python to locate and import modules from these directories.
+#     2. Then, it imports the necessary modules from the models package.
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import threading
+from contextlib import contextmanager
+from data.db_handler import DatabaseHandler, get_write_count, is_file_path
+from models.farm import Farm
+
+
+def get_database_version(db_name: str) -> tuple:
+    """
+    Changes whenever the database file is written, by this process or any other.
+
+    Writes by this process are counted by the DatabaseHandler.
+    Writes by other processes change the modification time or size of the file or its write-ahead log.
+    """
+    version = [get_write_count(db_name)]
+    for path in [db_name, db_name + "-wal"]:
+        try:
+            stat = os.stat(path)
+            version.append((stat.st_mtime_ns, stat.st_size))
+        except FileNotFoundError:
+            version.append(None)
+
+    return tuple(version)
+
+
+class FarmCache:
+    """
+    Keeps the farm loaded from each database file, so it is only loaded again after the file was written.
+
+    The farm is shared by everyone who gets it from the cache, so it should only be changed inside
+    edit_farm, which lets one session at a time change and save it. A farm with unsaved changes is never
+    handed out again, so changes have to be saved with save_changes or they are discarded.
+    Calves which are edited directly instead of with Farm.edit_calf have to be refreshed with
+    Farm.refresh_calf, so the jobs and cohorts of the cached farm follow them.
+    """
+
+    _farms: dict[str, tuple[tuple, Farm]]  # path -> (database version, farm)
+    _lock: threading.Lock
+    _edit_locks: dict[str, threading.RLock]  # path -> lock held while the farm is changed
+    loads: int  # Number of farms loaded from a database
+
+    def __init__(self):
+        self._farms = {}
+        self._lock = threading.Lock()
+        self._edit_locks = {}
+        self.loads = 0
+
+    def __get_edit_lock(self, db_name: str) -> threading.RLock:
+        with self._lock:
+            return self._edit_locks.setdefault(os.path.abspath(db_name), threading.RLock())
+
+    def __load_farm(self, db_name: str, db_type: str) -> Farm:
+        self.loads += 1
+        with DatabaseHandler(db_name=db_name, db_type=db_type) as dbh:
+            calves = dbh.fetch_all_calves()
+
+        farm = Farm()
+
+        # Since the data directly comes from the database,
+        # we don't need to set the ringworm
+        farm.add_calves(calves, set_ringworm=False)
+        return farm
+
+    def get_farm(self, db_name: str, db_type: str = "sqlite") -> Farm:
+        """
+        Returns the farm stored in a database, loading it only if the database changed since the last call.
+
+        :param db_name: Path of the database file
+        :param db_type: Type of the database, an in-memory database is never cached
+        :return: The farm
+        """
+        if db_type != "sqlite" or not is_file_path(db_name):
+            return self.__load_farm(db_name, db_type)
+
+        key = os.path.abspath(db_name)
+        # The cached farm isn't checked while another session changes it
+        with self.__get_edit_lock(db_name), self._lock:
+            version = get_database_version(db_name)
+            cached = self._farms.get(key)
+            if cached is not None:
+                cached_version, farm = cached
+                if cached_version == version and not farm.has_changes():
+                    return farm
+
+            farm = self.__load_farm(db_name, db_type)
+
+            # If the database was written while loading (e.g. its tables were created),
+            # the farm is not cached.
+            if get_database_version(db_name) == version:
+                self._farms[key] = (version, farm)
+            else:
+                self._farms.pop(key, None)
+
+            return farm
+
+    def save_changes(self, farm: Farm, db_name: str, db_type: str = "sqlite"):
+        """
+        Saves the changes of a farm. If it is the cached farm, it stays cached, as it matches the database.
+        """
+        key = os.path.abspath(db_name)
+        with self._lock:
+            version = get_database_version(db_name)
+            with DatabaseHandler(db_name=db_name, db_type=db_type) as dbh:
+                dbh.save_changes(farm)
+
+            cached = self._farms.get(key)
+            if cached is not None and cached[1] is farm and cached[0] == version:
+                self._farms[key] = (get_database_version(db_name), farm)
+
+    @contextmanager
+    def edit_farm(self, db_name: str, db_type: str = "sqlite"):
+        """
+        Yields the farm of a database to be changed and saves the changes afterwards.
+        Other sessions wait until the changes are saved, so they neither get the farm half-changed
+        nor change it at the same time. If the block raises, the changes are discarded.
+
+        :param db_name: Path of the database file
+        :param db_type: Type of the database
+        """
+        with self.__get_edit_lock(db_name):
+            farm = self.get_farm(db_name, db_type)
+            yield farm
+            if farm.has_changes():
+                self.save_changes(farm, db_name, db_type)
+
+    def invalidate(self, db_name: str | None = None):
+        """
+        Forgets the farm of a database, or of all databases if db_name is None.
+        """
+        with self._lock:
+            if db_name is None:
+                self._farms.clear()
+            else:
+                self._farms.pop(os.path.abspath(db_name), None)
+
+
+# Shared by all pages and sessions of the app
+farm_cache = FarmCache()
@@ -0,0 +1,103 @@
+import os
+import sys
+
+# This code snippet does the following:
+#     1. It adjusts the Python path to include the parent directory
+#        (which contains models and other packages).
+#        This allows Python to locate and import modules from these directories.
+#     2. Then, it imports the necessary modules from the models package.
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import datetime as dt
+import itertools
+import threading
+import numpy as np
+from data.db_handler import DatabaseHandler, is_file_path
+from data.farm_cache import get_database_version
+from models.growth import HerdGrowth
+from models.treatment import Sell
+
+
+def load_growth(dbh: DatabaseHandler) -> HerdGrowth:
+    # Flattening the rows is faster than converting every tuple.
+    # The stored days since 1970-01-01 are datetime64[D] values.
+    rows = dbh.fetch_weight_table()
+    weights = np.fromiter(
+        itertools.chain.from_iterable(rows), dtype=np.int64, count=3 * len(rows)
+    ).reshape(-1, 3)
+    return HerdGrowth(weights[:, 0], weights[:, 1].astype("datetime64[D]"), weights[:, 2])
+
+
+def project_sell_weights(
+    dbh: DatabaseHandler, growth: HerdGrowth
+) -> list[tuple[int, dt.date, float]]:
+    """
+    Returns (ear tag, sell date, projected kg) of the fattening calves which have a daily gain.
+    """
+    sell_dates = dbh.fetch_treatment_dates(Sell.__name__.lower())
+    ear_tags = np.fromiter(sell_dates.keys(), dtype=np.int64, count=len(sell_dates))
+    dates = np.array(list(sell_dates.values()), dtype="datetime64[D]")
+    weights = growth.project(ear_tags, dates)
+
+    return [
+        (ear_tag, sell_dates[ear_tag], weight)
+        for ear_tag, weight in zip(ear_tags.tolist(), weights.tolist())
+        if not np.isnan(weight)
+    ]
+
+
+class GrowthCache:
+    """
+    Keeps the growth computed from the weights of each database file, until the file is written.
+    """
+
+    # path -> (database version, growth, projected sell weights)
+    _entries: dict[str, tuple[tuple, HerdGrowth, list[tuple[int, dt.date, float]]]]
+    _lock: threading.Lock
+    loads: int  # Number of times the growth was computed
+
+    def __init__(self):
+        self._entries = {}
+        self._lock = threading.Lock()
+        self.loads = 0
+
+    def __load(self, db_name: str, db_type: str) -> tuple:
+        self.loads += 1
+        with DatabaseHandler(db_name=db_name, db_type=db_type) as dbh:
+            growth = load_growth(dbh)
+            return growth, project_sell_weights(dbh, growth)
+
+    def __get_entry(self, db_name: str, db_type: str) -> tuple:
+        if db_type != "sqlite" or not is_file_path(db_name):
+            return self.__load(db_name, db_type)
+
+        key = os.path.abspath(db_name)
+        with self._lock:
+            version = get_database_version(db_name)
+            cached = self._entries.get(key)
+            if cached is not None and cached[0] == version:
+                return cached[1:]
+
+            entry = self.__load(db_name, db_type)
+            if get_database_version(db_name) == version:
+                self._entries[key] = (version, *entry)
+
+            return entry
+
+    def get_growth(self, db_name: str, db_type: str = "sqlite") -> HerdGrowth:
+        """
+        Returns the growth of all calves with weights, computing it only if the database changed since the last call.
+        """
+        return self.__get_entry(db_name, db_type)[0]
+
+    def get_sell_weights(
+        self, db_name: str, db_type: str = "sqlite"
+    ) -> list[tuple[int, dt.date, float]]:
+        """
+        Returns (ear tag, sell date, projected kg) of the fattening calves which have a daily gain.
+        """
+        return self.__get_entry(db_name, db_type)[1]
+
+
+# Shared by all pages and sessions of the app
+growth_cache = GrowthCache()
@@ -0,0 +1,430 @@
+"""
+Imports a herd from a .csv or .xlsx file into the database.
+
+import_herd streams the file in chunks of rows. The treatments of a chunk are planned for all of its
+calves at once (see models/schedule.py) and written with one statement per table, without creating
+the calves. Afterwards, the breeding calves are read back from the database page by page, ordered
+by birth, and grouped into their ringworm cohorts once. Everything is written in one transaction.
+The memory used is bounded by the chunk size and the size of the largest cohort, not by the file.
+
+update_herd imports a file into an existing database and only writes the calves which are new
+or whose gender or birthday changed.
+"""
+import os
+import sys
+
+# This code snippet does the following:
+#     1. It adjusts the Python path to include the parent directory
+#        (which contains models and other packages).
+#        This allows Python to locate and import modules from these directories.
+#     2. Then, it imports the necessary modules from the models package.
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from models.calf import FatteningCalf, BreedingCalf
+from models.gender import Gender
+from models.treatment import TREATMENT_ORDER
+from models.farm_frame import TREATMENTS, CALF_TYPES, get_iso_calendar
+from models.protocol import PLAN
+from models.ringworm import RingwormCohorts
+from models.schedule import calculate_schedule, plan_dates
+from data.db_handler import DatabaseHandler, WriteBatch
+from data.farm_cache import farm_cache
+from typing import Iterable, Iterator
+import csv
+import datetime as dt
+import itertools
+import logging
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Header of the ear tag, birthday and gender columns
+COLUMNS = ["Ear Tag", "Birthdate", "Gender"]
+# Database of the app
+DB_PATH = "data/calves.sqlite"
+CHUNK_SIZE = 1000
+# Calves with higher ear tags are fattening calves
+FATTENING_EAR_TAG = 99000
+DATE_FORMATS = ["%Y-%m-%d", "%d.%m.%Y"]
+# Planned for cohorts of breeding calves, after the latest Bovalto2 of the cohort (see models/ringworm.py)
+RINGWORM_STEPS = (PLAN.get_step("ringworm1"), PLAN.get_step("ringworm2"))
+
+
+def get_column_indexes(header: Iterable) -> list[int]:
+    # Position of each of the COLUMNS in the header, the columns may be in any order
+    header = [str(name).strip() if name is not None else "" for name in header]
+    missing_columns = [name for name in COLUMNS if name not in header]
+    if len(missing_columns) > 0:
+        raise ValueError(f"Missing columns: {', '.join(missing_columns)}")
+
+    return [header.index(name) for name in COLUMNS]
+
+
+def select_columns(rows: Iterator[tuple], skip_rows: int = 0) -> Iterator[tuple]:
+    # (ear tag, birthday, gender) of every row after the header, empty rows are skipped
+    rows = itertools.islice(rows, skip_rows, None)
+    indexes = get_column_indexes(next(rows, ()))
+    for row in rows:
+        values = tuple(row[i] if i < len(row) else None for i in indexes)
+        if all(value is None or value == "" for value in values):
+            continue
+
+        yield values
+
+
+def read_csv(path: str, skip_rows: int = 0) -> Iterator[tuple]:
+    with open(path, newline="", encoding="utf-8-sig") as file:
+        # Spreadsheets exported with a German locale use semicolons
+        delimiter = ";" if ";" in file.readline() else ","
+        file.seek(0)
+        yield from select_columns(csv.reader(file, delimiter=delimiter), skip_rows)
+
+
+def read_xlsx(path: str, sheet_name: str = "Kaelberliste", skip_rows: int = 1) -> Iterator[tuple]:
+    # Only needed for spreadsheets, a csv file can be imported without it
+    import openpyxl
+
+    # In read-only mode, the rows are loaded while they are iterated
+    workbook = openpyxl.load_workbook(path, read_only=True, data_only=True)
+    try:
+        rows = workbook[sheet_name].iter_rows(values_only=True)
+        yield from select_columns(rows, skip_rows)
+    finally:
+        workbook.close()
+
+
+def read_chunks(
+    path: str, chunk_size: int = CHUNK_SIZE, **options
+) -> Iterator[list[tuple]]:
+    """
+    Reads the (ear tag, birthday, gender) of the calves in chunks.
+
+    :param path: A .csv or .xlsx file, with a header row containing the COLUMNS
+    :param chunk_size: Maximum number of rows per chunk
+    :param options: skip_rows before the header, and the sheet_name of a .xlsx file
+    :return: The chunks of raw values
+    """
+    if path.endswith(".csv"):
+        rows = read_csv(path, **options)
+    elif path.endswith(".xlsx"):
+        rows = read_xlsx(path, **options)
+    else:
+        raise ValueError("Unsupported file type")
+
+    while True:
+        chunk = list(itertools.islice(rows, chunk_size))
+        if len(chunk) == 0:
+            return
+
+        yield chunk
+
+
+def parse_ear_tag(value) -> int:
+    # Spreadsheets store numbers as floats
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+
+    return int(str(value).strip())
+
+
+def parse_date(value) -> dt.date:
+    if isinstance(value, dt.datetime):
+        return value.date()
+    if isinstance(value, dt.date):
+        return value
+
+    value = str(value).strip()
+    for date_format in DATE_FORMATS:
+        try:
+            return dt.datetime.strptime(value, date_format).date()
+        except ValueError:
+            continue
+
+    raise ValueError(f"Invalid date {value}")
+
+
+def get_calf_type(ear_tag: int) -> str:
+    return "fattening" if ear_tag > FATTENING_EAR_TAG else "breeding"
+
+
+def parse_rows(rows: list[tuple]) -> list[tuple[int, dt.date, Gender]]:
+    """
+    Parses the raw values of a chunk, column by column.
+
+    :param rows: (ear tag, birthday, gender) as read from the file
+    :return: (ear tag, birthday, gender) of every row
+    """
+    try:
+        ear_tags = [parse_ear_tag(row[0]) for row in rows]
+        birthdays = [parse_date(row[1]) for row in rows]
+        genders = [Gender.from_str(str(row[2]).strip()) for row in rows]
+    except ValueError as error:
+        raise ValueError(f"Invalid row in chunk starting with {rows[0]}: {error}")
+
+    return list(zip(ear_tags, birthdays, genders))
+
+
+def create_calf(
+    ear_tag: int, birthday: dt.date, gender: Gender, dehorning_required: bool = True
+) -> FatteningCalf | BreedingCalf:
+    if get_calf_type(ear_tag) == "fattening":
+        return FatteningCalf(birthday, gender, ear_tag, dehorning_required)
+
+    return BreedingCalf(birthday, gender, ear_tag, dehorning_required)
+
+
+def recreate_calf(
+    calf: FatteningCalf | BreedingCalf, birthday: dt.date, gender: Gender
+) -> FatteningCalf | BreedingCalf:
+    """
+    Creates a stored calf again with a changed birthday or gender.
+
+    The calf keeps its type and whether it has to be dehorned.
+    The treatments which were done keep their actual dates.
+    :param calf: The stored calf
+    :param birthday: Birthday from the file
+    :param gender: Gender from the file
+    :return: The new calf
+    """
+    new_calf = type(calf)(birthday, gender, calf.ear_tag, calf.dehorning_required)
+    for treatment_type in TREATMENT_ORDER[1:]:
+        treatment = calf.get_treatment(treatment_type)
+        if (
+            treatment is not None
+            and treatment.actual_date is not None
+            and new_calf.get_treatment(treatment_type) is not None
+        ):
+            new_calf.edit_treatment(treatment_type, treatment.actual_date)
+
+    return new_calf
+
+
+def create_calves(
+    rows: list[tuple], dehorning_required: bool = True
+) -> list[FatteningCalf | BreedingCalf]:
+    """
+    Creates the calves of a chunk.
+
+    :param rows: (ear tag, birthday, gender) as read from the file
+    :param dehorning_required: Whether the calves have to be dehorned
+    :return: The calves, in the order of the rows
+    """
+    return [
+        create_calf(ear_tag, birthday, gender, dehorning_required)
+        for ear_tag, birthday, gender in parse_rows(rows)
+    ]
+
+
+def create_batch(rows: list[tuple], dehorning_required: bool = True) -> WriteBatch:
+    """
+    Creates the rows of the calves of a chunk and their treatments, without the ringworm treatments.
+
+    :param rows: (ear tag, birthday, gender) as read from the file
+    :param dehorning_required: Whether the calves have to be dehorned
+    :return: The rows to write
+    """
+    parsed_rows = parse_rows(rows)
+    ear_tags = np.array([ear_tag for ear_tag, _, _ in parsed_rows], dtype=np.int64)
+    birthdays = np.array([birthday for _, birthday, _ in parsed_rows], dtype="datetime64[D]")
+    calf_types = np.where(
+        ear_tags > FATTENING_EAR_TAG,
+        CALF_TYPES.index(FatteningCalf),
+        CALF_TYPES.index(BreedingCalf),
+    )
+    planned = calculate_schedule(
+        birthdays, np.full(len(ear_tags), dehorning_required), calf_types
+    )
+
+    batch = WriteBatch()
+    batch.calves = [
+        (ear_tag, str(gender), get_calf_type(ear_tag))
+        for ear_tag, _, gender in parsed_rows
+    ]
+    cohort_treatments = [step.name for step in RINGWORM_STEPS]
+    for column, treatment_type in enumerate(TREATMENTS):
+        table_name = treatment_type.__name__.lower()
+        if table_name in cohort_treatments:
+            continue
+
+        # Days since 1970-01-01, as stored in the database
+        has_treatment = ~np.isnat(planned[:, column])
+        batch.treatments[table_name] = list(
+            zip(
+                ear_tags[has_treatment].tolist(),
+                planned[has_treatment, column].astype(np.int64).tolist(),
+                itertools.repeat(None),
+            )
+        )
+
+    return batch
+
+
+def add_cohort(batch: WriteBatch, ear_tags: list[int], bovalto2: int):
+    # Like RingwormCohorts, a smaller cohort doesn't get ringworm treatments
+    if len(ear_tags) < RingwormCohorts.MIN_COHORT_SIZE:
+        return
+
+    dates = np.array([bovalto2], dtype="datetime64[D]")
+    for step in RINGWORM_STEPS:
+        dates = plan_dates(step, dates)
+        planned = int(dates.astype(np.int64)[0])
+        batch.treatments[step.name] += [(ear_tag, planned, None) for ear_tag in ear_tags]
+
+
+def group_cohorts(db: DatabaseHandler, chunk_size: int = CHUNK_SIZE) -> Iterator[WriteBatch]:
+    """
+    Plans the ringworm treatments of all breeding calves of a database, the same way as RingwormCohorts.
+
+    The calves are read ordered by birth, one page at a time. Only the ear tags of the cohort
+    which is not closed yet are kept from one page to the next. Calves born on the same day are
+    ordered by ear tag instead of the order they were added in, as they have the same Bovalto2.
+    :param db: Database with the calves and their Bovalto2 treatments
+    :param chunk_size: Maximum number of calves read at once
+    :return: The ringworm treatments, one batch per page
+    """
+    ear_tags = []
+    week = None
+    bovalto2 = None
+    for page in db.fetch_breeding_calves_by_birth(chunk_size):
+        # Calendar week of the first ringworm treatment based on each calf's own Bovalto2
+        bovalto2_dates = np.array([row[2] for row in page], dtype="datetime64[D]")
+        _, weeks = get_iso_calendar(plan_dates(RINGWORM_STEPS[0], bovalto2_dates))
+
+        batch = WriteBatch()
+        for (ear_tag, _, calf_bovalto2), calf_week in zip(page, weeks.tolist()):
+            # A cohort takes at least five calves and is extended as long as the week stays the same
+            if len(ear_tags) >= RingwormCohorts.MIN_COHORT_SIZE and calf_week != week:
+                add_cohort(batch, ear_tags, bovalto2)
+                ear_tags = []
+                bovalto2 = None
+
+            ear_tags.append(ear_tag)
+            week = calf_week
+            bovalto2 = calf_bovalto2 if bovalto2 is None else max(bovalto2, calf_bovalto2)
+
+        yield batch
+
+    batch = WriteBatch()
+    add_cohort(batch, ear_tags, bovalto2)
+    yield batch
+
+
+class ImportResult:
+    """
+    Number of calves which were inserted, updated or skipped by an import.
+    """
+
+    inserted: int
+    updated: int
+    skipped: int
+
+    def __init__(self):
+        self.inserted = 0
+        self.updated = 0
+        self.skipped = 0
+
+    def __str__(self):
+        return f"{self.inserted} inserted, {self.updated} updated, {self.skipped} skipped"
+
+
+def import_herd(
+    path: str,
+    db_name: str = DB_PATH,
+    db_type: str = "sqlite",
+    chunk_size: int = CHUNK_SIZE,
+    **options,
+) -> ImportResult:
+    """
+    Imports all calves of a file into a database without calves.
+
+    The ringworm cohorts are grouped once, after all calves are written. If a row is invalid,
+    nothing is written.
+    :param path: A .csv or .xlsx file (see read_chunks)
+    :param db_name: Database to import the calves into, use update_herd if it already has calves
+    :param db_type: Type of the database
+    :param chunk_size: Maximum number of rows read and written at once
+    :param options: Options of read_chunks
+    :return: The number of inserted calves
+    """
+    result = ImportResult()
+
+    def create_batches(db: DatabaseHandler) -> Iterator[WriteBatch]:
+        for chunk in read_chunks(path, chunk_size, **options):
+            yield create_batch(chunk)
+            result.inserted += len(chunk)
+            logger.debug("Read %d calves", len(chunk))
+
+        # An ear tag which is in the file more than once was written over
+        if db.count_calves() != result.inserted:
+            raise ValueError("The file contains an ear tag more than once")
+
+        # The cohorts can only be grouped once all breeding calves are known
+        yield from group_cohorts(db, chunk_size)
+
+    with DatabaseHandler(db_name=db_name, db_type=db_type) as db:
+        if db.count_calves() > 0:
+            raise ValueError(f"{db_name} already has calves, use update_herd")
+
+        db.write_batches(create_batches(db))
+
+    logger.info("Imported %d calves from %s", result.inserted, path)
+    return result
+
+
+def update_herd(
+    path: str,
+    db_name: str = DB_PATH,
+    db_type: str = "sqlite",
+    chunk_size: int = CHUNK_SIZE,
+    **options,
+) -> ImportResult:
+    """
+    Imports a file into an existing database, so it can be imported again whenever it changes.
+
+    The rows are compared with the stored calves by ear tag. A calf whose gender and birthday
+    are unchanged is skipped. A new calf is added, and a changed calf is created again from its row
+    (see recreate_calf), its type is kept as stored. Only if there are new or changed calves,
+    the farm is loaded, the ringworm cohorts are grouped once and the changes are saved.
+    Calves which are missing in the file are kept.
+    :param path: A .csv or .xlsx file (see read_chunks)
+    :param db_name: Database to update
+    :param db_type: Type of the database
+    :param chunk_size: Maximum number of rows read at once
+    :param options: Options of read_chunks
+    :return: The number of inserted, updated and skipped calves
+    """
+    with DatabaseHandler(db_name=db_name, db_type=db_type) as db:
+        births = db.fetch_births()
+
+    result = ImportResult()
+    new_calves = []
+    changed_rows = []
+    for chunk in read_chunks(path, chunk_size, **options):
+        for ear_tag, birthday, gender in parse_rows(chunk):
+            stored = births.get(ear_tag)
+            if stored is None:
+                new_calves.append(create_calf(ear_tag, birthday, gender))
+            elif stored[1:] != (str(gender), birthday):
+                # The type might have been changed in the app, so it isn't compared
+                changed_rows.append((ear_tag, birthday, gender))
+            else:
+                result.skipped += 1
+
+    result.inserted = len(new_calves)
+    result.updated = len(changed_rows)
+    if len(new_calves) + len(changed_rows) > 0:
+        farm = farm_cache.get_farm(db_name, db_type)
+        changed_calves = [
+            recreate_calf(farm.get_calf(ear_tag), birthday, gender)
+            for ear_tag, birthday, gender in changed_rows
+        ]
+        for calf in changed_calves:
+            farm.delete_calf(calf.ear_tag, set_ringworm=False)
+        farm.add_calves(changed_calves + new_calves, set_ringworm=False)
+
+        # The cohorts can only be grouped once all breeding calves are known
+        farm.set_ringworm()
+        farm_cache.save_changes(farm, db_name, db_type)
+
+    logger.info("Updated %s from %s: %s", db_name, path, result)
+    return result
@@ -1,5 +1,9 @@
 """
 This file is used to import the data from a csv/xslx file to the actual sqlite database.
+
+Usage:
+    python data/init.py calf_2.xlsx --db data/calves.sqlite
+    python data/init.py calf_2.xlsx --db data/calves.sqlite --update
 """
 import os
 import sys
@@ -11,52 +15,30 @@ import sys
 #     2. Then, it imports the necessary modules from the models package.
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
 
-import pandas as pd
-from models.calf import FatteningCalf, BreedingCalf
-from models.gender import Gender
-from models.farm import Farm
-from db_handler import DatabaseHandler, database_creation_script
-
-
-def get_data(path: str) -> pd.DataFrame:
-    if path.endswith(".xlsx"):
-        calf_data = pd.read_excel(
-            io=path,
-            engine="openpyxl",
-            sheet_name="Kaelberliste",
-            skiprows=1,
-            usecols="B:D",
-            nrows=40,
-        )
-
-        return calf_data
-
-
-def main():
-    calf_data = get_data("calf_2.xlsx")
-    farm = Farm()
-
-    # Go through all rows
-    for index, row in calf_data.iterrows():
-        ear_tag = row["Ear Tag"]
-        birthday = row["Birthdate"]
-        gender = Gender.from_str(row["Gender"])
-
-        birthday = pd.to_datetime(birthday)
-        birthday = birthday.date()
+from data.importer import import_herd, update_herd, CHUNK_SIZE, DB_PATH
+from logging_config import configure_logging
+import argparse
 
-        # Create a new calf
-        if ear_tag > 99000:
-            # I assume, that dehorning is required for all calves
-            calf = FatteningCalf(birthday, gender, ear_tag, True)
-        else:
-            calf = BreedingCalf(birthday, gender, ear_tag, True)
 
-        farm.add_calf(calf)
+def main(argv: list[str] | None = None):
+    parser = argparse.ArgumentParser(description="Imports a herd into the database")
+    parser.add_argument("path", nargs="?", default="calf_2.xlsx", help=".csv or .xlsx file")
+    parser.add_argument("--db", default=DB_PATH, help="Database file")
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE)
+    parser.add_argument(
+        "--update",
+        action="store_true",
+        help="Only write new and changed calves to an existing database",
+    )
+    args = parser.parse_args(argv)
 
-    with DatabaseHandler(db_type="sqlite", db_name="calves.sqlite") as db:
-        db.save_farm(farm)
+    if args.update:
+        result = update_herd(args.path, db_name=args.db, chunk_size=args.chunk_size)
+        print(f"{args.path}: {result}")
+    else:
+        import_herd(args.path, db_name=args.db, chunk_size=args.chunk_size)
 
 
 if __name__ == "__main__":
+    configure_logging()
     main()
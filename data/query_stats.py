@@ -0,0 +1,246 @@
+"""
+Opt-in timing of the SQL statements and the public methods of the DatabaseHandler.
+
+A DatabaseHandler only records anything if it gets a QueryStats object, if the stats of the
+current thread are set with set_thread_query_stats() (e.g. for one session of the app), or if
+the stats of the whole process are turned on with enable_query_stats(). Otherwise it uses the
+plain sqlite3 cursor and methods, so turning the stats off costs nothing.
+"""
+import copy
+import functools
+import sqlite3
+import threading
+import time
+
+
+class StatementStats:
+    """
+    Calls, rows and time of one SQL statement. The time includes fetching the rows.
+    """
+
+    sql: str
+    calls: int
+    rows: int  # Rows fetched or changed
+    total_seconds: float
+    max_seconds: float
+
+    def __init__(self, sql: str):
+        self.sql = sql
+        self.calls = 0
+        self.rows = 0
+        self.total_seconds = 0.0
+        self.max_seconds = 0.0
+
+    @property
+    def mean_seconds(self) -> float:
+        return self.total_seconds / self.calls if self.calls > 0 else 0.0
+
+
+class MethodStats:
+    """
+    Calls and time of one public method of the DatabaseHandler.
+    """
+
+    name: str
+    calls: int
+    total_seconds: float
+
+    def __init__(self, name: str):
+        self.name = name
+        self.calls = 0
+        self.total_seconds = 0.0
+
+
+class QueryStatsSummary:
+    """
+    Copy of the recorded stats, the statements and methods are ordered by their total time.
+    """
+
+    statements: list[StatementStats]
+    methods: list[MethodStats]
+
+    def __init__(self, statements: list[StatementStats], methods: list[MethodStats]):
+        self.statements = sorted(statements, key=lambda s: s.total_seconds, reverse=True)
+        self.methods = sorted(methods, key=lambda m: m.total_seconds, reverse=True)
+
+    @property
+    def total_queries(self) -> int:
+        return sum(statement.calls for statement in self.statements)
+
+    @property
+    def total_seconds(self) -> float:
+        return sum(statement.total_seconds for statement in self.statements)
+
+    def get_method_calls(self) -> dict[str, int]:
+        return {method.name: method.calls for method in self.methods}
+
+
+class QueryStats:
+    """
+    Stats of the statements and methods of one or more DatabaseHandlers, which may run in different threads.
+    """
+
+    _statements: dict[str, StatementStats]  # SQL -> stats
+    _methods: dict[str, MethodStats]  # Method name -> stats
+    _lock: threading.Lock
+
+    def __init__(self):
+        self._statements = {}
+        self._methods = {}
+        self._lock = threading.Lock()
+
+    def record_statement(self, sql: str, seconds: float, rows: int, call: bool = True):
+        """
+        :param sql: The statement
+        :param seconds: Time of executing it, or of fetching its rows
+        :param rows: Rows fetched or changed
+        :param call: False if the rows of an earlier call were fetched
+        :return: None
+        """
+        with self._lock:
+            stats = self._statements.get(sql)
+            if stats is None:
+                stats = self._statements[sql] = StatementStats(sql)
+
+            if call:
+                stats.calls += 1
+            stats.rows += rows
+            stats.total_seconds += seconds
+            stats.max_seconds = max(stats.max_seconds, seconds)
+
+    def record_method(self, name: str, seconds: float):
+        with self._lock:
+            stats = self._methods.get(name)
+            if stats is None:
+                stats = self._methods[name] = MethodStats(name)
+
+            stats.calls += 1
+            stats.total_seconds += seconds
+
+    def summary(self) -> QueryStatsSummary:
+        with self._lock:
+            statements = [copy.copy(stats) for stats in self._statements.values()]
+            methods = [copy.copy(stats) for stats in self._methods.values()]
+
+        return QueryStatsSummary(statements, methods)
+
+    def reset(self):
+        with self._lock:
+            self._statements = {}
+            self._methods = {}
+
+
+class ProfilingCursor:
+    """
+    Wraps a sqlite3.Cursor and records the time and rows of every statement.
+
+    SQLite computes the rows of a query while they are fetched, so fetching counts towards the last statement.
+    """
+
+    _cursor: sqlite3.Cursor
+    _stats: QueryStats
+    _sql: str | None  # Last statement
+
+    def __init__(self, cursor: sqlite3.Cursor, stats: QueryStats):
+        self._cursor = cursor
+        self._stats = stats
+        self._sql = None
+
+    def __getattr__(self, name: str):
+        # Everything which isn't timed, e.g. rowcount or description
+        return getattr(self._cursor, name)
+
+    def __iter__(self):
+        return iter(self.fetchall())
+
+    def __run(self, method, sql: str, *args):
+        self._sql = " ".join(sql.split())
+        start = time.perf_counter()
+        method(sql, *args)
+        seconds = time.perf_counter() - start
+
+        # rowcount is -1 for queries, their rows are counted when they are fetched
+        self._stats.record_statement(self._sql, seconds, max(self._cursor.rowcount, 0))
+        return self
+
+    def execute(self, sql: str, parameters=()):
+        return self.__run(self._cursor.execute, sql, parameters)
+
+    def executemany(self, sql: str, seq_of_parameters):
+        return self.__run(self._cursor.executemany, sql, seq_of_parameters)
+
+    def executescript(self, sql_script: str):
+        return self.__run(self._cursor.executescript, sql_script)
+
+    def __fetch(self, method, *args):
+        start = time.perf_counter()
+        result = method(*args)
+        seconds = time.perf_counter() - start
+
+        if self._sql is not None:
+            rows = len(result) if isinstance(result, list) else int(result is not None)
+            self._stats.record_statement(self._sql, seconds, rows, call=False)
+        return result
+
+    def fetchone(self):
+        return self.__fetch(self._cursor.fetchone)
+
+    def fetchmany(self, size: int | None = None):
+        if size is None:
+            return self.__fetch(self._cursor.fetchmany)
+        return self.__fetch(self._cursor.fetchmany, size)
+
+    def fetchall(self):
+        return self.__fetch(self._cursor.fetchall)
+
+    def close(self):
+        self._cursor.close()
+
+
+def profile_method(method, stats: QueryStats):
+    # Records the calls and time of a bound method
+    @functools.wraps(method)
+    def profiled_method(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return method(*args, **kwargs)
+        finally:
+            stats.record_method(method.__name__, time.perf_counter() - start)
+
+    return profiled_method
+
+
+# Stats of all DatabaseHandlers which don't get their own, None if turned off
+_process_stats: QueryStats | None = None
+
+
+def enable_query_stats() -> QueryStats:
+    """
+    Turns on the stats of all DatabaseHandlers opened from now on, keeping earlier stats.
+    """
+    global _process_stats
+    if _process_stats is None:
+        _process_stats = QueryStats()
+
+    return _process_stats
+
+
+def disable_query_stats():
+    global _process_stats
+    _process_stats = None
+
+
+# Stats of the DatabaseHandlers opened by one thread, they take precedence over the stats of the process
+_thread_stats = threading.local()
+
+
+def set_thread_query_stats(stats: QueryStats | None):
+    """
+    Records the DatabaseHandlers opened by the current thread from now on into stats, None turns it off.
+    """
+    _thread_stats.stats = stats
+
+
+def get_query_stats() -> QueryStats | None:
+    stats = getattr(_thread_stats, "stats", None)
+    return stats if stats is not None else _process_stats
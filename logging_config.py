@@ -0,0 +1,32 @@
+"""
+Logging of the app.
+
+Every module logs to logging.getLogger(__name__), so all messages go to one of the loggers
+"models", "data" and "view". Debug messages are only formatted if debug logging is on.
+"""
+import logging
+import os
+
+LOGGER_NAMES = ["models", "data", "view"]
+LOG_FORMAT = "%(asctime)s %(levelname)s %(name)s: %(message)s"
+
+
+def configure_logging(level: str | int | None = None):
+    """
+    Sets the level of the models, data and view loggers and writes their messages to stderr.
+
+    Calling it again (e.g. on every Streamlit rerun) only changes the level.
+    :param level: Level of the loggers, by default the environment variable CALF_LOG_LEVEL or WARNING
+    :return: None
+    """
+    if level is None:
+        level = os.environ.get("CALF_LOG_LEVEL", "WARNING").upper()
+
+    for name in LOGGER_NAMES:
+        logger = logging.getLogger(name)
+        logger.setLevel(level)
+
+        if not logger.handlers:
+            handler = logging.StreamHandler()
+            handler.setFormatter(logging.Formatter(LOG_FORMAT))
+            logger.addHandler(handler)
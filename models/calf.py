@@ -9,23 +9,45 @@ from models.treatment import (
     Bovalto2,
     Ringworm1,
     Ringworm2,
+    Treatment,
+    Changes,
+    PREVIOUS_TREATMENTS,
+    DEPENDENT_TREATMENTS,
+    TREATMENT_ORDER,
 )
 
 
 class Calf:
+    __slots__ = (
+        "_BIRTHDAY",
+        "_GENDER",
+        "_EAR_TAG",
+        "_DEHORNING_REQUIRED",
+        "_DIRTY",
+        "birth",
+        "bovalto_1",
+        "dehorn",
+        "restall",
+    )
+
     # Define birthday as a class variable
     _BIRTHDAY: dt.date
     _GENDER: Gender
     _EAR_TAG: int
     _DEHORNING_REQUIRED: bool
     _TO_SELL: bool
-    _TREATMENTS: list[
-        Birth | Bovalto1 | Dehorn | Restall | Sell | Bovalto2 | Ringworm1 | Ringworm2
-    ]
+    _DIRTY: bool
     birth: Birth
     bovalto_1: Bovalto1
     dehorn: Dehorn | None
     restall: Restall
+    # Treatment type -> attribute of the treatment
+    _TREATMENT_ATTRIBUTES: dict[type[Treatment], str] = {
+        Birth: "birth",
+        Bovalto1: "bovalto_1",
+        Dehorn: "dehorn",
+        Restall: "restall",
+    }
 
     @property
     def birthday(self) -> dt.date:
@@ -44,13 +66,22 @@ class Calf:
         return self._EAR_TAG
 
     @property
-    def treatments(self):
-        return self._TREATMENTS
+    def treatments(
+        self,
+    ) -> list[Bovalto1 | Dehorn | Restall | Sell | Bovalto2 | Ringworm1 | Ringworm2]:
+        # The treatments after the birth depend on the type of the calf
+        return []
 
     @property
     def calf_type(self):
         return self.__class__.__name__.lower().replace("calf", "")
 
+    @property
+    def is_dirty(self) -> bool:
+        # True if the calf itself changed (new calf, ear tag, gender or a removed treatment)
+        # since it was last saved. Changed dates are tracked by the treatments.
+        return self._DIRTY
+
     def __lt__(self, other):
         return self.birthday < other.birthday
 
@@ -82,35 +113,173 @@ class Calf:
         self._EAR_TAG = ear_tag
         self._DEHORNING_REQUIRED = dehorning_required
 
+        # A new calf has not been saved yet
+        self._DIRTY = True
+        Changes.count += 1
+
         self.birth = Birth(self.birthday)
 
+    def get_dirty_treatments(
+        self,
+    ) -> list[
+        Birth | Bovalto1 | Dehorn | Restall | Sell | Bovalto2 | Ringworm1 | Ringworm2
+    ]:
+        return [
+            treatment
+            for treatment in [self.birth] + self.treatments
+            if treatment is not None and treatment.is_dirty
+        ]
+
+    def has_changes(self) -> bool:
+        return self._DIRTY or len(self.get_dirty_treatments()) > 0
+
+    def mark_clean(self):
+        self._DIRTY = False
+        for treatment in [self.birth] + self.treatments:
+            if treatment is not None:
+                treatment.mark_clean()
+
     def change_ear_tag(self, new_ear_tag: int):
+        if self._EAR_TAG != new_ear_tag:
+            self._DIRTY = True
+            Changes.count += 1
         self._EAR_TAG = new_ear_tag
 
     def edit_gender(self, gender: Gender):
+        if self._GENDER != gender:
+            self._DIRTY = True
+            Changes.count += 1
         self._GENDER = gender
 
+    def get_treatment(self, treatment_type: type[Treatment]) -> Treatment | None:
+        # None if the calf doesn't have the treatment
+        attribute = self._TREATMENT_ATTRIBUTES.get(treatment_type)
+        return getattr(self, attribute) if attribute is not None else None
+
+    def get_previous_treatment(self, treatment_type: type[Treatment]) -> Treatment | None:
+        # The first of the possible previous treatments which the calf has
+        for prev_type in PREVIOUS_TREATMENTS[treatment_type]:
+            prev_treatment = self.get_treatment(prev_type)
+            if prev_treatment is not None:
+                return prev_treatment
+        return None
+
+    def requires_treatment(self, treatment_type: type[Treatment]) -> bool:
+        # Whether the protocol plans the treatment for the calf
+        calves = treatment_type._STEP.calves
+        if calves == "dehorning":
+            return self.dehorning_required
+        return calves == "all" or calves == self.calf_type
+
+    def create_treatments(self):
+        # Plans all treatments of the calf after its birth, in the order of the protocol
+        for treatment_type in TREATMENT_ORDER[1:]:
+            attribute = self._TREATMENT_ATTRIBUTES.get(treatment_type)
+            if attribute is None:
+                continue
+
+            prev_treatment = self.get_previous_treatment(treatment_type)
+            if prev_treatment is not None and self.requires_treatment(treatment_type):
+                setattr(self, attribute, treatment_type(prev_treatment))
+            else:
+                setattr(self, attribute, None)
+
+    def recalculate_dependents(self, treatment_type: type[Treatment]):
+        """
+            Recalculates the treatments which depend on a changed treatment.
+            A treatment is only recalculated if the date of its previous treatment changed,
+            so the recalculation stops where the dates stay the same.
+            Existing treatments are updated in place, missing required treatments are created.
+        :param treatment_type: Type of the changed treatment
+        :return: None
+        """
+        changed = {treatment_type}
+        for dependent_type in DEPENDENT_TREATMENTS[treatment_type]:
+            attribute = self._TREATMENT_ATTRIBUTES.get(dependent_type)
+            if attribute is None:
+                # Not a treatment of this type of calf
+                continue
+
+            prev_treatment = self.get_previous_treatment(dependent_type)
+            if type(prev_treatment) not in changed:
+                continue
+
+            treatment = getattr(self, attribute)
+            if treatment is None:
+                if self.requires_treatment(dependent_type):
+                    setattr(self, attribute, dependent_type(prev_treatment))
+                    changed.add(dependent_type)
+            elif treatment.recalculate(prev_treatment):
+                changed.add(dependent_type)
+
+    def recalculate_treatment(self, treatment_type: type[Treatment]):
+        # E.g. after its previous treatment was replaced or removed
+        treatment = self.get_treatment(treatment_type)
+        if treatment.recalculate(self.get_previous_treatment(treatment_type)):
+            self.recalculate_dependents(treatment_type)
+
+    def edit_treatment(self, treatment_type: type[Treatment], date: dt.date):
+        """
+            Sets the actual date of a treatment and recalculates the treatments which depend on it
+        :param treatment_type: Type of the edited treatment
+        :param date: Actual date of the treatment
+        :return: None
+        """
+        treatment = self.get_treatment(treatment_type)
+        prev_date = treatment.get_date()
+        treatment.update(date)
+
+        if treatment.get_date() != prev_date:
+            self.recalculate_dependents(treatment_type)
+
+    def edit_birth(self, date: dt.date):
+        self.edit_treatment(Birth, date)
+
+    def edit_bovalto1(self, date: dt.date):
+        self.edit_treatment(Bovalto1, date)
+
     def edit_dehorn(self, date: dt.date):
-        self.dehorn.update(date)
-        self.restall = Restall(self.dehorn)
+        self.edit_treatment(Dehorn, date)
+
+    def edit_restall(self, date: dt.date):
+        self.edit_treatment(Restall, date)
 
     def set_dehorn(self, dehorn: Dehorn):
         self.dehorn = dehorn
-        self.restall = Restall(self.dehorn)
+        self.recalculate_treatment(Restall)
 
     def reset_dehorn(self, date: dt.date, dehorning_required: bool):
-        self._DEHORNING_REQUIRED = dehorning_required
-        self.dehorn = Dehorn(self.bovalto_1) if self.dehorning_required else None
+        if self.dehorn is not None and not dehorning_required:
+            self._DIRTY = True
+            Changes.count += 1
 
-        if self.dehorn is not None and self.dehorn.expected_date != date:
+        self._DEHORNING_REQUIRED = dehorning_required
+        if not self.dehorning_required:
+            self.dehorn = None
+            self.recalculate_treatment(Restall)
+            return
+
+        if self.dehorn is None:
+            self.dehorn = Dehorn(self.bovalto_1)
+            prev_date = None
+        else:
+            prev_date = self.dehorn.get_date()
+            self.dehorn.recalculate(self.bovalto_1)
+
+        if self.dehorn.expected_date != date:
             self.dehorn.update(date)
 
-        self.restall = Restall(self.dehorn or self.bovalto_1)
+        if self.dehorn.get_date() != prev_date:
+            self.recalculate_dependents(Dehorn)
 
     def delete_dehorn(self):
+        if self.dehorn is not None:
+            self._DIRTY = True
+            Changes.count += 1
+
         self._DEHORNING_REQUIRED = False
         self.dehorn = None
-        self.restall = Restall(self.bovalto_1)
+        self.recalculate_treatment(Restall)
 
     def print_treatment_dates(self):
         for treatment in self.treatments:
@@ -118,6 +287,15 @@ class Calf:
 
 
 class FatteningCalf(Calf):
+    __slots__ = ("sell",)
+
+    sell: Sell
+    _TREATMENT_ATTRIBUTES = {**Calf._TREATMENT_ATTRIBUTES, Sell: "sell"}
+
+    @property
+    def treatments(self) -> list[Bovalto1 | Dehorn | Restall | Sell]:
+        return [self.bovalto_1, self.dehorn, self.restall, self.sell]
+
     def __init__(
         self,
         birthday: dt.date | str,
@@ -126,12 +304,7 @@ class FatteningCalf(Calf):
         dehorning_required: bool,
     ):
         super().__init__(birthday, gender, ear_tag, dehorning_required)
-        self.bovalto_1 = Bovalto1(self.birth)
-        self.dehorn = Dehorn(self.bovalto_1) if self.dehorning_required else None
-        self.restall = Restall(self.dehorn or self.bovalto_1)
-        self.sell = Sell(self.birth)
-
-        self.__update_treatments()
+        self.create_treatments()
 
     def __repr__(self):
         return f"FatteningCalf({self.ear_tag})"
@@ -183,6 +356,10 @@ class FatteningCalf(Calf):
         restall: Restall,
         sell: Sell,
     ):
+        # Treatments might have been removed
+        self._DIRTY = True
+        Changes.count += 1
+
         self.birth = birth
         self.bovalto_1 = bovalto1
 
@@ -193,51 +370,36 @@ class FatteningCalf(Calf):
         self.restall = restall
         self.sell = sell
 
-        self.__update_treatments()
-
-    def __update_treatments(self):
-        self._TREATMENTS = [self.bovalto_1, self.dehorn, self.restall, self.sell]
-
-    def edit_birth(self, date: dt.date):
-        self.birth.update(date)
-        self.bovalto_1 = Bovalto1(self.birth)
-        self.dehorn = Dehorn(self.bovalto_1) if self.dehorning_required else None
-        self.restall = Restall(self.dehorn or self.bovalto_1)
-        self.sell = Sell(self.birth)
-        self.__update_treatments()
-
-    def edit_bovalto1(self, date: dt.date):
-        self.bovalto_1.update(date)
-        self.dehorn = Dehorn(self.bovalto_1) if self.dehorning_required else None
-        self.restall = Restall(self.dehorn or self.bovalto_1)
-        self.__update_treatments()
-
-    def edit_dehorn(self, date: dt.date):
-        super().edit_dehorn(date)
-        self.__update_treatments()
-
-    def set_dehorn(self, dehorn: Dehorn):
-        super().set_dehorn(dehorn)
-        self.__update_treatments()
-
-    def reset_dehorn(self, date: dt.date, dehorning_required: bool):
-        super().reset_dehorn(date, dehorning_required)
-        self.__update_treatments()
-
-    def delete_dehorn(self):
-        super().delete_dehorn()
-        self.__update_treatments()
-
-    def edit_restall(self, date: dt.date):
-        self.restall.update(date)
-        self.__update_treatments()
-
     def edit_sell(self, date: dt.date):
-        self.sell.update(date)
-        self.__update_treatments()
+        self.edit_treatment(Sell, date)
 
 
 class BreedingCalf(Calf):
+    __slots__ = ("bovalto_2", "ringworm_1", "ringworm_2")
+
+    bovalto_2: Bovalto2
+    ringworm_1: Ringworm1 | None
+    ringworm_2: Ringworm2 | None
+    _TREATMENT_ATTRIBUTES = {
+        **Calf._TREATMENT_ATTRIBUTES,
+        Bovalto2: "bovalto_2",
+        Ringworm1: "ringworm_1",
+        Ringworm2: "ringworm_2",
+    }
+
+    @property
+    def treatments(
+        self,
+    ) -> list[Bovalto1 | Dehorn | Restall | Bovalto2 | Ringworm1 | Ringworm2]:
+        return [
+            self.bovalto_1,
+            self.dehorn,
+            self.restall,
+            self.bovalto_2,
+            self.ringworm_1,
+            self.ringworm_2,
+        ]
+
     def __init__(
         self,
         birthday: dt.date | str,
@@ -246,14 +408,7 @@ class BreedingCalf(Calf):
         dehorning_required: bool,
     ):
         super().__init__(birthday, gender, ear_tag, dehorning_required)
-
-        self.bovalto_1 = Bovalto1(self.birth)
-        self.dehorn = Dehorn(self.bovalto_1) if self.dehorning_required else None
-        self.restall = Restall(self.dehorn or self.bovalto_1)
-        self.bovalto_2 = Bovalto2(self.bovalto_1)
-        self.ringworm_1 = Ringworm1(self.bovalto_2)
-        self.ringworm_2 = Ringworm2(self.ringworm_1)
-        self.__update_treatments()
+        self.create_treatments()
 
     def __repr__(self):
         return f"BreedingCalf({self.ear_tag})"
@@ -266,16 +421,6 @@ class BreedingCalf(Calf):
 
         return printed_string
 
-    def __update_treatments(self):
-        self._TREATMENTS = [
-            self.bovalto_1,
-            self.dehorn,
-            self.restall,
-            self.bovalto_2,
-            self.ringworm_1,
-            self.ringworm_2,
-        ]
-
     def as_tuple(
         self,
     ) -> tuple[
@@ -317,6 +462,10 @@ class BreedingCalf(Calf):
         ringworm1: Ringworm1 | None,
         ringworm2: Ringworm2 | None,
     ):
+        # Treatments might have been removed
+        self._DIRTY = True
+        Changes.count += 1
+
         self.birth = birth
         self.bovalto_1 = bovalto1
 
@@ -329,62 +478,16 @@ class BreedingCalf(Calf):
         self.ringworm_1 = ringworm1
         self.ringworm_2 = ringworm2
 
-        self.__update_treatments()
-
-    def edit_birth(self, date: dt.date):
-        self.birth.update(date)
-        self.bovalto_1 = Bovalto1(self.birth)
-        self.dehorn = Dehorn(self.bovalto_1) if self.dehorning_required else None
-        self.restall = Restall(self.dehorn or self.bovalto_1)
-        self.bovalto_2 = Bovalto2(self.bovalto_1)
-        self.ringworm_1 = Ringworm1(self.bovalto_2)
-        self.ringworm_2 = Ringworm2(self.ringworm_1)
-        self.__update_treatments()
-
-    def edit_bovalto1(self, date: dt.date):
-        self.bovalto_1.update(date)
-        self.dehorn = Dehorn(self.bovalto_1) if self.dehorning_required else None
-        self.restall = Restall(self.dehorn or self.bovalto_1)
-        self.bovalto_2 = Bovalto2(self.bovalto_1)
-        self.ringworm_1 = Ringworm1(self.bovalto_2)
-        self.ringworm_2 = Ringworm2(self.ringworm_1)
-        self.__update_treatments()
-
-    def edit_dehorn(self, date: dt.date):
-        super().edit_dehorn(date)
-        self.__update_treatments()
-
-    def set_dehorn(self, dehorn: Dehorn):
-        super().set_dehorn(dehorn)
-        self.__update_treatments()
-
-    def reset_dehorn(self, date: dt.date, dehorning_required: bool):
-        super().reset_dehorn(date, dehorning_required)
-        self.__update_treatments()
-
-    def delete_dehorn(self):
-        super().delete_dehorn()
-        self.__update_treatments()
-
-    def edit_restall(self, date: dt.date):
-        self.restall.update(date)
-        self.__update_treatments()
-
     def edit_bovalto2(self, date: dt.date):
-        self.bovalto_2.update(date)
-
-        self.ringworm_1 = Ringworm1(self.bovalto_2)
-        self.ringworm_2 = Ringworm2(self.ringworm_1)
-        self.__update_treatments()
+        self.edit_treatment(Bovalto2, date)
 
     def edit_ringworm1(self, date: dt.date):
         if self.ringworm_1 is None:
             self.ringworm_1 = Ringworm1(self.bovalto_2)
-
-        self.ringworm_1.update(date)
-
-        self.ringworm_2 = Ringworm2(self.ringworm_1)
-        self.__update_treatments()
+            self.ringworm_1.update(date)
+            self.recalculate_dependents(Ringworm1)
+        else:
+            self.edit_treatment(Ringworm1, date)
 
     def set_ringworm1(self, ringworm1: Ringworm1):
         """
@@ -393,9 +496,7 @@ class BreedingCalf(Calf):
         :return: None
         """
         self.ringworm_1 = ringworm1
-        self.ringworm_2 = Ringworm2(self.ringworm_1)
-
-        self.__update_treatments()
+        self.recalculate_dependents(Ringworm1)
 
     def recalc_ringworm(self, bovalto2: Bovalto2):
         """
@@ -403,23 +504,31 @@ class BreedingCalf(Calf):
         :param bovalto2: Bovalto 2 treatment used as base
         :return: None
         """
-        self.ringworm_1 = Ringworm1(bovalto2)
-        self.ringworm_2 = Ringworm2(self.ringworm_1)
+        ringworm1 = Ringworm1(bovalto2)
+        ringworm2 = Ringworm2(ringworm1)
 
-        self.__update_treatments()
+        # Keep the current treatments if nothing changed,
+        # so they don't have to be saved again
+        if not ringworm1.has_same_dates(self.ringworm_1):
+            self.ringworm_1 = ringworm1
+        if not ringworm2.has_same_dates(self.ringworm_2):
+            self.ringworm_2 = ringworm2
 
     def edit_ringworm2(self, date: dt.date):
-        self.ringworm_2.update(date)
-
-        self.__update_treatments()
+        self.edit_treatment(Ringworm2, date)
 
     def delete_ringworm1(self):
+        if self.ringworm_1 is not None:
+            self._DIRTY = True
+            Changes.count += 1
         self.ringworm_1 = None
 
     def delete_ringworm2(self):
+        if self.ringworm_2 is not None:
+            self._DIRTY = True
+            Changes.count += 1
         self.ringworm_2 = None
 
     def delete_ringworm(self):
         self.delete_ringworm1()
         self.delete_ringworm2()
-        self.__update_treatments()
@@ -1,7 +1,10 @@
 from datetime import date
 
 from models.calf import FatteningCalf, BreedingCalf
+from models.job_index import JobIndex
+from models.ringworm import RingwormCohorts
 from models.treatment import (
+    Treatment,
     Birth,
     Bovalto1,
     Dehorn,
@@ -10,34 +13,83 @@ from models.treatment import (
     Bovalto2,
     Ringworm1,
     Ringworm2,
+    Changes,
 )
 from typing import Type, Union, List, Tuple
 import datetime as dt
+import itertools
+import logging
+
+logger = logging.getLogger(__name__)
 
 
 class Farm:
-    fattening_calves: list[FatteningCalf]
-    breeding_calves: list[BreedingCalf]
+    _fattening_calves: dict[int, FatteningCalf]
+    _breeding_calves: dict[int, BreedingCalf]
+    _calves: dict[int, FatteningCalf | BreedingCalf]
+    _sequence_numbers: dict[int, int]
+    _ringworm_cohorts: RingwormCohorts
+    _job_index: JobIndex
+    _deleted_ear_tags: set[int]
+    _renamed_ear_tags: dict[int, int]
+    _deleted_renamed_ear_tags: dict[int, int]
+    _clean_at: int | None
 
     def __init__(self):
-        self.fattening_calves = []
-        self.breeding_calves = []
+        # Calves by ear tag, fattening calves in the order they were added
+        self._fattening_calves = {}
+        self._breeding_calves = {}
+
+        # Index of all calves by ear tag
+        self._calves = {}
+
+        # Order in which the calves were added, used to sort the calves and jobs
+        self._sequence_numbers = {}
+        self._sequence_counter = itertools.count()
+
+        # Breeding calves ordered by birth date and grouped for the ringworm treatments
+        self._ringworm_cohorts = RingwormCohorts()
+
+        # Index of the treatments of all calves by week and day
+        self._job_index = JobIndex()
+
+        # Ear tags of calves which have been removed since the farm was last saved
+        self._deleted_ear_tags = set()
+
+        # Stored ear tags of calves whose ear tag has been changed since the farm was last saved,
+        # by their current ear tag
+        self._renamed_ear_tags = {}
+
+        # Stored ear tags of renamed calves which were deleted, by their ear tag at the deletion.
+        # If a calf is added again with this ear tag (e.g. to change its type), the rename is kept.
+        self._deleted_renamed_ear_tags = {}
+
+        # Changes.count when the farm last had no changes, None if calves were added since
+        self._clean_at = None
 
     def __sizeof__(self):
-        return len(self.fattening_calves) + len(self.breeding_calves)
+        return len(self._calves)
 
     def __len__(self):
-        return len(self.fattening_calves) + len(self.breeding_calves)
+        return len(self._calves)
 
     def __str__(self):
-        return f"Farm with {len(self.fattening_calves)} fattening calves and {len(self.breeding_calves)} breeding calves"
+        return f"Farm with {len(self._fattening_calves)} fattening calves and {len(self._breeding_calves)} breeding calves"
 
     def __repr__(self):
         return f"Farm({self.fattening_calves}, {self.breeding_calves})"
 
     @property
     def size(self):
-        return len(self.fattening_calves) + len(self.breeding_calves)
+        return len(self._calves)
+
+    @property
+    def fattening_calves(self) -> list[FatteningCalf]:
+        return list(self._fattening_calves.values())
+
+    @property
+    def breeding_calves(self) -> list[BreedingCalf]:
+        return self._ringworm_cohorts.calves
 
     def add_calves(
         self, calves: list[FatteningCalf | BreedingCalf], set_ringworm: bool = True
@@ -46,10 +98,6 @@ class Farm:
             self.add_calf(calf, set_ringworm)
 
     def add_calf(self, calf: FatteningCalf | BreedingCalf, set_ringworm: bool = True):
-        # Ear tags must be unique
-        if calf.ear_tag in self.get_all_ear_tags():
-            raise Exception(f"Ear tag {calf.ear_tag} already exists")
-
         if isinstance(calf, FatteningCalf):
             self.__add_fattening_calf(calf)
         elif isinstance(calf, BreedingCalf):
@@ -59,25 +107,72 @@ class Farm:
                 f"Calf[{calf.ear_tag}] must be either FatteningCalf or BreedingCalf"
             )
 
-    def __add_fattening_calf(self, calf: FatteningCalf):
+    def __add_to_index(self, calf: FatteningCalf | BreedingCalf):
         # Ear tags must be unique
-        if calf.ear_tag in self.get_all_ear_tags():
+        if calf.ear_tag in self._calves:
             raise Exception(f"Ear tag {calf.ear_tag} already exists")
 
-        self.fattening_calves.append(calf)
+        self._calves[calf.ear_tag] = calf
+        self._sequence_numbers[calf.ear_tag] = next(self._sequence_counter)
+        self._job_index.add(calf)
+
+        # The calf might have changed before it was added
+        self._clean_at = None
+
+        # A calf with this ear tag might have been deleted before, e.g. to change its type.
+        # Its rows are overwritten when the new calf is saved.
+        self._deleted_ear_tags.discard(calf.ear_tag)
+
+        # If the deleted calf was renamed, its stored rows are renamed instead of deleted,
+        # so its weights are kept
+        stored_ear_tag = self._deleted_renamed_ear_tags.pop(calf.ear_tag, None)
+        if stored_ear_tag in self._deleted_ear_tags:
+            self._deleted_ear_tags.discard(stored_ear_tag)
+            self._renamed_ear_tags[calf.ear_tag] = stored_ear_tag
+
+    def __add_fattening_calf(self, calf: FatteningCalf):
+        self.__add_to_index(calf)
+        self._fattening_calves[calf.ear_tag] = calf
 
     def __add_breeding_calf(self, calf: BreedingCalf, set_ringworm: bool = True):
-        # Ear tags must be unique
-        if calf.ear_tag in self.get_all_ear_tags():
-            raise Exception(f"Ear tag {calf.ear_tag} already exists")
+        self.__add_to_index(calf)
+        self._breeding_calves[calf.ear_tag] = calf
 
-        self.breeding_calves.append(calf)
-        if set_ringworm:
-            self.set_ringworm()
+        changed_calves = self._ringworm_cohorts.insert(
+            calf, self._sequence_numbers[calf.ear_tag], regroup=set_ringworm
+        )
+        self.__update_ringworm_jobs(changed_calves)
 
     def change_ear_tag(self, old_ear_tag: int, new_ear_tag: int):
-        calf = self.get_calf(old_ear_tag)
+        if old_ear_tag == new_ear_tag:
+            return
+
+        # Ear tags must be unique
+        if new_ear_tag in self._calves:
+            raise Exception(f"Ear tag {new_ear_tag} already exists")
+
+        calf = self._calves.pop(old_ear_tag)
+        self._job_index.remove(old_ear_tag)
+
         calf.change_ear_tag(new_ear_tag)
+        self._calves[new_ear_tag] = calf
+        self._sequence_numbers[new_ear_tag] = self._sequence_numbers.pop(old_ear_tag)
+        self._job_index.add(calf)
+
+        if isinstance(calf, FatteningCalf):
+            # Keep the position of the calf within its list
+            self._fattening_calves = {
+                (new_ear_tag if ear_tag == old_ear_tag else ear_tag): fattening_calf
+                for ear_tag, fattening_calf in self._fattening_calves.items()
+            }
+        else:
+            # Breeding calves are ordered by the cohorts
+            self._breeding_calves[new_ear_tag] = self._breeding_calves.pop(old_ear_tag)
+
+        # The stored rows are changed in place, so the weights and treatments are kept
+        stored_ear_tag = self._renamed_ear_tags.pop(old_ear_tag, old_ear_tag)
+        if stored_ear_tag != new_ear_tag:
+            self._renamed_ear_tags[new_ear_tag] = stored_ear_tag
 
     def edit_calf(
         self,
@@ -134,29 +229,47 @@ class Farm:
             elif treatment_type == Ringworm2:
                 calf.edit_ringworm2(date)
 
-        self.set_ringworm()
+        self.refresh_calf(ear_tag)
+
+    def refresh_calf(self, ear_tag: int, set_ringworm: bool = True):
+        """
+        Updates the jobs and the ringworm cohorts of a calf which was edited directly, e.g. with calf.edit_birth.
+
+        :param ear_tag: Ear tag of the edited calf
+        :param set_ringworm: If False, the cohorts are regrouped by the next change
+        """
+        calf = self.get_calf(ear_tag)
+        self._job_index.update(calf)
+
+        # Only the cohorts next to the calf have to be regrouped
+        if isinstance(calf, BreedingCalf):
+            changed_calves = self._ringworm_cohorts.update(calf, regroup=set_ringworm)
+        else:
+            changed_calves = (
+                self._ringworm_cohorts.ensure_grouped() if set_ringworm else []
+            )
+        self.__update_ringworm_jobs(changed_calves)
 
     def get_fattening_calf(self, ear_tag: int) -> FatteningCalf:
-        for calf in self.fattening_calves:
-            if calf.ear_tag == ear_tag:
-                return calf
-        raise Exception(f"Fattening calf with ear tag {ear_tag} not found")
+        calf = self._fattening_calves.get(ear_tag)
+        if calf is None:
+            raise Exception(f"Fattening calf with ear tag {ear_tag} not found")
+        return calf
 
     def get_breeding_calf(self, ear_tag: int) -> BreedingCalf:
-        for calf in self.breeding_calves:
-            if calf.ear_tag == ear_tag:
-                return calf
-        raise Exception(f"Breeding calf with ear tag {ear_tag} not found")
+        calf = self._breeding_calves.get(ear_tag)
+        if calf is None:
+            raise Exception(f"Breeding calf with ear tag {ear_tag} not found")
+        return calf
 
     def get_calf(self, ear_tag: int) -> FatteningCalf | BreedingCalf | None:
-        try:
-            return self.get_fattening_calf(ear_tag)
-        except Exception:
-            try:
-                return self.get_breeding_calf(ear_tag)
-            except Exception:
-                print(f"Calf with ear tag {ear_tag} not found")
-                return None
+        calf = self._calves.get(ear_tag)
+        if calf is None:
+            logger.debug("Calf with ear tag %s not found", ear_tag)
+        return calf
+
+    def has_calf(self, ear_tag: int) -> bool:
+        return ear_tag in self._calves
 
     def get_calves(self) -> list[FatteningCalf | BreedingCalf]:
         return self.fattening_calves + self.breeding_calves
@@ -191,120 +304,147 @@ class Farm:
         return [calf.ear_tag for calf in self.breeding_calves]
 
     def get_fattening_calves_ear_tags(self) -> list[int]:
-        return [calf.ear_tag for calf in self.fattening_calves]
+        return list(self._fattening_calves)
 
     def get_all_ear_tags(self) -> list[int]:
-        return [calf.ear_tag for calf in self.get_calves()]
+        return self.get_fattening_calves_ear_tags() + self.get_breeding_calves_ear_tags()
 
     def delete_calf(self, ear_tag: int, set_ringworm: bool = True):
-        self.breeding_calves = list(
-            filter(lambda x: x.ear_tag != ear_tag, self.breeding_calves)
-        )
-        self.fattening_calves = list(
-            filter(lambda x: x.ear_tag != ear_tag, self.fattening_calves)
-        )
+        calf = self._calves.pop(ear_tag, None)
+        if isinstance(calf, BreedingCalf):
+            del self._breeding_calves[ear_tag]
+            changed_calves = self._ringworm_cohorts.remove(calf, regroup=set_ringworm)
+        else:
+            if calf is not None:
+                del self._fattening_calves[ear_tag]
+            changed_calves = (
+                self._ringworm_cohorts.ensure_grouped() if set_ringworm else []
+            )
 
-        if set_ringworm:
-            self.set_ringworm()
+        if calf is not None:
+            stored_ear_tag = self._renamed_ear_tags.pop(ear_tag, ear_tag)
+            self._deleted_ear_tags.add(stored_ear_tag)
+            if stored_ear_tag != ear_tag:
+                self._deleted_renamed_ear_tags[ear_tag] = stored_ear_tag
+            self._sequence_numbers.pop(ear_tag)
+            self._job_index.remove(ear_tag)
+
+        self.__update_ringworm_jobs(changed_calves)
 
     def set_ringworm(self):
-        self.breeding_calves.sort(key=lambda calf: calf.birth.expected_date)
-
-        i = 1
-        ear_tag_slice = []
-        ear_tag_slices = []
-        for j in range(len(self.breeding_calves)):
-            # Create slices of at least five calves
-            cur = self.breeding_calves[j]
-            cur_expected_ringworm1 = Ringworm1(cur.bovalto_2)
-
-            if j != len(self.breeding_calves) - 1:
-                next_ = self.breeding_calves[j + 1]
-                next_expected_ringworm1 = Ringworm1(next_.bovalto_2)
-                if (
-                    cur_expected_ringworm1.get_week()
-                    == next_expected_ringworm1.get_week()
-                    or i < 5
-                ):
-                    #
-                    ear_tag_slice.append(cur.ear_tag)
-                    i += 1
-                else:
-                    ear_tag_slice.append(cur.ear_tag)
-                    ear_tag_slices.append(ear_tag_slice)
-                    ear_tag_slice = []
-                    i = 1
-            else:
-                # Last calf to be sorted
-                ear_tag_slice.append(cur.ear_tag)
-                ear_tag_slices.append(ear_tag_slice)
-
-        for ear_tags_list in ear_tag_slices:
-            print(f"Ear tags in this week: {ear_tags_list}")
-            if len(ear_tags_list) >= 5:
-                max_bovalto2_breeding_calf = max(
-                    (self.get_breeding_calf(ear_tag) for ear_tag in ear_tags_list),
-                    key=lambda calf: calf.bovalto_2,
-                    default=None,
-                )
-
-                for calf in self.breeding_calves:
-                    if calf.ear_tag in ear_tags_list:
-                        calf.recalc_ringworm(max_bovalto2_breeding_calf.bovalto_2)
-
-                print(
-                    f"The maximum Bovalto2 date among the selected ear tags is: {max_bovalto2_breeding_calf.bovalto_2}"
-                )
-
-            else:
-                print("There are less than five calves in this week.")
-                for calf in self.breeding_calves:
-                    if calf.ear_tag in ear_tags_list:
-                        calf.delete_ringworm()
-
-    def get_jobs_in_week(self, calendar_week: int) -> list[tuple[int, str, dt.date]]:
-        jobs = []
-        for calf in self.breeding_calves:
-            for treatment in calf.treatments:
-                if treatment is not None and treatment.get_week() == calendar_week:
-                    jobs.append(
-                        (
-                            calf.ear_tag,
-                            treatment.display_name,
-                            treatment.expected_date,
-                        )
-                    )
-
-        for calf in self.fattening_calves:
-            for treatment in calf.treatments:
-                if treatment is not None and treatment.get_week() == calendar_week:
-                    jobs.append(
-                        (
-                            calf.ear_tag,
-                            treatment.display_name,
-                            treatment.expected_date,
-                        )
-                    )
-
-        return jobs
+        """
+        Regroups all breeding calves into cohorts and recalculates their ringworm treatments
+        """
+        self.__update_ringworm_jobs(self._ringworm_cohorts.regroup())
+
+    def __update_ringworm_jobs(self, calves: list[BreedingCalf]):
+        # Reindex the calves whose ringworm treatments were replaced
+        for calf in calves:
+            self._job_index.update(calf)
+
+    def __sort_jobs(
+        self, jobs: list[tuple[int, int, Treatment]]
+    ) -> list[tuple[int, str, dt.date]]:
+        # Breeding calves first, then fattening calves, each in the order of their list.
+        # The treatments of a calf are kept in their order.
+        jobs = sorted(jobs, key=lambda job: (*self.__get_order_key(job[0]), job[1]))
+
+        return [
+            (ear_tag, treatment.display_name, treatment.expected_date)
+            for ear_tag, _, treatment in jobs
+        ]
+
+    def __get_order_key(self, ear_tag: int) -> tuple:
+        if ear_tag in self._fattening_calves:
+            return True, self._sequence_numbers[ear_tag]
+
+        return False, *self._ringworm_cohorts.get_key(self._breeding_calves[ear_tag])
+
+    def get_jobs_in_week(
+        self, calendar_week: int, year: int | None = None
+    ) -> list[tuple[int, str, dt.date]]:
+        """
+        Returns (ear tag, treatment, expected date) for all treatments due in the given calendar week.
+
+        :param calendar_week: ISO calendar week
+        :param year: ISO year of the calendar week, if None the week of every year is returned
+        :return: list of jobs
+        """
+        if year is None:
+            jobs = self._job_index.get_calendar_week(calendar_week)
+        else:
+            jobs = self._job_index.get_week(year, calendar_week)
+
+        return self.__sort_jobs(jobs)
+
+    def get_jobs_on_day(self, day: dt.date) -> list[tuple[int, str, dt.date]]:
+        """
+        Returns (ear tag, treatment, expected date) for all treatments due on the given day.
+        """
+        return self.__sort_jobs(self._job_index.get_day(day))
 
     def get_max_breeding_calf_ear_tag(self):
         # There might be some calves with ear tags starting with 99 (falsly tagged)
         filtered_tags = [
             int(calf.ear_tag)
-            for calf in self.breeding_calves
+            for calf in self._breeding_calves.values()
             if not str(calf.ear_tag).startswith("99")
         ]
         return max(filtered_tags, default=0)
 
     def get_max_fattening_calf_ear_tag(self):
         return max(
-            (calf.ear_tag for calf in self.fattening_calves),
+            (calf.ear_tag for calf in self._fattening_calves.values()),
             default=0,
         )
 
     def delete_calves(self, ear_tags: list[int]):
         for ear_tag in ear_tags:
-            self.delete_calf(ear_tag, set_ringworm=False)
-
-        self.set_ringworm()
+            self.delete_calf(ear_tag)
+
+    def get_changed_calves(self) -> list[FatteningCalf | BreedingCalf]:
+        """
+        Returns all calves which have been added or changed since the farm was last saved
+        """
+        return [calf for calf in self.get_calves() if calf.has_changes()]
+
+    def has_changes(self) -> bool:
+        """
+        Returns True if calves have been added, changed or deleted since the farm was last saved
+        """
+        if len(self._deleted_ear_tags) > 0 or len(self._renamed_ear_tags) > 0:
+            return True
+
+        # Only look for changed calves if a calf or treatment has changed since the last look
+        count = Changes.count
+        if self._clean_at == count:
+            return False
+        if any(calf.has_changes() for calf in self._calves.values()):
+            return True
+        self._clean_at = count
+        return False
+
+    def get_deleted_ear_tags(self) -> set[int]:
+        """
+        Returns the ear tags of all calves which have been deleted since the farm was last saved
+        """
+        return set(self._deleted_ear_tags)
+
+    def get_renamed_ear_tags(self) -> dict[int, int]:
+        """
+        Returns the stored ear tags of all calves whose ear tag has been changed since the farm was last saved,
+        by their current ear tag
+        """
+        return dict(self._renamed_ear_tags)
+
+    def mark_clean(self):
+        """
+        Marks all calves as saved, e.g. after the changes have been written to the database
+        """
+        for calf in self.get_changed_calves():
+            calf.mark_clean()
+
+        self._deleted_ear_tags.clear()
+        self._renamed_ear_tags.clear()
+        self._deleted_renamed_ear_tags.clear()
+        self._clean_at = Changes.count
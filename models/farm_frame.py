@@ -0,0 +1,299 @@
+import datetime as dt
+import numpy as np
+from models.calf import FatteningCalf, BreedingCalf
+from models.farm import Farm
+from models.gender import Gender
+from models.treatment import (
+    Treatment,
+    Birth,
+    Bovalto1,
+    Dehorn,
+    Restall,
+    Sell,
+    Bovalto2,
+    Ringworm1,
+    Ringworm2,
+)
+
+# Column of each treatment in the planned and actual dates
+TREATMENTS = (Birth, Bovalto1, Dehorn, Restall, Sell, Bovalto2, Ringworm1, Ringworm2)
+# Codes of the calf types and genders
+CALF_TYPES = (FatteningCalf, BreedingCalf)
+GENDERS = tuple(Gender)
+
+NOT_A_TIME = np.datetime64("NaT", "D")
+
+
+def get_iso_calendar(dates: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Vectorized date.isocalendar()
+
+    :param dates: datetime64[D] array of any shape
+    :return: ISO years and weeks, 0 where the date is NaT
+    """
+    missing = np.isnat(dates)
+    days = np.where(missing, 0, dates.astype(np.int64))
+
+    # 1970-01-01 was a Thursday, the ISO year of a week is the year of its Thursday
+    weekdays = (days + 3) % 7
+    thursdays = days - weekdays + 3
+    years = thursdays.astype("datetime64[D]").astype("datetime64[Y]")
+    weeks = (thursdays - years.astype("datetime64[D]").astype(np.int64)) // 7 + 1
+
+    years = years.astype(np.int64) + 1970
+    return np.where(missing, 0, years), np.where(missing, 0, weeks)
+
+
+class FarmFrame:
+    """
+    Columnar copy of a Farm for analytics and bulk operations.
+
+    Every calf is a row, the treatments are the columns of the planned and actual
+    dates in the order of TREATMENTS. Missing treatments and actual dates are NaT.
+    """
+
+    _ear_tags: np.ndarray  # int64
+    _calf_types: np.ndarray  # int8, index into CALF_TYPES
+    _genders: np.ndarray  # int8, index into GENDERS
+    _dehorning_required: np.ndarray  # bool
+    _birthdays: np.ndarray  # datetime64[D]
+    _planned: np.ndarray  # datetime64[D], one column per treatment
+    _actual: np.ndarray  # datetime64[D], one column per treatment
+    _calendar: tuple[np.ndarray, np.ndarray] | None  # ISO years and weeks of the dates
+
+    def __init__(
+        self,
+        ear_tags: np.ndarray,
+        calf_types: np.ndarray,
+        genders: np.ndarray,
+        dehorning_required: np.ndarray,
+        birthdays: np.ndarray,
+        planned: np.ndarray,
+        actual: np.ndarray,
+    ):
+        size = len(ear_tags)
+        if not (
+            len(calf_types) == len(genders) == len(dehorning_required) == size
+            and len(birthdays) == size
+            and planned.shape == actual.shape == (size, len(TREATMENTS))
+        ):
+            raise ValueError("All columns must have one entry per calf")
+
+        self._ear_tags = np.asarray(ear_tags, dtype=np.int64)
+        self._calf_types = np.asarray(calf_types, dtype=np.int8)
+        self._genders = np.asarray(genders, dtype=np.int8)
+        self._dehorning_required = np.asarray(dehorning_required, dtype=bool)
+        self._birthdays = np.asarray(birthdays, dtype="datetime64[D]")
+        self._planned = np.asarray(planned, dtype="datetime64[D]")
+        self._actual = np.asarray(actual, dtype="datetime64[D]")
+        self._calendar = None
+
+    def __len__(self):
+        return len(self._ear_tags)
+
+    def __getitem__(self, rows: np.ndarray | slice) -> "FarmFrame":
+        # Select calves by a boolean mask, indices or a slice
+        return FarmFrame(
+            self._ear_tags[rows],
+            self._calf_types[rows],
+            self._genders[rows],
+            self._dehorning_required[rows],
+            self._birthdays[rows],
+            self._planned[rows],
+            self._actual[rows],
+        )
+
+    def __repr__(self):
+        return f"FarmFrame({len(self)} calves)"
+
+    @property
+    def ear_tags(self) -> np.ndarray:
+        return self._ear_tags
+
+    @property
+    def calf_types(self) -> np.ndarray:
+        return self._calf_types
+
+    @property
+    def genders(self) -> np.ndarray:
+        return self._genders
+
+    @property
+    def dehorning_required(self) -> np.ndarray:
+        return self._dehorning_required
+
+    @property
+    def birthdays(self) -> np.ndarray:
+        return self._birthdays
+
+    @property
+    def planned(self) -> np.ndarray:
+        return self._planned
+
+    @property
+    def actual(self) -> np.ndarray:
+        return self._actual
+
+    @property
+    def dates(self) -> np.ndarray:
+        # The actual date if the treatment was done, otherwise the planned date
+        return np.where(np.isnat(self._actual), self._planned, self._actual)
+
+    @property
+    def nbytes(self) -> int:
+        return sum(
+            column.nbytes
+            for column in (
+                self._ear_tags,
+                self._calf_types,
+                self._genders,
+                self._dehorning_required,
+                self._birthdays,
+                self._planned,
+                self._actual,
+            )
+        )
+
+    @staticmethod
+    def column(treatment: type[Treatment]) -> int:
+        return TREATMENTS.index(treatment)
+
+    @classmethod
+    def from_farm(cls, farm: Farm) -> "FarmFrame":
+        """
+        Copies all calves of a farm, in the order of Farm.get_calves().
+        """
+        calves = farm.get_calves()
+
+        planned = np.full((len(calves), len(TREATMENTS)), NOT_A_TIME)
+        actual = np.full((len(calves), len(TREATMENTS)), NOT_A_TIME)
+        for row, calf in enumerate(calves):
+            for treatment in [calf.birth] + calf.treatments:
+                if treatment is not None:
+                    column = cls.column(type(treatment))
+                    planned[row, column] = treatment.expected_date
+                    if treatment.actual_date is not None:
+                        actual[row, column] = treatment.actual_date
+
+        return cls(
+            np.fromiter((calf.ear_tag for calf in calves), np.int64, len(calves)),
+            np.fromiter(
+                (CALF_TYPES.index(type(calf)) for calf in calves), np.int8, len(calves)
+            ),
+            np.fromiter(
+                (GENDERS.index(calf.gender) for calf in calves), np.int8, len(calves)
+            ),
+            np.fromiter(
+                (calf.dehorning_required for calf in calves), bool, len(calves)
+            ),
+            np.array([calf.birthday for calf in calves], dtype="datetime64[D]"),
+            planned,
+            actual,
+        )
+
+    def to_farm(self) -> Farm:
+        """
+        Creates a farm with a calf for every row. The ringworm treatments are taken
+        as they are instead of being regrouped.
+        """
+        farm = Farm()
+        for row in range(len(self)):
+            farm.add_calf(self.__create_calf(row), set_ringworm=False)
+
+        return farm
+
+    def __get_dates(self, row: int, treatment: type[Treatment]) -> tuple | None:
+        column = self.column(treatment)
+        planned, actual = self._planned[row, column], self._actual[row, column]
+        if np.isnat(planned):
+            return None
+        return planned.item(), None if np.isnat(actual) else actual.item()
+
+    def __create_calf(self, row: int) -> FatteningCalf | BreedingCalf:
+        calf_type = CALF_TYPES[self._calf_types[row]]
+        calf = calf_type(
+            self._birthdays[row].item(),
+            GENDERS[self._genders[row]],
+            int(self._ear_tags[row]),
+            bool(self._dehorning_required[row]),
+        )
+
+        birth = Birth(calf.birthday)
+        birth.reset(*self.__get_dates(row, Birth))
+
+        bovalto1 = Bovalto1(birth)
+        bovalto1.reset(*self.__get_dates(row, Bovalto1))
+
+        dehorn_dates = self.__get_dates(row, Dehorn)
+        if dehorn_dates is not None:
+            dehorn = Dehorn(bovalto1)
+            dehorn.reset(*dehorn_dates)
+        else:
+            dehorn = None
+
+        restall = Restall(dehorn or bovalto1)
+        restall.reset(*self.__get_dates(row, Restall))
+
+        if calf_type is BreedingCalf:
+            bovalto2 = Bovalto2(bovalto1)
+            bovalto2.reset(*self.__get_dates(row, Bovalto2))
+
+            ringworm1_dates = self.__get_dates(row, Ringworm1)
+            if ringworm1_dates is not None:
+                ringworm1 = Ringworm1(bovalto2)
+                ringworm1.reset(*ringworm1_dates)
+            else:
+                ringworm1 = None
+
+            ringworm2_dates = self.__get_dates(row, Ringworm2)
+            if ringworm2_dates is not None:
+                ringworm2 = Ringworm2(ringworm1 or Ringworm1(bovalto2))
+                ringworm2.reset(*ringworm2_dates)
+            else:
+                ringworm2 = None
+
+            calf.reset(birth, bovalto1, dehorn, restall, bovalto2, ringworm1, ringworm2)
+        else:
+            sell = Sell(birth)
+            sell.reset(*self.__get_dates(row, Sell))
+
+            calf.reset(birth, bovalto1, dehorn, restall, sell)
+
+        return calf
+
+    def is_type(self, calf_type: type[FatteningCalf | BreedingCalf]) -> np.ndarray:
+        return self._calf_types == CALF_TYPES.index(calf_type)
+
+    def has_treatment(self, treatment: type[Treatment]) -> np.ndarray:
+        return ~np.isnat(self._planned[:, self.column(treatment)])
+
+    def is_done(self, treatment: type[Treatment]) -> np.ndarray:
+        return ~np.isnat(self._actual[:, self.column(treatment)])
+
+    def is_open(self, treatment: type[Treatment]) -> np.ndarray:
+        return self.has_treatment(treatment) & ~self.is_done(treatment)
+
+    def is_overdue(self, treatment: type[Treatment], day: dt.date) -> np.ndarray:
+        # Open treatments which were planned before the given day
+        return self.is_open(treatment) & (
+            self._planned[:, self.column(treatment)] < np.datetime64(day, "D")
+        )
+
+    def jobs_in_week(self, calendar_week: int, year: int | None = None) -> np.ndarray:
+        """
+        Returns a mask of the treatments due in the given calendar week, one column per treatment.
+
+        :param calendar_week: ISO calendar week
+        :param year: ISO year of the calendar week, if None the week of every year is matched
+        """
+        if self._calendar is None:
+            self._calendar = get_iso_calendar(self.dates)
+
+        years, weeks = self._calendar
+        mask = weeks == calendar_week
+        if year is not None:
+            mask &= years == year
+        return mask
+
+    def has_jobs_in_week(self, calendar_week: int, year: int | None = None) -> np.ndarray:
+        return self.jobs_in_week(calendar_week, year).any(axis=1)
@@ -0,0 +1,132 @@
+import numpy as np
+
+# Percentiles of the herd, e.g. for the daily gain
+PERCENTILES = (10, 25, 50, 75, 90)
+
+
+class HerdGrowth:
+    """
+    Growth of all calves with weights, computed at once from the columns of the weight table.
+
+    A straight line is fitted to the weights of every calf. Its slope is the average daily gain
+    in kg per day, which is NaN if the calf was weighed on fewer than two days.
+    """
+
+    _ear_tags: np.ndarray  # int64, sorted
+    _counts: np.ndarray  # int64, weights per calf
+    _first_dates: np.ndarray  # datetime64[D]
+    _last_dates: np.ndarray  # datetime64[D]
+    _last_weights: np.ndarray  # float64, kg
+    _daily_gains: np.ndarray  # float64, kg per day
+    _intercepts: np.ndarray  # float64, kg of the fitted line at the first date
+
+    def __init__(self, ear_tags: np.ndarray, dates: np.ndarray, weights: np.ndarray):
+        """
+        :param ear_tags: Ear tag of every weight
+        :param dates: datetime64[D] date of every weight
+        :param weights: kg of every weight
+        """
+        if not len(ear_tags) == len(dates) == len(weights):
+            raise ValueError("All columns must have one entry per weight")
+
+        ear_tags = np.asarray(ear_tags, dtype=np.int64)
+        days = np.asarray(dates, dtype="datetime64[D]").astype(np.int64)
+        weights = np.asarray(weights, dtype=np.float64)
+
+        # Group the weights of every calf, ordered by date
+        order = np.lexsort((days, ear_tags))
+        ear_tags, days, weights = ear_tags[order], days[order], weights[order]
+        self._ear_tags, starts, self._counts = np.unique(
+            ear_tags, return_index=True, return_counts=True
+        )
+        calves = np.repeat(np.arange(len(self._ear_tags)), self._counts)
+        ends = starts + self._counts - 1
+
+        # Days since the first weight, which keeps the sums small
+        first_days = days[starts]
+        x = (days - first_days[calves]).astype(np.float64)
+
+        # Least squares per calf from the sums of each group
+        size = len(self._ear_tags)
+        mean_x = np.bincount(calves, x, size) / self._counts
+        mean_y = np.bincount(calves, weights, size) / self._counts
+        variance = np.bincount(calves, x * x, size) / self._counts - mean_x**2
+        covariance = np.bincount(calves, x * weights, size) / self._counts - mean_x * mean_y
+        with np.errstate(divide="ignore", invalid="ignore"):
+            self._daily_gains = np.where(variance > 0, covariance / variance, np.nan)
+        self._intercepts = mean_y - self._daily_gains * mean_x
+
+        self._first_dates = first_days.astype("datetime64[D]")
+        self._last_dates = days[ends].astype("datetime64[D]")
+        self._last_weights = weights[ends]
+
+    def __len__(self):
+        return len(self._ear_tags)
+
+    def __repr__(self):
+        return f"HerdGrowth({len(self)} calves)"
+
+    @property
+    def ear_tags(self) -> np.ndarray:
+        return self._ear_tags
+
+    @property
+    def counts(self) -> np.ndarray:
+        return self._counts
+
+    @property
+    def first_dates(self) -> np.ndarray:
+        return self._first_dates
+
+    @property
+    def last_dates(self) -> np.ndarray:
+        return self._last_dates
+
+    @property
+    def last_weights(self) -> np.ndarray:
+        return self._last_weights
+
+    @property
+    def daily_gains(self) -> np.ndarray:
+        return self._daily_gains
+
+    def get_rows(self, ear_tags: np.ndarray) -> np.ndarray:
+        """
+        Returns the row of every ear tag, or -1 for calves without weights.
+        """
+        ear_tags = np.asarray(ear_tags, dtype=np.int64)
+        if len(self) == 0:
+            return np.full(len(ear_tags), -1)
+
+        rows = np.minimum(np.searchsorted(self._ear_tags, ear_tags), len(self) - 1)
+        return np.where(self._ear_tags[rows] == ear_tags, rows, -1)
+
+    def project(self, ear_tags: np.ndarray, dates: np.ndarray) -> np.ndarray:
+        """
+        Projects the weights of calves at some dates along their fitted lines.
+
+        :param ear_tags: Ear tag of every projection
+        :param dates: datetime64[D] date of every projection
+        :return: kg, NaN for calves without a daily gain
+        """
+        rows = self.get_rows(ear_tags)
+        found = rows >= 0
+        if not found.any():
+            return np.full(len(rows), np.nan)
+
+        rows = np.where(found, rows, 0)
+        dates = np.asarray(dates, dtype="datetime64[D]")
+        days = (dates - self._first_dates[rows]).astype(np.float64)
+        with np.errstate(invalid="ignore"):
+            weights = self._intercepts[rows] + self._daily_gains[rows] * days
+        return np.where(found, weights, np.nan)
+
+    def get_percentiles(self, percentiles=PERCENTILES) -> dict[int, float]:
+        """
+        Returns the percentiles of the daily gain of the herd, NaN if no calf has a daily gain.
+        """
+        gains = self._daily_gains[~np.isnan(self._daily_gains)]
+        if len(gains) == 0:
+            return {percentile: np.nan for percentile in percentiles}
+
+        return dict(zip(percentiles, np.percentile(gains, percentiles).tolist()))
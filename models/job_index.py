@@ -0,0 +1,94 @@
+import datetime as dt
+from models.calf import FatteningCalf, BreedingCalf
+from models.treatment import Treatment
+
+
+class JobIndex:
+    """
+    Index of the treatments of all calves by calendar week and by day.
+
+    A treatment is indexed by its actual date, or its expected date if it hasn't been done yet.
+    The index has to be updated whenever the treatments of a calf change.
+    """
+
+    # (ISO year, ISO week) -> ear tag -> [(position in calf.treatments, treatment)]
+    _by_week: dict[tuple[int, int], dict[int, list[tuple[int, Treatment]]]]
+    # day -> ear tag -> [(position in calf.treatments, treatment)]
+    _by_day: dict[dt.date, dict[int, list[tuple[int, Treatment]]]]
+    # ear tag -> keys the calf is indexed under
+    _keys: dict[int, list[tuple[tuple[int, int], dt.date]]]
+
+    def __init__(self):
+        self._by_week = {}
+        self._by_day = {}
+        self._keys = {}
+
+    def __len__(self):
+        return sum(len(keys) for keys in self._keys.values())
+
+    def add(self, calf: FatteningCalf | BreedingCalf):
+        keys = []
+        for position, treatment in enumerate(calf.treatments):
+            if treatment is None:
+                continue
+
+            week = treatment.get_calendar_week()
+            day = treatment.get_date()
+            self._by_week.setdefault(week, {}).setdefault(calf.ear_tag, []).append(
+                (position, treatment)
+            )
+            self._by_day.setdefault(day, {}).setdefault(calf.ear_tag, []).append(
+                (position, treatment)
+            )
+            keys.append((week, day))
+
+        self._keys[calf.ear_tag] = keys
+
+    def remove(self, ear_tag: int):
+        for week, day in self._keys.pop(ear_tag, []):
+            self.__remove_entry(self._by_week, week, ear_tag)
+            self.__remove_entry(self._by_day, day, ear_tag)
+
+    def update(self, calf: FatteningCalf | BreedingCalf):
+        self.remove(calf.ear_tag)
+        self.add(calf)
+
+    @staticmethod
+    def __remove_entry(index: dict, key, ear_tag: int):
+        entries = index.get(key)
+        if entries is None:
+            return
+
+        entries.pop(ear_tag, None)
+        if len(entries) == 0:
+            del index[key]
+
+    def get_week(self, year: int, calendar_week: int) -> list[tuple[int, int, Treatment]]:
+        """
+        Returns (ear tag, position in calf.treatments, treatment) for all jobs in the given ISO week
+        """
+        return self.__flatten(self._by_week.get((year, calendar_week), {}))
+
+    def get_calendar_week(self, calendar_week: int) -> list[tuple[int, int, Treatment]]:
+        """
+        Returns (ear tag, position in calf.treatments, treatment) for all jobs in the given week of any year
+        """
+        jobs = []
+        for (_, week), entries in self._by_week.items():
+            if week == calendar_week:
+                jobs += self.__flatten(entries)
+        return jobs
+
+    def get_day(self, day: dt.date) -> list[tuple[int, int, Treatment]]:
+        """
+        Returns (ear tag, position in calf.treatments, treatment) for all jobs on the given day
+        """
+        return self.__flatten(self._by_day.get(day, {}))
+
+    @staticmethod
+    def __flatten(entries: dict[int, list[tuple[int, Treatment]]]) -> list[tuple[int, int, Treatment]]:
+        return [
+            (ear_tag, position, treatment)
+            for ear_tag, treatments in entries.items()
+            for position, treatment in treatments
+        ]
@@ -0,0 +1,226 @@
+"""
+The treatment protocol: which treatment follows which, after how many days and for which calves.
+
+The protocol is data. It is compiled once when the module is imported into a ProtocolPlan,
+which the treatments, the vectorized schedule (models/schedule.py) and the queries of the
+database use. Instead of the default PROTOCOL, a JSON file with the same fields can be used
+by setting the environment variable CALF_PROTOCOL to its path, e.g.
+
+    [{"treatment": "bovalto1", "after": ["birth"], "rest_days": 10,
+      "weekdays": ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday"], "calves": "all"}, ...]
+"""
+import datetime as dt
+import json
+import os
+from models.day import Day
+
+# The first treatment of every calf, all other treatments follow it
+ROOT = "birth"
+WORKDAYS = ("Monday", "Tuesday", "Wednesday", "Thursday", "Friday")
+# Calves which get a treatment
+CALVES = ("all", "dehorning", "breeding", "fattening")
+
+# treatment: Name of the treatment (table name, e.g. "ringworm1")
+# after: Previous treatments, the treatment follows the first of them which the calf has
+# rest_days: Days after the actual or else planned date of the previous treatment
+# weekdays: Days on which the treatment can be done, a later date is moved to the next of them
+# calves: Calves which get the treatment
+# cohort: The farm plans the treatment for groups of calves (see models/ringworm.py), only for ringworm1
+PROTOCOL = (
+    {"treatment": "bovalto1", "after": ("birth",), "rest_days": 10, "weekdays": WORKDAYS, "calves": "all"},
+    {"treatment": "dehorn", "after": ("bovalto1",), "rest_days": 5, "weekdays": WORKDAYS, "calves": "dehorning"},
+    {"treatment": "restall", "after": ("dehorn", "bovalto1"), "rest_days": 5, "weekdays": WORKDAYS, "calves": "all"},
+    {"treatment": "sell", "after": ("birth",), "rest_days": 28, "weekdays": ("Tuesday",), "calves": "fattening"},
+    {"treatment": "bovalto2", "after": ("bovalto1",), "rest_days": 21, "weekdays": WORKDAYS, "calves": "breeding"},
+    {"treatment": "ringworm1", "after": ("bovalto2",), "rest_days": 5, "weekdays": WORKDAYS, "calves": "breeding", "cohort": True},
+    {"treatment": "ringworm2", "after": ("ringworm1",), "rest_days": 14, "weekdays": WORKDAYS, "calves": "breeding"},
+)
+
+# The treatments of the calves (see models/treatment.py), every protocol has to plan each of them
+TREATMENTS = tuple(row["treatment"] for row in PROTOCOL)
+# Treatments which only the calves of one type can hold (see models/calf.py), e.g. "sell" -> "fattening"
+CALVES_OF_TREATMENT = {
+    row["treatment"]: row["calves"] for row in PROTOCOL if row["calves"] in ("breeding", "fattening")
+}
+# The ringworm treatments are planned for cohorts of calves after their Bovalto2 (see models/ringworm.py),
+# so a protocol can't change which treatments they follow or which treatment is planned for cohorts
+FIXED_STEPS = {
+    row["treatment"]: (tuple(row["after"]), bool(row.get("cohort", False)))
+    for row in PROTOCOL
+    if row["treatment"] in ("ringworm1", "ringworm2")
+}
+
+
+class PlanStep:
+    """
+    A compiled treatment of the protocol.
+
+    The rest days and the moving to the next allowed weekday only depend on the weekday of the
+    previous date, so they are compiled into one offset in days for each weekday.
+    """
+
+    __slots__ = ("name", "previous", "rest_days", "weekdays", "calves", "cohort", "offsets", "_deltas")
+
+    name: str
+    previous: tuple[str, ...]
+    rest_days: int
+    weekdays: frozenset[int]  # Day values
+    calves: str
+    cohort: bool
+    offsets: tuple[int, ...]  # Days after the previous date, by its weekday (Monday = 0)
+    _deltas: tuple[dt.timedelta, ...]
+
+    def __init__(
+        self,
+        name: str,
+        previous: tuple[str, ...],
+        rest_days: int,
+        weekdays: frozenset[int],
+        calves: str,
+        cohort: bool = False,
+    ):
+        self.name = name
+        self.previous = previous
+        self.rest_days = rest_days
+        self.weekdays = weekdays
+        self.calves = calves
+        self.cohort = cohort
+
+        offsets = []
+        for weekday in range(7):
+            offset = rest_days
+            while (weekday + offset) % 7 not in weekdays:
+                offset += 1
+            offsets.append(offset)
+        self.offsets = tuple(offsets)
+        self._deltas = tuple(dt.timedelta(days=offset) for offset in offsets)
+
+    def __repr__(self):
+        return f"PlanStep({self.name} after {', '.join(self.previous)})"
+
+    def calculate(self, previous_date: dt.date) -> dt.date:
+        return previous_date + self._deltas[previous_date.weekday()]
+
+    def to_sql(self, column: str) -> str:
+        """
+        SQL expression for the planned date, from a column of days since 1970-01-01.
+        """
+        # 1970-01-01 was a Thursday, the modulo keeps earlier days positive
+        cases = " ".join(
+            f"WHEN {weekday} THEN {offset}" for weekday, offset in enumerate(self.offsets)
+        )
+        return f"({column} + CASE ((({column} % 7) + 10) % 7) {cases} END)"
+
+
+class ProtocolPlan:
+    """
+    The compiled protocol, with the treatments ordered so that every treatment comes after its previous treatments.
+    """
+
+    steps: tuple[PlanStep, ...]
+    order: tuple[str, ...]  # ROOT and the names of the steps
+    dependents: dict[str, tuple[str, ...]]  # Treatments which follow directly or indirectly, in order
+    _steps_by_name: dict[str, PlanStep]
+
+    def __init__(self, steps: list[PlanStep]):
+        self._steps_by_name = {step.name: step for step in steps}
+        self.steps = tuple(self.__sort(steps))
+        self.order = (ROOT,) + tuple(step.name for step in self.steps)
+        self.dependents = {name: self.__find_dependents(name) for name in self.order}
+
+    def __repr__(self):
+        return f"ProtocolPlan({', '.join(self.order)})"
+
+    def get_step(self, name: str) -> PlanStep | None:
+        # None for the ROOT
+        return self._steps_by_name.get(name)
+
+    def __sort(self, steps: list[PlanStep]) -> list[PlanStep]:
+        order = []
+        visiting = set()
+
+        def visit(step: PlanStep):
+            if step in order:
+                return
+            if step.name in visiting:
+                raise ValueError(f"The treatment {step.name} follows itself")
+
+            visiting.add(step.name)
+            for name in step.previous:
+                if name != ROOT:
+                    visit(self._steps_by_name[name])
+            order.append(step)
+
+        for step in steps:
+            visit(step)
+
+        return order
+
+    def __find_dependents(self, name: str) -> tuple[str, ...]:
+        affected = {name}
+        dependents = []
+        for step in self.steps:
+            if any(previous in affected for previous in step.previous):
+                affected.add(step.name)
+                dependents.append(step.name)
+
+        return tuple(dependents)
+
+
+def compile_protocol(protocol) -> ProtocolPlan:
+    """
+    Checks a protocol and compiles it into a plan.
+
+    :param protocol: One dict per treatment of TREATMENTS, with the fields of PROTOCOL
+    :return: The plan
+    """
+    names = [row["treatment"] for row in protocol]
+    if len(set(names)) != len(names) or ROOT in names:
+        raise ValueError("Every treatment can only be planned once")
+    unknown = [name for name in names if name not in TREATMENTS]
+    missing = [name for name in TREATMENTS if name not in names]
+    if len(unknown) > 0 or len(missing) > 0:
+        raise ValueError(
+            f"Unknown treatments: {unknown}, treatments which are not planned: {missing}"
+        )
+
+    steps = []
+    for row in protocol:
+        name = row["treatment"]
+        previous = tuple(row["after"])
+        unknown = [previous_name for previous_name in previous if previous_name not in names + [ROOT]]
+        if len(previous) == 0 or len(unknown) > 0:
+            raise ValueError(f"Unknown previous treatment of {name}: {unknown}")
+        if row["rest_days"] < 0:
+            raise ValueError(f"Negative rest days of {name}")
+        if len(row["weekdays"]) == 0:
+            raise ValueError(f"No weekdays for {name}")
+        if row["calves"] not in CALVES:
+            raise ValueError(f"Unknown calves for {name}: {row['calves']}")
+        if CALVES_OF_TREATMENT.get(name, row["calves"]) != row["calves"]:
+            raise ValueError(f"Only {CALVES_OF_TREATMENT[name]} calves can get {name}")
+        cohort = bool(row.get("cohort", False))
+        if FIXED_STEPS.get(name, (previous, False)) != (previous, cohort):
+            raise ValueError(f"The previous treatments or the cohort of {name} can't be changed")
+
+        weekdays = frozenset(Day[weekday].value for weekday in row["weekdays"])
+        steps.append(
+            PlanStep(name, previous, int(row["rest_days"]), weekdays, row["calves"], cohort)
+        )
+
+    return ProtocolPlan(steps)
+
+
+def load_protocol(path: str) -> list[dict]:
+    with open(path, encoding="utf-8") as file:
+        return json.load(file)
+
+
+def load_plan() -> ProtocolPlan:
+    # The protocol of CALF_PROTOCOL if it is set, otherwise PROTOCOL
+    path = os.environ.get("CALF_PROTOCOL")
+    return compile_protocol(load_protocol(path) if path else PROTOCOL)
+
+
+# Compiled once, shared by all treatments and calves
+PLAN = load_plan()
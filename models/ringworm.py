@@ -0,0 +1,243 @@
+import bisect
+import datetime as dt
+import logging
+from models.calf import BreedingCalf
+from models.treatment import Ringworm1
+
+logger = logging.getLogger(__name__)
+
+
+class RingwormCohorts:
+    """
+    Breeding calves ordered by birth date and grouped into the cohorts which get
+    their ringworm treatments together.
+
+    Walking the calves in order, a cohort takes at least five calves and is extended
+    as long as the next calf's first ringworm treatment falls into the same week.
+    All calves of a cohort of five or more get their ringworm treatments based on
+    the latest Bovalto2 treatment of the cohort, smaller cohorts get none.
+
+    The cohort boundaries are stored, so inserting, removing or editing a calf only
+    regroups the cohorts next to it.
+    """
+
+    MIN_COHORT_SIZE = 5
+
+    _calves: list[BreedingCalf]
+    # (birth date, sequence number) of each calf, the list is sorted by it
+    _keys: list[tuple[dt.date, int]]
+    # Calendar week of the first ringworm treatment based on each calf's own Bovalto2
+    _weeks: list[int]
+    # True if the calf is the last one of its cohort
+    _closes: list[bool]
+    # id(calf) -> key of the calf
+    _key_by_calf: dict[int, tuple[dt.date, int]]
+    # True if calves were added or removed without regrouping
+    _stale: bool
+
+    def __init__(self):
+        self._calves = []
+        self._keys = []
+        self._weeks = []
+        self._closes = []
+        self._key_by_calf = {}
+        self._stale = False
+
+    def __len__(self):
+        return len(self._calves)
+
+    @property
+    def calves(self) -> list[BreedingCalf]:
+        return list(self._calves)
+
+    def get_key(self, calf: BreedingCalf) -> tuple[dt.date, int]:
+        return self._key_by_calf[id(calf)]
+
+    @staticmethod
+    def __get_week(calf: BreedingCalf) -> int:
+        return Ringworm1(calf.bovalto_2).get_week()
+
+    def __get_position(self, calf: BreedingCalf) -> int:
+        return bisect.bisect_left(self._keys, self._key_by_calf[id(calf)])
+
+    def __insert(self, calf: BreedingCalf, key: tuple[dt.date, int]) -> int:
+        position = bisect.bisect_right(self._keys, key)
+
+        self._calves.insert(position, calf)
+        self._keys.insert(position, key)
+        self._weeks.insert(position, self.__get_week(calf))
+        self._closes.insert(position, True)
+        self._key_by_calf[id(calf)] = key
+
+        return position
+
+    def __delete(self, position: int):
+        del self._key_by_calf[id(self._calves[position])]
+        del self._calves[position]
+        del self._keys[position]
+        del self._weeks[position]
+        del self._closes[position]
+
+    def insert(
+        self, calf: BreedingCalf, sequence: int, regroup: bool = True
+    ) -> list[BreedingCalf]:
+        """
+        Inserts a calf at its position by birth date.
+
+        :param calf: The calf to insert
+        :param sequence: Increasing number to order calves born on the same day
+        :param regroup: If False, the cohorts are regrouped by the next change
+        :return: Calves whose ringworm treatments were replaced
+        """
+        position = self.__insert(calf, (calf.birth.expected_date, sequence))
+
+        if not regroup:
+            self._stale = True
+            return []
+
+        return self.__regroup(position, position + 1)
+
+    def remove(self, calf: BreedingCalf, regroup: bool = True) -> list[BreedingCalf]:
+        """
+        Removes a calf.
+
+        :param calf: The calf to remove
+        :param regroup: If False, the cohorts are regrouped by the next change
+        :return: Calves whose ringworm treatments were replaced
+        """
+        position = self.__get_position(calf)
+        self.__delete(position)
+
+        if not regroup:
+            self._stale = True
+            return []
+
+        return self.__regroup(position, position)
+
+    def update(self, calf: BreedingCalf, regroup: bool = True) -> list[BreedingCalf]:
+        """
+        Regroups the cohort of a calf after its treatments were edited.
+
+        :param calf: The edited calf
+        :param regroup: If False, the cohorts are regrouped by the next change
+        :return: Calves whose ringworm treatments were replaced
+        """
+        _, sequence = self._key_by_calf[id(calf)]
+        first = last = self.__get_position(calf)
+        if calf.birth.expected_date != self._keys[first][0]:
+            # The calf moves to its new birth date,
+            # only the cohorts between its old and its new position change
+            self.__delete(first)
+            position = self.__insert(calf, (calf.birth.expected_date, sequence))
+            first, last = min(first, position), max(first, position)
+        else:
+            self._weeks[first] = self.__get_week(calf)
+
+        if not regroup:
+            self._stale = True
+            return []
+
+        return self.__regroup(first, last + 1)
+
+    def ensure_grouped(self) -> list[BreedingCalf]:
+        """
+        Regroups all calves if calves were added or removed without regrouping.
+
+        :return: Calves whose ringworm treatments were replaced
+        """
+        if self._stale:
+            return self.regroup()
+        return []
+
+    def regroup(self) -> list[BreedingCalf]:
+        """
+        Regroups all calves.
+
+        :return: Calves whose ringworm treatments were replaced
+        """
+        self._stale = False
+        for position, calf in enumerate(self._calves):
+            self._weeks[position] = self.__get_week(calf)
+
+        return self.__regroup(0, len(self._calves))
+
+    def __regroup(self, position: int, check_from: int) -> list[BreedingCalf]:
+        """
+        Regroups the calves starting with the cohort in front of a changed position.
+
+        :param position: First position which changed
+        :param check_from: Position from which the old cohort boundaries are still valid
+        :return: Calves whose ringworm treatments were replaced
+        """
+        if self._stale:
+            return self.regroup()
+
+        count = len(self._calves)
+        if count == 0:
+            return []
+
+        # Whether a calf closes its cohort depends on the next calf,
+        # so the cohort of the calf in front of the change has to be regrouped as well
+        start = max(position - 1, 0)
+        while start > 0 and not self._closes[start - 1]:
+            start -= 1
+
+        cohorts = []
+        first = start
+        size = 1
+        for j in range(start, count):
+            if j == count - 1:
+                # Last calf
+                closes = True
+            else:
+                closes = not (
+                    self._weeks[j] == self._weeks[j + 1]
+                    or size < self.MIN_COHORT_SIZE
+                )
+
+            # From here on, the cohorts are the same as before
+            in_sync = closes and j >= check_from and self._closes[j]
+
+            self._closes[j] = closes
+            if closes:
+                cohorts.append((first, j))
+                first = j + 1
+                size = 1
+                if in_sync:
+                    break
+            else:
+                size += 1
+
+        changed = []
+        for first, last in cohorts:
+            changed += self.__apply(self._calves[first : last + 1])
+
+        return changed
+
+    def __apply(self, cohort: list[BreedingCalf]) -> list[BreedingCalf]:
+        ringworms = [(calf.ringworm_1, calf.ringworm_2) for calf in cohort]
+
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Ear tags in this week: %s", [calf.ear_tag for calf in cohort])
+
+        if len(cohort) >= self.MIN_COHORT_SIZE:
+            max_bovalto2_breeding_calf = max(cohort, key=lambda calf: calf.bovalto_2)
+
+            for calf in cohort:
+                calf.recalc_ringworm(max_bovalto2_breeding_calf.bovalto_2)
+
+            logger.debug(
+                "The maximum Bovalto2 date among the selected ear tags is: %s",
+                max_bovalto2_breeding_calf.bovalto_2,
+            )
+
+        else:
+            logger.debug("There are less than five calves in this week.")
+            for calf in cohort:
+                calf.delete_ringworm()
+
+        return [
+            calf
+            for calf, (ringworm_1, ringworm_2) in zip(cohort, ringworms)
+            if calf.ringworm_1 is not ringworm_1 or calf.ringworm_2 is not ringworm_2
+        ]
@@ -0,0 +1,63 @@
+import numpy as np
+from models.calf import FatteningCalf, BreedingCalf
+from models.day import Day
+from models.farm_frame import TREATMENTS, CALF_TYPES, NOT_A_TIME
+from models.protocol import PLAN, PlanStep
+from models.treatment import Birth, get_treatment_type
+
+
+def plan_dates(step: PlanStep, previous_dates: np.ndarray) -> np.ndarray:
+    # Vectorized PlanStep.calculate, NaT stays NaT
+    weekdays = (previous_dates.astype(np.int64) + Day.Thursday.value) % 7
+    return previous_dates + np.array(step.offsets)[weekdays]
+
+
+def calculate_schedule(
+    birthdays: np.ndarray,
+    dehorning_required: np.ndarray,
+    calf_types: np.ndarray,
+    actual: np.ndarray | None = None,
+) -> np.ndarray:
+    """
+    Calculates the planned dates of all treatments for many calves at once,
+    the same way as creating the treatments one after the other.
+
+    :param birthdays: datetime64[D] birth date of each calf
+    :param dehorning_required: True for calves which have to be dehorned
+    :param calf_types: Index into CALF_TYPES of each calf
+    :param actual: Actual dates in the columns of TREATMENTS, NaT where the treatment is not done.
+                   A treatment is planned after the actual date of the previous one if it is set.
+    :return: Planned dates in the columns of TREATMENTS, NaT for treatments the calf doesn't get
+    """
+    birthdays = np.asarray(birthdays, dtype="datetime64[D]")
+    dehorning_required = np.asarray(dehorning_required, dtype=bool)
+    calf_types = np.asarray(calf_types)
+
+    planned = np.full((len(birthdays), len(TREATMENTS)), NOT_A_TIME)
+    if actual is None:
+        actual = np.full_like(planned, NOT_A_TIME)
+
+    # Calves which get the treatments of the protocol
+    receivers = {
+        "all": np.ones(len(birthdays), dtype=bool),
+        "dehorning": dehorning_required,
+        "fattening": calf_types == CALF_TYPES.index(FatteningCalf),
+        "breeding": calf_types == CALF_TYPES.index(BreedingCalf),
+    }
+
+    planned[:, TREATMENTS.index(Birth)] = birthdays
+    for step in PLAN.steps:
+        # The actual date of the previous treatment if it is done, otherwise its planned date.
+        # The first previous treatment which the calf has is used.
+        previous_dates = np.full(len(birthdays), NOT_A_TIME)
+        for name in reversed(step.previous):
+            column = TREATMENTS.index(get_treatment_type(name))
+            dates = np.where(
+                np.isnat(actual[:, column]), planned[:, column], actual[:, column]
+            )
+            previous_dates = np.where(np.isnat(dates), previous_dates, dates)
+
+        dates = np.where(receivers[step.calves], plan_dates(step, previous_dates), NOT_A_TIME)
+        planned[:, TREATMENTS.index(get_treatment_type(step.name))] = dates
+
+    return planned
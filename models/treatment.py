@@ -1,14 +1,27 @@
 import datetime as dt
-from models.day import Day, handle_weekends, get_next_tuesday
+from models.protocol import PLAN, PlanStep
+
+
+class Changes:
+    """
+    Counts the changes of all calves and treatments, so a farm only has to look for its changed calves
+    if anything changed since it last looked (see Farm.has_changes).
+    """
+
+    count = 0
 
 
 class Treatment:
+    __slots__ = ("_EXPECTED_DATE", "_ACTUAL_DATE", "_DIRTY")
+
     _ORDER_ID: int
     _EXPECTED_DATE: dt.date
     _ACTUAL_DATE: dt.date | None
     _NAME: str
     display_name: str
     _REST_DAYS: int
+    _STEP: PlanStep | None  # None for the birth
+    _DIRTY: bool
 
     @property
     def order_id(self) -> int:
@@ -30,6 +43,22 @@ class Treatment:
     def actual_date(self) -> dt.date | None:
         return self._ACTUAL_DATE
 
+    @property
+    def is_dirty(self) -> bool:
+        # True if the dates changed since the treatment was last saved
+        return self._DIRTY
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+
+        # The same for every treatment of a class
+        cls._NAME = cls.__name__.lower()
+        cls.display_name = cls._NAME.capitalize()
+
+        # How the treatment is planned is defined by the protocol
+        cls._STEP = PLAN.get_step(cls._NAME)
+        cls._REST_DAYS = cls._STEP.rest_days if cls._STEP is not None else 0
+
     def __str__(self):
         return f"{self.display_name.ljust(9)}: {self.expected_date}, {self.actual_date}"
 
@@ -115,24 +144,53 @@ class Treatment:
             self._EXPECTED_DATE = date
 
         self._ACTUAL_DATE = None
-        self._NAME = type(self).__name__.lower()
-        self.display_name = self._NAME.capitalize()
+
+        # A new treatment has not been saved yet
+        self._DIRTY = True
+        Changes.count += 1
 
     def calculate_expected_date(self, prev_treatment):
-        if hasattr(self, "_REST_DAYS"):
-            rest_days = self._REST_DAYS
-        else:
-            raise Exception("Rest days not defined")
-        date = prev_treatment._ACTUAL_DATE or prev_treatment.expected_date
-        return handle_weekends(date + dt.timedelta(days=rest_days))
+        if self._STEP is None:
+            raise Exception(f"{self.display_name} is not planned after another treatment")
+        return self._STEP.calculate(prev_treatment.get_date())
+
+    def recalculate(self, prev_treatment) -> bool:
+        """
+            Calculates the expected date again from the previous treatment, the actual date is cleared
+        :param prev_treatment: Treatment the expected date is calculated from
+        :return: True if the date of the treatment changed
+        """
+        date = self.get_date()
+        self.reset(self.calculate_expected_date(prev_treatment), None)
+        return self.get_date() != date
 
     def reset(self, planned: dt.date, actual: dt.date | None):
+        if self._EXPECTED_DATE != planned or self._ACTUAL_DATE != actual:
+            self._DIRTY = True
+            Changes.count += 1
+
         self._ACTUAL_DATE = actual
         self._EXPECTED_DATE = planned
 
     def update(self, date: dt.date):
+        if self._ACTUAL_DATE != date:
+            self._DIRTY = True
+            Changes.count += 1
+
         self._ACTUAL_DATE = date
 
+    def has_same_dates(self, other) -> bool:
+        # Unlike __eq__, this compares both the expected and the actual date
+        return (
+            other is not None
+            and type(self) is type(other)
+            and self._EXPECTED_DATE == other._EXPECTED_DATE
+            and self._ACTUAL_DATE == other._ACTUAL_DATE
+        )
+
+    def mark_clean(self):
+        self._DIRTY = False
+
     def get_date(self) -> dt.date:
         return self._ACTUAL_DATE or self.expected_date
 
@@ -143,68 +201,99 @@ class Treatment:
             else self._ACTUAL_DATE.isocalendar().week
         )
 
+    def get_calendar_week(self) -> tuple[int, int]:
+        # ISO year and week, e.g. 2024-12-30 is in week 1 of 2025
+        year, week, _ = self.get_date().isocalendar()
+        return year, week
+
 
 class Birth(Treatment):
+    __slots__ = ()
     _ORDER_ID = 0
 
     def __init__(self, date: dt.date):
         super().__init__(None, date)
         self._EXPECTED_DATE = date
-        self._REST_DAYS = 0
 
 
 class Bovalto1(Treatment):
+    __slots__ = ()
     _ORDER_ID = 1
 
     def __init__(self, prev: Birth):
-        self._REST_DAYS = 10
         super().__init__(prev)
 
 
 class Dehorn(Treatment):
+    __slots__ = ()
     _ORDER_ID = 2
 
     def __init__(self, prev: Bovalto1):
-        self._REST_DAYS = 5
         super().__init__(prev)
 
 
 class Restall(Treatment):
+    __slots__ = ()
     _ORDER_ID = 3
 
     def __init__(self, prev: Dehorn | Bovalto1):
-        self._REST_DAYS = 5
         super().__init__(prev)
 
 
 class Sell(Treatment):
+    __slots__ = ()
     _ORDER_ID = 4
 
     def __init__(self, prev: Birth):
-        self._REST_DAYS = 28
         super().__init__(prev)
-        self._EXPECTED_DATE = get_next_tuesday(self._EXPECTED_DATE)
 
 
 class Bovalto2(Treatment):
+    __slots__ = ()
     _ORDER_ID = 4
 
     def __init__(self, prev: Bovalto1):
-        self._REST_DAYS = 21
         super().__init__(prev)
 
 
 class Ringworm1(Treatment):
+    __slots__ = ()
     _ORDER_ID = 5
 
     def __init__(self, prev: Bovalto2):
-        self._REST_DAYS = 5
         super().__init__(prev)
 
 
 class Ringworm2(Treatment):
+    __slots__ = ()
     _ORDER_ID = 6
 
     def __init__(self, prev: Ringworm1):
-        self._REST_DAYS = 14
         super().__init__(prev)
+
+
+
+# Treatment name (e.g. "ringworm1") -> type
+TREATMENT_TYPES: dict[str, type[Treatment]] = {
+    treatment_type._NAME: treatment_type
+    for treatment_type in (Birth, Bovalto1, Dehorn, Restall, Sell, Bovalto2, Ringworm1, Ringworm2)
+}
+
+
+def get_treatment_type(name: str) -> type[Treatment]:
+    if name not in TREATMENT_TYPES:
+        raise ValueError(f"Unknown treatment in the protocol: {name}")
+    return TREATMENT_TYPES[name]
+
+
+# The graph of the protocol with the types of the treatments.
+# The expected date of a treatment is calculated from the first of its previous treatments which the calf has.
+PREVIOUS_TREATMENTS: dict[type[Treatment], tuple[type[Treatment], ...]] = {
+    get_treatment_type(step.name): tuple(get_treatment_type(name) for name in step.previous)
+    for step in PLAN.steps
+}
+TREATMENT_ORDER: list[type[Treatment]] = [get_treatment_type(name) for name in PLAN.order]
+DEPENDENT_TREATMENTS: dict[type[Treatment], list[type[Treatment]]] = {
+    get_treatment_type(name): [get_treatment_type(dependent) for dependent in dependents]
+    for name, dependents in PLAN.dependents.items()
+}
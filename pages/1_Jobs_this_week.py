@@ -9,6 +9,9 @@ import sys
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
 
 from data.db_handler import DatabaseHandler
+from data.farm_cache import farm_cache
+from logging_config import configure_logging
+from view.diagnostics import show_diagnostics
 from models.calf import FatteningCalf, BreedingCalf
 from models.farm import Farm
 from models.gender import Gender
@@ -30,16 +33,11 @@ DB_PATH = "data/calves.sqlite"
 DB_TYPE = "sqlite"
 BREDING_STR = "breeding"
 FATTENING_STR = "fattening"
-week = dt.datetime.now().isocalendar().week
+year, week, _ = dt.datetime.now().isocalendar()
 
 
-def save(db_path, db_type, farm):
-    with DatabaseHandler(db_name=db_path, db_type=db_type) as dbh:
-        dbh.save_farm(farm)
-
-
-def create_sidebar(farm: Farm):
-    global week
+def create_sidebar():
+    global year, week
 
     expander = st.sidebar.expander("Add Calf")
     expander.write("Add a new calf to the database")
@@ -67,23 +65,25 @@ def create_sidebar(farm: Farm):
         else:
             raise Exception(f"Unknown calf type: {calf_type}")
 
-        farm.add_calf(new_calf)
-
-        # We have to safe the whole farm incase other calves were changed
-        # This happens when we have to set the ringworm
-        save(DB_PATH, DB_TYPE, farm)
+        # Adding a calf might change the ringworm of other calves, so the whole farm is needed
+        # Other calves might have changed as well
+        # This happens when we have to set the ringworm.
+        # Only the calves which have been added, changed or deleted are written.
+        with farm_cache.edit_farm(DB_PATH, DB_TYPE) as farm:
+            farm.add_calf(new_calf)
         st.rerun()
 
-    # Create a list of weeks for the next three weeks
+    # Create a list of (year, week) for the next three weeks
     calendar_week_options = [
-        (dt.datetime.now() + dt.timedelta(days=7 * i)).isocalendar().week
+        tuple((dt.datetime.now() + dt.timedelta(days=7 * i)).isocalendar())[:2]
         for i in range(4)
     ]
 
-    week = st.sidebar.selectbox(
+    year, week = st.sidebar.selectbox(
         "Calender Week",
         options=calendar_week_options,
         index=0,  # Current week
+        format_func=lambda option: f"{option[1]} ({option[0]})",
     )
 
 
@@ -131,9 +131,14 @@ def get_treatment(
             raise Exception("Job not found")
 
 
-def view_jobs_per_week(farm: Farm) -> Farm | None:
-    displayed_data = farm.get_jobs_in_week(week)
+def fetch_jobs_per_week() -> list[tuple[int, str, dt.date]]:
+    # Only the jobs of the week are read, not the whole farm
+    start_date = dt.date.fromisocalendar(year, week, 1)
+    with DatabaseHandler(db_name=DB_PATH, db_type=DB_TYPE) as dbh:
+        return dbh.fetch_jobs(start_date, start_date + dt.timedelta(days=6))
+
 
+def view_jobs_per_week(displayed_data: list[tuple[int, str, dt.date]]) -> Farm | None:
     config = {
         "0": st.column_config.NumberColumn("Ohrmarke"),
         "1": st.column_config.TextColumn(label="Aufgabe"),
@@ -160,40 +165,36 @@ def view_jobs_per_week(farm: Farm) -> Farm | None:
 
     if len(updated_list) > 0:
         if st.button("Submit"):
-            for ear_tag, treatment, date in updated_list:
-                calf = farm.get_calf(ear_tag)
+            # The calves are only loaded when a job is edited.
+            # Other sessions wait until the changes are saved.
+            with farm_cache.edit_farm(DB_PATH, DB_TYPE) as farm:
+                for ear_tag, treatment, date in updated_list:
+                    calf = farm.get_calf(ear_tag)
 
-                farm.edit_calf(
-                    ear_tag,
-                    get_treatment(treatment.lower()),
-                    date,
-                    calf.dehorning_required,
-                )
+                    farm.edit_calf(
+                        ear_tag,
+                        get_treatment(treatment.lower()),
+                        date,
+                        calf.dehorning_required,
+                    )
 
-                return farm
+                    return farm
 
     return None
 
 
 if __name__ == "__main__":
+    configure_logging()
     st.set_page_config(page_title="Kälberliste", page_icon="🐮", layout="wide")
     st.title("Jobs This Week")
+    show_diagnostics()
 
-    calves = []
-
-    with DatabaseHandler(db_name=DB_PATH, db_type="sqlite") as dbh:
-        calves = dbh.fetch_all_calves()
-
-    farm = Farm()
-
-    # Since the data directly comes from the database,
-    # we don't need to set the ringworm
-    farm.add_calves(calves, set_ringworm=False)
-    max_ear_tag = farm.get_max_breeding_calf_ear_tag()
+    with DatabaseHandler(db_name=DB_PATH, db_type=DB_TYPE) as dbh:
+        max_ear_tag = dbh.fetch_max_breeding_calf_ear_tag()
 
-    create_sidebar(farm)
-    new_farm = view_jobs_per_week(farm)
+    create_sidebar()
+    new_farm = view_jobs_per_week(fetch_jobs_per_week())
 
+    # The changes have already been saved
     if new_farm is not None:
-        save(DB_PATH, DB_TYPE, new_farm)
         st.rerun()
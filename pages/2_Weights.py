@@ -9,12 +9,17 @@ import sys
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
 
 from data.db_handler import DatabaseHandler
+from data.farm_cache import farm_cache
+from data.growth_cache import growth_cache
+from logging_config import configure_logging
+from view.diagnostics import show_diagnostics
 from models.calf import FatteningCalf, BreedingCalf
 from models.farm import Farm
 from models.gender import Gender
 
 import streamlit as st
 import datetime as dt
+import numpy as np
 
 DB_PATH = "data/calves.sqlite"
 DB_TYPE = "sqlite"
@@ -37,11 +42,6 @@ CONFIG = {
 }
 
 
-def save(db_path, db_type, farm):
-    with DatabaseHandler(db_name=db_path, db_type=db_type) as dbh:
-        dbh.save_farm(farm)
-
-
 def check_unique_dates(data_list):
     dates = [item[0] for item in data_list]
     unique_dates = set(dates)
@@ -85,11 +85,11 @@ def create_sidebar(farm: Farm):
         else:
             raise Exception(f"Unknown calf type: {calf_type}")
 
-        farm.add_calf(new_calf)
-
-        # We have to safe the whole farm incase other calves were changed
-        # This happens when we have to set the ringworm
-        save(DB_PATH, DB_TYPE, farm)
+        # Other calves might have changed as well
+        # This happens when we have to set the ringworm.
+        # Only the calves which have been added, changed or deleted are written.
+        with farm_cache.edit_farm(DB_PATH, DB_TYPE) as farm:
+            farm.add_calf(new_calf)
         st.rerun()
 
     st.sidebar.header("Filter Calves")
@@ -141,21 +141,51 @@ def main() -> None:
             dbh.save_calf_weights(DISPLAY_CALF, updated_weights)
 
 
+def show_growth() -> None:
+    # There is no calf to show yet
+    if DISPLAY_CALF is None:
+        return
+
+    # Only computed again after the database was written
+    growth = growth_cache.get_growth(DB_PATH, DB_TYPE)
+    if len(growth) == 0:
+        return
+
+    st.header("Growth")
+    row = growth.get_rows(np.array([DISPLAY_CALF]))[0]
+    if row >= 0 and not np.isnan(growth.daily_gains[row]):
+        st.metric(
+            f"Daily gain of {DISPLAY_CALF}", f"{growth.daily_gains[row]:.2f} kg/day"
+        )
+
+    # Percentiles of the daily gain of the herd
+    columns = st.columns(len(growth.get_percentiles()))
+    for column, (percentile, gain) in zip(columns, growth.get_percentiles().items()):
+        column.metric(f"{percentile}th percentile", f"{gain:.2f} kg/day")
+
+    st.subheader("Projected weight at sale")
+    st.dataframe(
+        [
+            {"Ear Tag": ear_tag, "Sell": sell_date, "Projected (kg)": round(weight)}
+            for ear_tag, sell_date, weight in growth_cache.get_sell_weights(
+                DB_PATH, DB_TYPE
+            )
+        ],
+        hide_index=True,
+        column_config={"Sell": st.column_config.DateColumn(format="DD.MM.YYYY")},
+    )
+
+
 if __name__ == "__main__":
+    configure_logging()
     st.set_page_config(page_title="Kälberliste", page_icon="🐮", layout="wide")
     st.title("Weights")
+    show_diagnostics()
 
-    calves = []
-
-    with DatabaseHandler(db_name=DB_PATH, db_type="sqlite") as dbh:
-        calves = dbh.fetch_all_calves()
-
-    farm = Farm()
-
-    # Since the data directly comes from the database,
-    # we don't need to set the ringworm
-    farm.add_calves(calves, set_ringworm=False)
+    # The farm is only loaded again if the database changed since the last run
+    farm = farm_cache.get_farm(DB_PATH, DB_TYPE)
     max_ear_tag = farm.get_max_breeding_calf_ear_tag()
 
     create_sidebar(farm)
     main()
+    show_growth()
@@ -0,0 +1,54 @@
+import os
+import sys
+
+# This code snippet does the following:
+#     1. It adjusts the Python path to include the parent directory
+#        (which contains models and other packages).
+#        This allows Python to locate and import modules from these directories.
+#     2. Then, it imports the necessary modules from the models package.
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from data.db_handler import DatabaseHandler
+from logging_config import configure_logging
+from view.diagnostics import show_diagnostics
+
+import streamlit as st
+import datetime as dt
+
+DB_PATH = "data/calves.sqlite"
+DB_TYPE = "sqlite"
+
+
+def main() -> None:
+    start_date = st.sidebar.date_input(
+        "First week", value=dt.date.today(), format="DD.MM.YYYY"
+    )
+    weeks = st.sidebar.slider("Weeks", min_value=1, max_value=104, value=52)
+
+    # The counts are kept up to date by the database, nothing is computed from the calves
+    with DatabaseHandler(db_name=DB_PATH, db_type=DB_TYPE) as dbh:
+        workload = dbh.fetch_weekly_workload(start_date, weeks)
+
+    if len(workload) == 0:
+        st.info("No jobs in these weeks")
+        return
+
+    data = [
+        {"Week": monday, "Treatment": treatment, "Jobs": jobs}
+        for monday, treatment, jobs in workload
+    ]
+    st.bar_chart(data, x="Week", y="Jobs", color="Treatment")
+    st.dataframe(
+        data,
+        hide_index=True,
+        column_config={"Week": st.column_config.DateColumn(format="DD.MM.YYYY")},
+    )
+
+
+if __name__ == "__main__":
+    configure_logging()
+    st.set_page_config(page_title="Kälberliste", page_icon="🐮", layout="wide")
+    st.title("Workload")
+    show_diagnostics()
+
+    main()
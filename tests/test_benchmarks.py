@@ -0,0 +1,57 @@
+from benchmarks.herd import generate_herd
+from benchmarks.suite import compare, run
+from models.calf import FatteningCalf
+import datetime as dt
+import sys
+import os
+
+# This code snippet does the following:
+#     1. It adjusts the Python path to include the parent directory
+#        (which contains models and other packages).
+#        This allows Python to locate and import modules from these directories.
+#     2. Then, it imports the necessary modules from the models package.
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+
+class TestGenerateHerd:
+    def test_deterministic(self):
+        herd = [calf.as_tuple() for calf in generate_herd(200, seed=3)]
+        assert herd == [calf.as_tuple() for calf in generate_herd(200, seed=3)]
+        assert herd != [calf.as_tuple() for calf in generate_herd(200, seed=4)]
+
+    def test_options(self):
+        herd = generate_herd(
+            1000,
+            fattening_ratio=0.5,
+            dehorning_ratio=0.0,
+            start=dt.date(2020, 1, 1),
+            days=10,
+        )
+
+        fattening_calves = [c for c in herd if isinstance(c, FatteningCalf)]
+        assert 400 < len(fattening_calves) < 600
+        assert not any(calf.dehorning_required for calf in herd)
+        assert all(
+            dt.date(2020, 1, 1) <= calf.birthday < dt.date(2020, 1, 11) for calf in herd
+        )
+        assert len({calf.ear_tag for calf in herd}) == 1000
+
+
+class TestSuite:
+    def test_run(self):
+        results = run([50], ["add_calves", "fetch_all_calves"], repeat=1)
+        assert list(results["results"]) == ["add_calves", "fetch_all_calves"]
+        assert results["results"]["add_calves"]["50"] > 0
+
+    def test_compare(self):
+        baseline = {"results": {"save_farm": {"1000": 0.1, "10000": 1.0}}}
+        current = {
+            "results": {
+                "save_farm": {"1000": 0.102, "10000": 1.5},
+                "add_calves": {"1000": 1.0},
+            }
+        }
+        assert compare(baseline, current, tolerance=0.25) == [
+            ("save_farm", "10000", 1.0, 1.5)
+        ]
+        assert compare(baseline, current, tolerance=0.6) == []
@@ -299,3 +299,137 @@ class TestBreedingCalf:
         assert calf.ringworm_1.actual_date == dt.date(2023, 12, 25)
         assert calf.ringworm_2.expected_date == dt.date(2024, 1, 8)
         assert calf.ringworm_2.actual_date is None
+
+
+class TestCalfChanges:
+    def test_new_calf_has_changes(self, setup_breeding_calf):
+        calf = setup_breeding_calf
+        assert calf.is_dirty
+        assert calf.has_changes()
+
+        calf.mark_clean()
+        assert not calf.is_dirty
+        assert not calf.has_changes()
+        assert calf.get_dirty_treatments() == []
+
+    def test_edit_treatment(self, setup_breeding_calf):
+        calf = setup_breeding_calf
+        calf.mark_clean()
+
+        calf.edit_restall(dt.date(2023, 12, 12))
+        assert not calf.is_dirty
+        assert calf.get_dirty_treatments() == [calf.restall]
+
+    def test_delete_treatment(self, setup_breeding_calf):
+        calf = setup_breeding_calf
+        calf.mark_clean()
+
+        calf.delete_ringworm()
+        assert calf.is_dirty
+        assert calf.treatments[4:] == [None, None]
+
+    def test_delete_missing_treatment(self, setup_breeding_calf):
+        calf = setup_breeding_calf
+        calf.delete_ringworm()
+        calf.mark_clean()
+
+        calf.delete_ringworm()
+        assert not calf.has_changes()
+
+    def test_recalc_ringworm_unchanged(self, setup_breeding_calf):
+        calf = setup_breeding_calf
+        calf.mark_clean()
+
+        calf.recalc_ringworm(calf.bovalto_2)
+        assert not calf.has_changes()
+
+    def test_edit_gender_and_ear_tag(self, setup_breeding_calf):
+        calf = setup_breeding_calf
+        calf.mark_clean()
+
+        calf.edit_gender(calf.gender)
+        calf.change_ear_tag(calf.ear_tag)
+        assert not calf.is_dirty
+
+        calf.edit_gender(Gender.Female)
+        assert calf.is_dirty
+
+
+class TestCalfRecalculation:
+    @pytest.mark.parametrize("calf_class", [FatteningCalf, BreedingCalf])
+    @pytest.mark.parametrize("dehorning_required", [True, False])
+    def test_edit_birth_matches_new_calf(self, calf_class, dehorning_required):
+        calf = calf_class("2023-11-20", Gender.Male, 12345, dehorning_required)
+        treatments = calf.treatments
+
+        for days in range(1, 15):
+            birthday = dt.date(2023, 11, 20) + dt.timedelta(days=days)
+            calf.edit_birth(birthday)
+
+            # The dates are the same as if the calf was created again, with the same objects
+            new_calf = calf_class(birthday, Gender.Male, 12345, dehorning_required)
+            assert calf.as_tuple()[5:] == new_calf.as_tuple()[5:]
+            assert all(a is b for a, b in zip(calf.treatments, treatments))
+
+    def test_edit_keeps_unaffected_treatments(self, setup_breeding_calf):
+        calf = setup_breeding_calf
+        calf.edit_dehorn(dt.date(2023, 12, 6))
+        calf.mark_clean()
+
+        # The dehorning is planned again, but Restall stays on Monday 2023-12-11
+        calf.edit_bovalto1(dt.date(2023, 11, 29))
+        assert calf.dehorn.actual_date is None
+        assert calf.restall.expected_date == dt.date(2023, 12, 11)
+        assert calf.get_dirty_treatments() == [
+            calf.bovalto_1,
+            calf.dehorn,
+            calf.bovalto_2,
+            calf.ringworm_1,
+            calf.ringworm_2,
+        ]
+
+        calf.edit_restall(dt.date(2023, 12, 12))
+        calf.mark_clean()
+        calf.edit_bovalto2(dt.date(2023, 12, 21))
+        assert calf.restall.actual_date == dt.date(2023, 12, 12)
+        assert calf.get_dirty_treatments() == [
+            calf.bovalto_2,
+            calf.ringworm_1,
+            calf.ringworm_2,
+        ]
+
+    def test_edit_stops_at_unchanged_date(self, setup_breeding_calf):
+        calf = setup_breeding_calf
+        calf.edit_bovalto1(dt.date(2023, 11, 27))
+        calf.mark_clean()
+        dehorn = calf.dehorn
+
+        # Saturday and Sunday are both moved to Monday
+        calf.edit_bovalto1(dt.date(2023, 11, 28))
+        assert calf.dehorn is dehorn
+        assert calf.dehorn.expected_date == dt.date(2023, 12, 4)
+        assert calf.ringworm_1.expected_date == dt.date(2023, 12, 25)
+        assert calf.get_dirty_treatments() == [calf.bovalto_1, calf.bovalto_2]
+
+    def test_edit_to_same_date(self, setup_breeding_calf):
+        calf = setup_breeding_calf
+        calf.edit_dehorn(dt.date(2023, 12, 6))
+        calf.mark_clean()
+
+        calf.edit_bovalto1(calf.bovalto_1.expected_date)
+        assert calf.dehorn.actual_date == dt.date(2023, 12, 6)
+        assert calf.get_dirty_treatments() == [calf.bovalto_1]
+
+    def test_reset_dehorn(self, setup_fattening_calf):
+        calf = setup_fattening_calf
+        restall = calf.restall
+
+        calf.reset_dehorn(calf.dehorn.expected_date, False)
+        assert calf.dehorn is None
+        assert calf.restall is restall
+        assert calf.restall.expected_date == dt.date(2023, 12, 5)
+
+        calf.reset_dehorn(dt.date(2023, 12, 6), True)
+        assert calf.dehorn.actual_date == dt.date(2023, 12, 6)
+        assert calf.restall is restall
+        assert calf.restall.expected_date == dt.date(2023, 12, 11)
@@ -1,11 +1,23 @@
-from data.db_handler import DatabaseHandler, database_creation_script
+from data.query_stats import QueryStats
+from data.db_handler import (
+    DatabaseHandler,
+    WriteBatch,
+    database_creation_script,
+    SCHEMA_VERSION,
+    connection_pool,
+    delete,
+)
 from models.gender import Gender
 from models.calf import FatteningCalf, BreedingCalf
+from models.farm import Farm
+from models.treatment import Birth, Restall
+import collections
 import datetime as dt
 import pytest
 import sys
 import os
 import sqlite3
+import threading
 
 # This code snippet does the following:
 #     1. It adjusts the Python path to include the parent directory
@@ -47,6 +59,44 @@ class TestDatabaseHandlerDeleteEntries:
 
             db_handler.delete_calf(12345)
 
+    def test_delete_calf_cascades(self):
+        with DatabaseHandler(db_name="test.db", db_type="memory") as db_handler:
+            db_handler.save_calf(
+                BreedingCalf(dt.date(2023, 11, 20), Gender.Female, 12345, True)
+            )
+            db_handler.save_calf(
+                FatteningCalf(dt.date(2023, 11, 20), Gender.Male, 99001, True)
+            )
+            db_handler.save_calf_weight(12345, dt.date(2023, 12, 1), 80)
+
+            statements = []
+            db_handler.connection.set_trace_callback(statements.append)
+            db_handler.delete_calf(12345)
+            db_handler.connection.set_trace_callback(None)
+
+            # The trace repeats the statement for every cascaded table
+            assert {s for s in statements if s.startswith("DELETE")} == {
+                "DELETE FROM calf WHERE ear_tag = 12345"
+            }
+            for table_name in ["weight"] + DatabaseHandler.treatment_tables:
+                db_handler.cursor.execute(f"SELECT ear_tag FROM {table_name}")
+                assert 12345 not in [row[0] for row in db_handler.cursor.fetchall()]
+            assert db_handler.fetch_calf(99001) is not None
+
+    def test_week_query_uses_index(self):
+        with DatabaseHandler(db_name="test.db", db_type="memory") as db_handler:
+            db_handler.cursor.execute(
+                "EXPLAIN QUERY PLAN SELECT ear_tag FROM dehorn WHERE planned BETWEEN ? AND ?",
+                (19681, 19687),
+            )
+            assert "INDEX dehorn_planned (planned>? AND planned<?)" in db_handler.cursor.fetchone()[3]
+
+            db_handler.cursor.execute(
+                "EXPLAIN QUERY PLAN SELECT * FROM weight WHERE date BETWEEN ? AND ?",
+                (19681, 19687),
+            )
+            assert "INDEX weight_date (date>? AND date<?)" in db_handler.cursor.fetchone()[3]
+
 
 class TestDatabaseHandlerIntegration:
     def test_save_calf(self):
@@ -332,3 +382,824 @@ class TestDatabaseHandlerIntegration:
             assert retrieved_calf[2].ear_tag == 12343
             assert retrieved_calf[3].ear_tag == 12344
             assert retrieved_calf[4].ear_tag == 12345
+
+    def test_fetch_all_calves_matches_fetch_calf(self):
+        with DatabaseHandler(db_name="test.db", db_type="memory") as db_handler:
+            breeding_calf = BreedingCalf(dt.date(2023, 11, 20), Gender.Female, 1, True)
+            breeding_calf.edit_bovalto1(dt.date(2023, 12, 1))
+            breeding_calf_without_ringworm = BreedingCalf(
+                dt.date(2023, 11, 21), Gender.Male, 2, False
+            )
+            breeding_calf_without_ringworm.delete_ringworm()
+            fattening_calf = FatteningCalf(dt.date(2023, 11, 22), Gender.Male, 99001, True)
+            fattening_calf.edit_restall(dt.date(2023, 12, 14))
+            fattening_calf_without_dehorning = FatteningCalf(
+                dt.date(2023, 11, 23), Gender.Female, 99002, False
+            )
+
+            calves = [
+                breeding_calf,
+                breeding_calf_without_ringworm,
+                fattening_calf,
+                fattening_calf_without_dehorning,
+            ]
+            for calf in calves:
+                db_handler.save_calf(calf)
+
+            retrieved_calves = db_handler.fetch_all_calves()
+            assert [calf.ear_tag for calf in retrieved_calves] == [1, 2, 99001, 99002]
+
+            for retrieved_calf in retrieved_calves:
+                single_calf = db_handler.fetch_calf(retrieved_calf.ear_tag)
+                assert type(retrieved_calf) is type(single_calf)
+                assert retrieved_calf.gender == single_calf.gender
+                assert retrieved_calf.as_tuple() == single_calf.as_tuple()
+                assert [
+                    (treatment.expected_date, treatment.actual_date)
+                    for treatment in [retrieved_calf.birth] + retrieved_calf.treatments
+                    if treatment is not None
+                ] == [
+                    (treatment.expected_date, treatment.actual_date)
+                    for treatment in [single_calf.birth] + single_calf.treatments
+                    if treatment is not None
+                ]
+
+    def test_fetch_calf_not_found(self):
+        with DatabaseHandler(db_name="test.db", db_type="memory") as db_handler:
+            assert db_handler.fetch_calf(12345) is None
+
+
+class TestDatabaseHandlerSaveChanges:
+    def test_save_changes_new_farm(self):
+        with DatabaseHandler(db_name="test.db", db_type="memory") as db_handler:
+            farm = Farm()
+            farm.add_calves(
+                [
+                    BreedingCalf(dt.date(2023, 11, 20), Gender.Female, 1, True),
+                    FatteningCalf(dt.date(2023, 11, 20), Gender.Male, 99001, False),
+                ]
+            )
+
+            db_handler.save_changes(farm)
+            assert farm.get_changed_calves() == []
+
+            retrieved_calves = db_handler.fetch_all_calves()
+            assert [calf.as_tuple() for calf in retrieved_calves] == [
+                farm.get_calf(1).as_tuple(),
+                farm.get_calf(99001).as_tuple(),
+            ]
+            assert not any(calf.has_changes() for calf in retrieved_calves)
+
+    def test_save_changes_only_writes_changes(self):
+        with DatabaseHandler(db_name="test.db", db_type="memory") as db_handler:
+            farm = Farm()
+            farm.add_calves(
+                [
+                    BreedingCalf(dt.date(2023, 11, 20), Gender.Female, i, True)
+                    for i in range(1, 11)
+                ]
+            )
+            db_handler.save_changes(farm)
+
+            farm = Farm()
+            farm.add_calves(db_handler.fetch_all_calves(), set_ringworm=False)
+            farm.edit_calf(3, Restall, dt.date(2023, 12, 12), True)
+
+            changes_before = db_handler.connection.total_changes
+            db_handler.save_changes(farm)
+            # The restall row, and its job moved to another day in the workload table
+            assert db_handler.connection.total_changes - changes_before == 1 + 2
+
+            assert db_handler.fetch_calf(3).restall.actual_date == dt.date(2023, 12, 12)
+
+    def test_save_changes_deleted(self):
+        with DatabaseHandler(db_name="test.db", db_type="memory") as db_handler:
+            farm = Farm()
+            farm.add_calves(
+                [
+                    BreedingCalf(dt.date(2023, 11, 20), Gender.Female, 1, True),
+                    BreedingCalf(dt.date(2023, 11, 20), Gender.Female, 2, True),
+                ]
+            )
+            db_handler.save_changes(farm)
+
+            farm.delete_calf(1)
+            farm.get_calf(2).delete_dehorn()
+            db_handler.save_changes(farm)
+
+            assert db_handler.fetch_calf(1) is None
+            assert db_handler.fetch_calf(2).dehorn is None
+            assert farm.get_deleted_ear_tags() == set()
+
+    @pytest.mark.parametrize("layout", ["tables", "events"])
+    def test_save_changes_ear_tag(self, layout):
+        with DatabaseHandler(
+            db_name="test.db", db_type="memory", layout=layout
+        ) as db_handler:
+            farm = Farm()
+            farm.add_calf(BreedingCalf(dt.date(2023, 11, 20), Gender.Female, 1, True))
+            db_handler.save_changes(farm)
+            db_handler.save_weights([(1, dt.date(2023, 12, 1), 50)])
+
+            farm.change_ear_tag(1, 2)
+            db_handler.save_changes(farm)
+
+            assert db_handler.fetch_calf(1) is None
+            assert db_handler.fetch_calf(2).as_tuple() == farm.get_calf(2).as_tuple()
+            # The weights are kept
+            assert db_handler.fetch_calf_weights(2) == [(dt.date(2023, 12, 1), 50)]
+
+    def test_save_changes_ear_tag_and_calf_type(self):
+        with DatabaseHandler(db_name="test.db", db_type="memory") as db_handler:
+            farm = Farm()
+            farm.add_calf(BreedingCalf(dt.date(2023, 11, 20), Gender.Female, 1, True))
+            db_handler.save_changes(farm)
+            db_handler.save_weights([(1, dt.date(2023, 12, 1), 50)])
+
+            # Like the overview, the type is changed by deleting and adding the renamed calf
+            farm.change_ear_tag(1, 2)
+            farm.delete_calf(2)
+            farm.add_calf(FatteningCalf(dt.date(2023, 11, 20), Gender.Female, 2, True))
+            db_handler.save_changes(farm)
+
+            assert db_handler.fetch_calf(1) is None
+            assert isinstance(db_handler.fetch_calf(2), FatteningCalf)
+            assert db_handler.fetch_calf_weights(2) == [(dt.date(2023, 12, 1), 50)]
+
+    @pytest.mark.parametrize("layout", ["tables", "events"])
+    def test_save_changes_swapped_ear_tags(self, layout):
+        with DatabaseHandler(
+            db_name="test.db", db_type="memory", layout=layout
+        ) as db_handler:
+            farm = Farm()
+            farm.add_calves(
+                [
+                    BreedingCalf(dt.date(2023, 11, 20), Gender.Female, 1, True),
+                    FatteningCalf(dt.date(2023, 11, 21), Gender.Male, 2, True),
+                ]
+            )
+            db_handler.save_changes(farm)
+            db_handler.save_weights(
+                [(1, dt.date(2023, 12, 1), 50), (2, dt.date(2023, 12, 1), 60)]
+            )
+
+            farm.change_ear_tag(1, 3)
+            farm.change_ear_tag(2, 1)
+            farm.change_ear_tag(3, 2)
+            db_handler.save_changes(farm)
+
+            assert isinstance(db_handler.fetch_calf(1), FatteningCalf)
+            assert db_handler.fetch_calf(2).as_tuple() == farm.get_calf(2).as_tuple()
+            assert db_handler.fetch_calf_weights(1) == [(dt.date(2023, 12, 1), 60)]
+            assert db_handler.fetch_calf_weights(2) == [(dt.date(2023, 12, 1), 50)]
+
+    def test_save_changes_calf_type(self):
+        with DatabaseHandler(db_name="test.db", db_type="memory") as db_handler:
+            farm = Farm()
+            farm.add_calf(FatteningCalf(dt.date(2023, 11, 20), Gender.Female, 1, True))
+            db_handler.save_changes(farm)
+
+            farm.delete_calf(1)
+            farm.add_calf(BreedingCalf(dt.date(2023, 11, 20), Gender.Female, 1, True))
+            db_handler.save_changes(farm)
+
+            retrieved_calf = db_handler.fetch_calf(1)
+            assert isinstance(retrieved_calf, BreedingCalf)
+            assert retrieved_calf.as_tuple() == farm.get_calf(1).as_tuple()
+            db_handler.cursor.execute("SELECT * FROM sell")
+            assert db_handler.cursor.fetchall() == []
+
+
+class TestDatabaseHandlerMigration:
+    def test_dates_stored_as_days(self):
+        with DatabaseHandler(db_name="test.db", db_type="memory") as db_handler:
+            calf = BreedingCalf(dt.date(2023, 11, 20), Gender.Female, 12345, True)
+            calf.delete_ringworm2()
+            db_handler.save_calf(calf)
+
+            db_handler.cursor.execute("SELECT planned, actual FROM birth")
+            assert db_handler.cursor.fetchall() == [(19681, None)]
+            db_handler.cursor.execute("SELECT * FROM ringworm2")
+            assert db_handler.cursor.fetchall() == []
+            assert db_handler.get_schema_version() == SCHEMA_VERSION
+
+    def test_migrate_text_dates(self, tmp_path):
+        db_name = str(tmp_path / "calves.sqlite")
+
+        # Dates as they were stored before version 1
+        connection = sqlite3.connect(db_name)
+        connection.executescript(database_creation_script)
+        connection.executescript(
+            """
+            PRAGMA user_version = 0;
+            INSERT INTO calf VALUES (99001, 'm', 'fattening');
+            INSERT INTO birth VALUES (99001, '2023-11-15', 'None');
+            INSERT INTO bovalto1 VALUES (99001, '2023-11-27', '2023-11-28');
+            INSERT INTO restall VALUES (99001, '2023-12-04', 'None');
+            INSERT INTO sell VALUES (99001, '2023-12-19', 'None');
+            INSERT INTO weight VALUES (99001, '2023-12-01', 80);
+            """
+        )
+        connection.commit()
+        connection.close()
+
+        with DatabaseHandler(db_name=db_name, db_type="sqlite") as db_handler:
+            assert db_handler.get_schema_version() == SCHEMA_VERSION
+
+            db_handler.cursor.execute("SELECT planned, actual FROM bovalto1")
+            assert db_handler.cursor.fetchall() == [(19688, 19689)]
+            db_handler.cursor.execute("SELECT planned, actual FROM birth")
+            assert db_handler.cursor.fetchall() == [(19676, None)]
+
+            calf = db_handler.fetch_all_calves()[0]
+            assert calf.birth.expected_date == dt.date(2023, 11, 15)
+            assert calf.birth.actual_date is None
+            assert calf.bovalto_1.actual_date == dt.date(2023, 11, 28)
+            assert calf.dehorn is None
+            assert db_handler.fetch_calf_weights(99001) == [(dt.date(2023, 12, 1), 80)]
+
+        # The migration only runs once
+        with DatabaseHandler(db_name=db_name, db_type="sqlite") as db_handler:
+            db_handler.cursor.execute("SELECT planned, actual FROM bovalto1")
+            assert db_handler.cursor.fetchall() == [(19688, 19689)]
+
+    def test_migrate_to_cascade(self, tmp_path):
+        db_name = str(tmp_path / "calves.sqlite")
+
+        # Foreign keys without ON DELETE CASCADE, as they were before version 2
+        connection = sqlite3.connect(db_name)
+        connection.executescript(
+            database_creation_script.replace(" ON DELETE CASCADE", "").split(
+                "CREATE INDEX"
+            )[0]
+            + """
+            PRAGMA user_version = 1;
+            INSERT INTO calf VALUES (99001, 'm', 'fattening');
+            INSERT INTO birth VALUES (99001, 19676, NULL);
+            INSERT INTO weight VALUES (99001, 19692, 80);
+            INSERT INTO birth VALUES (99002, 19676, NULL);
+            """
+        )
+        connection.commit()
+        connection.close()
+
+        with DatabaseHandler(db_name=db_name, db_type="sqlite") as db_handler:
+            assert db_handler.get_schema_version() == SCHEMA_VERSION
+
+            # The entry of a calf which doesn't exist is dropped
+            db_handler.cursor.execute("SELECT * FROM birth")
+            assert db_handler.cursor.fetchall() == [(99001, 19676, None)]
+            db_handler.cursor.execute("SELECT name FROM sqlite_master WHERE type = 'index'")
+            assert "birth_planned" in [row[0] for row in db_handler.cursor.fetchall()]
+            db_handler.cursor.execute("PRAGMA foreign_key_check")
+            assert db_handler.cursor.fetchall() == []
+
+            db_handler.delete_calf(99001)
+            db_handler.cursor.execute("SELECT * FROM weight")
+            assert db_handler.cursor.fetchall() == []
+
+        connection_pool.close(db_name)
+
+
+class TestDatabaseHandlerWriteBatch:
+    def test_rows_grouped_per_table(self):
+        batch = WriteBatch()
+        batch.add_calf(BreedingCalf(dt.date(2023, 11, 20), Gender.Female, 12345, False))
+        batch.add_calf(FatteningCalf(dt.date(2023, 11, 20), Gender.Male, 99001, True))
+        batch.delete_calf(12346)
+
+        assert batch.calves == [(12345, "w", "breeding"), (99001, "m", "fattening")]
+        assert batch.treatments["birth"] == [(12345, 19681, None), (99001, 19681, None)]
+        assert [row[0] for row in batch.treatments["dehorn"]] == [99001]
+        assert batch.deleted_rows["calf"] == [12346]
+        assert len(batch) == 2 + 6 + 5 + 1
+
+    def test_write_is_one_transaction(self):
+        with DatabaseHandler(db_name="test.db", db_type="memory") as db_handler:
+            batch = WriteBatch()
+            batch.add_calf(BreedingCalf(dt.date(2023, 11, 20), Gender.Female, 12345, True))
+            batch.treatments["unknown"] = [(12345, 19681, None)]
+
+            with pytest.raises(sqlite3.OperationalError):
+                db_handler.write(batch)
+
+            db_handler.cursor.execute("SELECT * FROM calf")
+            assert db_handler.cursor.fetchall() == []
+            db_handler.cursor.execute("SELECT * FROM birth")
+            assert db_handler.cursor.fetchall() == []
+
+    def test_save_farm_updates_in_place(self):
+        with DatabaseHandler(db_name="test.db", db_type="memory") as db_handler:
+            farm = Farm()
+            farm.add_calf(BreedingCalf(dt.date(2023, 11, 20), Gender.Female, 12345, True))
+            db_handler.save_farm(farm)
+
+            farm.get_calf(12345).edit_gender(Gender.Male)
+            farm.get_calf(12345).edit_restall(dt.date(2023, 12, 12))
+            db_handler.save_farm(farm)
+
+            db_handler.cursor.execute("SELECT * FROM calf")
+            assert db_handler.cursor.fetchall() == [(12345, "m", "breeding")]
+            assert db_handler.fetch_calf(12345).restall.actual_date == dt.date(
+                2023, 12, 12
+            )
+
+
+class TestDatabaseHandlerConnectionPool:
+    def test_connection_reused_per_thread(self, tmp_path):
+        db_name = str(tmp_path / "calves.sqlite")
+        with DatabaseHandler(db_name=db_name, db_type="sqlite") as db_handler:
+            connection = db_handler.connection
+            db_handler.cursor.execute("PRAGMA journal_mode")
+            assert db_handler.cursor.fetchone() == ("wal",)
+            db_handler.cursor.execute("PRAGMA synchronous")
+            assert db_handler.cursor.fetchone() == (1,)  # NORMAL
+
+        with DatabaseHandler(db_name=db_name, db_type="sqlite") as db_handler:
+            assert db_handler.connection is connection
+
+        connections = []
+
+        def connect():
+            with DatabaseHandler(db_name=db_name, db_type="sqlite") as db_handler:
+                connections.append(db_handler.connection)
+
+        thread = threading.Thread(target=connect)
+        thread.start()
+        thread.join()
+        assert connections[0] is not connection
+
+        connection_pool.close(db_name)
+
+    def test_pragmas_from_configuration(self, tmp_path):
+        db_name = str(tmp_path / "calves.sqlite")
+        pragmas = {"journal_mode": "WAL", "cache_size": -4000}
+        with DatabaseHandler(db_name=db_name, db_type="sqlite", pragmas=pragmas) as db_handler:
+            db_handler.cursor.execute("PRAGMA cache_size")
+            assert db_handler.cursor.fetchone() == (-4000,)
+
+        connection_pool.close(db_name)
+
+    def test_deleted_database_is_created_again(self, tmp_path):
+        db_name = str(tmp_path / "calves.sqlite")
+        with DatabaseHandler(db_name=db_name, db_type="sqlite") as db_handler:
+            db_handler.save_calf(
+                BreedingCalf(dt.date(2023, 11, 20), Gender.Female, 12345, True)
+            )
+
+        delete(db_name)
+
+        with DatabaseHandler(db_name=db_name, db_type="sqlite") as db_handler:
+            assert db_handler.fetch_all_calves() == []
+
+        connection_pool.close(db_name)
+
+    def test_reader_not_blocked_by_writer(self, tmp_path):
+        db_name = str(tmp_path / "calves.sqlite")
+        with DatabaseHandler(db_name=db_name, db_type="sqlite") as db_handler:
+            db_handler.save_calf(
+                BreedingCalf(dt.date(2023, 11, 20), Gender.Female, 12345, True)
+            )
+
+        # Another process in the middle of writing
+        writer = sqlite3.connect(db_name, timeout=0)
+        writer.execute("BEGIN EXCLUSIVE")
+        writer.execute("DELETE FROM calf")
+
+        with DatabaseHandler(db_name=db_name, db_type="sqlite") as db_handler:
+            assert [calf.ear_tag for calf in db_handler.fetch_all_calves()] == [12345]
+
+        writer.commit()
+        writer.close()
+        connection_pool.close(db_name)
+
+    def test_in_memory_database(self, tmp_path, monkeypatch):
+        monkeypatch.chdir(tmp_path)
+        with DatabaseHandler(db_name=":memory:", db_type="sqlite") as db_handler:
+            db_handler.save_calf(
+                BreedingCalf(dt.date(2023, 11, 20), Gender.Female, 12345, True)
+            )
+
+            # Another handler gets its own database
+            with DatabaseHandler(db_name=":memory:", db_type="sqlite") as other_handler:
+                assert other_handler.fetch_all_calves() == []
+
+            assert [calf.ear_tag for calf in db_handler.fetch_all_calves()] == [12345]
+
+        # The database is gone with its handler
+        with DatabaseHandler(db_name=":memory:", db_type="sqlite") as db_handler:
+            assert db_handler.fetch_all_calves() == []
+
+        assert os.listdir(tmp_path) == []
+
+
+class TestDatabaseHandlerEventLayout:
+    def create_farm(self) -> Farm:
+        farm = Farm()
+        farm.add_calves(
+            [
+                BreedingCalf(dt.date(2023, 11, 20), Gender.Female, 12345, False),
+                FatteningCalf(dt.date(2023, 11, 20), Gender.Male, 99001, True),
+                FatteningCalf(dt.date(2023, 11, 27), Gender.Female, 99002, True),
+            ]
+        )
+        farm.edit_calf(99001, Restall, dt.date(2023, 12, 12), True)
+        return farm
+
+    def test_save_and_fetch(self):
+        farm = self.create_farm()
+        with DatabaseHandler(db_name="test.db", db_type="memory") as db_handler:
+            db_handler.save_farm(farm)
+            expected = [calf.as_tuple() for calf in db_handler.fetch_all_calves()]
+            treatment_count = 0
+            for table_name in DatabaseHandler.treatment_tables:
+                db_handler.cursor.execute(f"SELECT COUNT(*) FROM {table_name}")
+                treatment_count += db_handler.cursor.fetchone()[0]
+
+        with DatabaseHandler(
+            db_name="test.db", db_type="memory", layout="events"
+        ) as db_handler:
+            db_handler.save_farm(farm)
+            assert db_handler.get_layout() == "events"
+            assert [calf.as_tuple() for calf in db_handler.fetch_all_calves()] == expected
+            assert db_handler.fetch_calf(99001).as_tuple() == expected[1]
+            assert db_handler.fetch_calf(1) is None
+
+            db_handler.cursor.execute("SELECT COUNT(*) FROM treatment_event")
+            assert db_handler.cursor.fetchone() == (treatment_count,)
+
+    def test_save_changes(self):
+        with DatabaseHandler(
+            db_name="test.db", db_type="memory", layout="events"
+        ) as db_handler:
+            farm = self.create_farm()
+            db_handler.save_farm(farm)
+
+            farm.get_calf(99002).delete_dehorn()
+            farm.delete_calf(12345)
+            db_handler.save_changes(farm)
+
+            assert db_handler.fetch_calf(99002).dehorn is None
+            db_handler.cursor.execute(
+                "SELECT DISTINCT ear_tag FROM treatment_event ORDER BY ear_tag"
+            )
+            assert db_handler.cursor.fetchall() == [(99001,), (99002,)]
+
+    def test_convert_both_ways(self, tmp_path):
+        db_name = str(tmp_path / "calves.sqlite")
+        with DatabaseHandler(db_name=db_name, db_type="sqlite") as db_handler:
+            db_handler.save_farm(self.create_farm())
+            expected = [calf.as_tuple() for calf in db_handler.fetch_all_calves()]
+
+        with DatabaseHandler(db_name=db_name, db_type="sqlite", layout="events") as db_handler:
+            assert db_handler.get_layout() == "events"
+            assert [calf.as_tuple() for calf in db_handler.fetch_all_calves()] == expected
+
+        # An existing database keeps its layout
+        with DatabaseHandler(db_name=db_name, db_type="sqlite") as db_handler:
+            assert db_handler.treatment_store.layout == "events"
+
+        with DatabaseHandler(db_name=db_name, db_type="sqlite", layout="tables") as db_handler:
+            db_handler.cursor.execute("SELECT name FROM sqlite_master")
+            names = [row[0] for row in db_handler.cursor.fetchall()]
+            assert "treatment_event" not in names
+            assert "dehorn_planned" in names
+            assert [calf.as_tuple() for calf in db_handler.fetch_all_calves()] == expected
+
+        connection_pool.close(db_name)
+
+    def test_jobs_between_dates_use_index(self):
+        with DatabaseHandler(
+            db_name="test.db", db_type="memory", layout="events"
+        ) as db_handler:
+            db_handler.cursor.execute(
+                "EXPLAIN QUERY PLAN SELECT ear_tag, kind FROM treatment_event WHERE planned BETWEEN ? AND ?",
+                (19681, 19687),
+            )
+            plan = [row[3] for row in db_handler.cursor.fetchall()]
+            assert plan == [
+                "SEARCH treatment_event USING INDEX treatment_event_planned (planned>? AND planned<?)"
+            ]
+
+
+class TestDatabaseHandlerFetchJobs:
+    def create_farm(self) -> Farm:
+        farm = Farm()
+        farm.add_calves(
+            [
+                BreedingCalf(dt.date(2023, 11, 6 + i), Gender.Female, 12340 + i, True)
+                for i in range(6)
+            ]
+            + [
+                FatteningCalf(dt.date(2023, 11, 20), Gender.Male, 99002, True),
+                FatteningCalf(dt.date(2023, 11, 13), Gender.Male, 99001, False),
+                BreedingCalf(dt.date(2023, 11, 8), Gender.Male, 99100, True),
+            ]
+        )
+        # Done a week later than planned
+        farm.edit_calf(99001, Restall, dt.date(2023, 12, 20), False)
+        return farm
+
+    @pytest.mark.parametrize("layout", ["tables", "events"])
+    def test_same_jobs_as_farm(self, layout):
+        farm = self.create_farm()
+        with DatabaseHandler(
+            db_name="test.db", db_type="memory", layout=layout
+        ) as db_handler:
+            db_handler.save_farm(farm)
+
+            # Calves are added to a loaded farm in the order of their ear tags
+            farm = Farm()
+            farm.add_calves(db_handler.fetch_all_calves(), set_ringworm=False)
+
+            for week in range(45, 53):
+                start_date = dt.date.fromisocalendar(2023, week, 1)
+                jobs = db_handler.fetch_jobs(
+                    start_date, start_date + dt.timedelta(days=6)
+                )
+                assert jobs == farm.get_jobs_in_week(week, 2023)
+
+            start_date = dt.date.fromisocalendar(2023, 51, 1)
+            jobs = db_handler.fetch_jobs(start_date, start_date + dt.timedelta(days=6))
+            assert (99001, "Restall", farm.get_calf(99001).restall.expected_date) in jobs
+
+    @pytest.mark.parametrize("layout", ["tables", "events"])
+    def test_only_index_range_scans(self, layout):
+        with DatabaseHandler(
+            db_name="test.db", db_type="memory", layout=layout
+        ) as db_handler:
+            db_handler.cursor.execute(
+                "EXPLAIN QUERY PLAN " + db_handler.treatment_store.select_jobs(),
+                {"start": 19681, "end": 19687},
+            )
+            plan = [row[3] for row in db_handler.cursor.fetchall()]
+            assert not any(step.startswith("SCAN") for step in plan)
+            assert any("(planned>? AND planned<?)" in step for step in plan)
+            assert any("(actual>? AND actual<?)" in step for step in plan)
+
+    def test_fetch_max_breeding_calf_ear_tag(self):
+        with DatabaseHandler(db_name="test.db", db_type="memory") as db_handler:
+            assert db_handler.fetch_max_breeding_calf_ear_tag() == 0
+
+            farm = self.create_farm()
+            db_handler.save_farm(farm)
+            assert (
+                db_handler.fetch_max_breeding_calf_ear_tag()
+                == farm.get_max_breeding_calf_ear_tag()
+                == 12345
+            )
+
+    @pytest.mark.parametrize("layout", ["tables", "events"])
+    def test_fetch_births(self, layout):
+        with DatabaseHandler(
+            db_name="test.db", db_type="memory", layout=layout
+        ) as db_handler:
+            farm = self.create_farm()
+            db_handler.save_farm(farm)
+
+            births = db_handler.fetch_births()
+            assert births == {
+                calf.ear_tag: (calf.calf_type, str(calf.gender), calf.birthday)
+                for calf in farm.get_calves()
+            }
+            assert births[99001] == ("fattening", "m", dt.date(2023, 11, 13))
+
+
+class TestDatabaseHandlerWeights:
+    def create_farm(self) -> Farm:
+        farm = Farm()
+        farm.add_calves(
+            [
+                BreedingCalf(dt.date(2023, 11, 20), Gender.Female, 12345, True),
+                FatteningCalf(dt.date(2023, 11, 20), Gender.Male, 99001, True),
+                FatteningCalf(dt.date(2023, 11, 21), Gender.Male, 99002, True),
+            ]
+        )
+        return farm
+
+    def test_save_weights(self):
+        stats = QueryStats()
+        with DatabaseHandler(
+            db_name="test.db", db_type="memory", stats=stats
+        ) as db_handler:
+            db_handler.save_farm(self.create_farm())
+            stats.reset()
+
+            # A reading per calf and day, the last reading of a day wins
+            readings = [
+                (ear_tag, dt.date(2023, 12, 1) + dt.timedelta(days=day), 50 + day)
+                for day in range(100)
+                for ear_tag in [12345, 99001]
+            ]
+            readings.append((99001, dt.date(2023, 12, 1), 49))
+            assert db_handler.save_weights(iter(readings)) == 201
+
+            weights = db_handler.fetch_calf_weights(99001)
+            assert len(weights) == 100
+            assert weights[0] == (dt.date(2023, 12, 1), 49)
+            assert weights == sorted(weights)
+
+            assert db_handler.fetch_latest_weights() == {
+                12345: (dt.date(2024, 3, 9), 149),
+                99001: (dt.date(2024, 3, 9), 149),
+            }
+
+        # All readings are written with one statement
+        inserts = [
+            statement
+            for statement in stats.summary().statements
+            if statement.sql.startswith("INSERT INTO weight")
+        ]
+        assert [(statement.calls, statement.rows) for statement in inserts] == [
+            (1, 201)
+        ]
+
+    def test_save_weights_of_unknown_calves(self):
+        with DatabaseHandler(db_name="test.db", db_type="memory") as db_handler:
+            db_handler.save_farm(self.create_farm())
+
+            # The reading of an unknown calf is skipped, the others are saved
+            readings = [
+                (12345, dt.date(2023, 12, 1), 60),
+                (55555, dt.date(2023, 12, 1), 80),
+                (99001, dt.date(2023, 12, 1), 70),
+            ]
+            assert db_handler.save_weights(readings) == 2
+            assert db_handler.fetch_latest_weights() == {
+                12345: (dt.date(2023, 12, 1), 60),
+                99001: (dt.date(2023, 12, 1), 70),
+            }
+
+    def test_fetch_weights_in_range(self):
+        with DatabaseHandler(db_name="test.db", db_type="memory") as db_handler:
+            db_handler.save_farm(self.create_farm())
+            db_handler.save_weights(
+                [
+                    (12345, dt.date(2023, 12, 1), 60),
+                    (12345, dt.date(2023, 12, 8), 65),
+                    (99001, dt.date(2023, 12, 8), 70),
+                    (99002, dt.date(2023, 12, 15), 75),
+                ]
+            )
+
+            assert db_handler.fetch_calf_weights(
+                12345, start_date=dt.date(2023, 12, 2)
+            ) == [(dt.date(2023, 12, 8), 65)]
+            assert db_handler.fetch_calf_weights(
+                12345, end_date=dt.date(2023, 12, 7)
+            ) == [(dt.date(2023, 12, 1), 60)]
+            assert db_handler.fetch_weights(
+                dt.date(2023, 12, 8), dt.date(2023, 12, 15)
+            ) == [
+                (12345, dt.date(2023, 12, 8), 65),
+                (99001, dt.date(2023, 12, 8), 70),
+                (99002, dt.date(2023, 12, 15), 75),
+            ]
+
+    def test_save_calf_weights_replaces_weights(self):
+        with DatabaseHandler(db_name="test.db", db_type="memory") as db_handler:
+            db_handler.save_farm(self.create_farm())
+            db_handler.save_calf_weights(
+                12345, [(dt.date(2023, 12, 1), 60), (dt.date(2023, 12, 8), 65)]
+            )
+            db_handler.save_calf_weight(99001, dt.date(2023, 12, 8), 70)
+
+            # A row was removed and one was changed in the table of the page
+            db_handler.save_calf_weights(12345, [(dt.date(2023, 12, 8), 66)])
+
+            assert db_handler.fetch_calf_weights(12345) == [(dt.date(2023, 12, 8), 66)]
+            assert db_handler.fetch_calf_weights(99001) == [(dt.date(2023, 12, 8), 70)]
+
+
+def count_jobs(calves: list[BreedingCalf | FatteningCalf]) -> collections.Counter:
+    # (day, treatment) -> jobs, counted from the calves
+    return collections.Counter(
+        (treatment.get_date(), treatment.display_name)
+        for calf in calves
+        for treatment in calf.treatments
+        if treatment is not None
+    )
+
+
+class TestDatabaseHandlerWorkload:
+    def create_farm(self) -> Farm:
+        farm = Farm()
+        farm.add_calves(
+            [
+                BreedingCalf(dt.date(2023, 11, 6 + i % 3), Gender.Female, 12340 + i, True)
+                for i in range(8)
+            ]
+            + [
+                FatteningCalf(dt.date(2023, 11, 20), Gender.Male, 99002, True),
+                FatteningCalf(dt.date(2023, 11, 13), Gender.Male, 99001, False),
+            ]
+        )
+        return farm
+
+    def fetch_workload(self, db_handler: DatabaseHandler) -> collections.Counter:
+        return collections.Counter(
+            {
+                (day, treatment): jobs
+                for day, treatment, jobs in db_handler.fetch_workload(
+                    dt.date(2023, 1, 1), dt.date(2024, 12, 31)
+                )
+            }
+        )
+
+    @pytest.mark.parametrize("layout", ["tables", "events"])
+    def test_workload_follows_changes(self, layout):
+        farm = self.create_farm()
+        with DatabaseHandler(
+            db_name="test.db", db_type="memory", layout=layout
+        ) as db_handler:
+            db_handler.save_farm(farm)
+            assert self.fetch_workload(db_handler) == count_jobs(farm.get_calves())
+
+            farm.edit_calf(99001, Restall, dt.date(2023, 12, 20), False)
+            farm.edit_calf(12340, Birth, dt.date(2023, 11, 8), True)
+            farm.delete_calf(12341)
+            db_handler.save_changes(farm)
+            db_handler.delete_calf(99002)
+
+            calves = db_handler.fetch_all_calves()
+            assert len(calves) == 8
+            assert self.fetch_workload(db_handler) == count_jobs(calves)
+
+    def test_weekly_workload(self):
+        farm = self.create_farm()
+        with DatabaseHandler(db_name="test.db", db_type="memory") as db_handler:
+            db_handler.save_farm(farm)
+
+            weekly_jobs = collections.Counter()
+            for (day, treatment), jobs in count_jobs(farm.get_calves()).items():
+                monday = day - dt.timedelta(days=day.weekday())
+                if dt.date(2023, 11, 27) <= monday < dt.date(2024, 1, 29):
+                    weekly_jobs[(monday, treatment)] += jobs
+
+            # Any day of the first week
+            workload = db_handler.fetch_weekly_workload(dt.date(2023, 11, 30), 9)
+            assert collections.Counter(
+                {(monday, treatment): jobs for monday, treatment, jobs in workload}
+            ) == weekly_jobs
+            assert workload == sorted(workload)
+
+    def test_workload_after_migration_and_conversion(self, tmp_path):
+        db_name = str(tmp_path / "calves.sqlite")
+        farm = self.create_farm()
+        with DatabaseHandler(db_name=db_name, db_type="sqlite") as db_handler:
+            db_handler.save_farm(farm)
+        connection_pool.forget(db_name)
+
+        # The database as it was in version 2, before the workload table
+        connection = sqlite3.connect(db_name)
+        triggers = connection.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'trigger'"
+        ).fetchall()
+        assert len(triggers) == 3 * 7
+        connection.executescript(
+            "".join(f"DROP TRIGGER {name};" for name, in triggers)
+            + "DROP TABLE workload; PRAGMA user_version = 2;"
+        )
+        connection.close()
+
+        with DatabaseHandler(db_name=db_name, db_type="sqlite") as db_handler:
+            assert db_handler.get_schema_version() == SCHEMA_VERSION
+            assert self.fetch_workload(db_handler) == count_jobs(farm.get_calves())
+
+        # The triggers are created for the new layout
+        for layout in ["events", "tables"]:
+            with DatabaseHandler(
+                db_name=db_name, db_type="sqlite", layout=layout
+            ) as db_handler:
+                assert self.fetch_workload(db_handler) == count_jobs(farm.get_calves())
+
+                db_handler.delete_calf(12340)
+                farm.delete_calf(12340, set_ringworm=False)
+                assert self.fetch_workload(db_handler) == count_jobs(farm.get_calves())
+
+                calf = BreedingCalf(dt.date(2023, 11, 6), Gender.Female, 12340, True)
+                farm.add_calf(calf, set_ringworm=False)
+                db_handler.save_calf(calf)
+
+        connection_pool.close(db_name)
+
+
+class TestDatabaseHandlerPlanDeviations:
+    @pytest.mark.parametrize("layout", ["tables", "events"])
+    def test_plan_deviations(self, layout):
+        farm = TestDatabaseHandlerWorkload().create_farm()
+        farm.edit_calf(99001, Restall, dt.date(2023, 12, 20), False)
+        farm.edit_calf(12340, Birth, dt.date(2023, 11, 8), True)
+        with DatabaseHandler(
+            db_name="test.db", db_type="memory", layout=layout
+        ) as db_handler:
+            db_handler.save_farm(farm)
+            assert db_handler.fetch_plan_deviations() == []
+
+            # The sale of a calf planned by hand
+            sell = farm.get_calf(99002).sell
+            sell.reset(dt.date(2023, 12, 20), None)
+            db_handler.save_changes(farm)
+            assert db_handler.fetch_plan_deviations() == [
+                (99002, "Sell", dt.date(2023, 12, 20), dt.date(2023, 12, 19))
+            ]
@@ -13,6 +13,7 @@ from models.treatment import (
 from models.farm import Farm
 import pytest
 import datetime as dt
+import random
 import sys
 import os
 
@@ -663,3 +664,309 @@ class TestFarm:
         assert calf.dehorn.expected_date == dt.date(2023, 12, 4)
         assert calf.dehorn.actual_date == dt.date(2023, 12, 5)
         assert calf.restall.expected_date == dt.date(2023, 12, 11)
+
+    def test_track_changes(self):
+        farm = Farm()
+        calf_1 = BreedingCalf("2023-11-15", Gender.from_str("m"), 12341, True)
+        calf_2 = FatteningCalf("2023-11-15", Gender.from_str("m"), 99001, True)
+        farm.add_calves([calf_1, calf_2])
+        assert farm.get_changed_calves() == [calf_2, calf_1]
+
+        farm.mark_clean()
+        assert farm.get_changed_calves() == []
+        assert farm.get_deleted_ear_tags() == set()
+
+        farm.edit_calf(12341, Restall, dt.date(2023, 12, 12), True)
+        assert farm.get_changed_calves() == [calf_1]
+        assert calf_1.get_dirty_treatments() == [calf_1.restall]
+
+        farm.delete_calf(99001)
+        farm.delete_calf(99002)
+        assert farm.get_deleted_ear_tags() == {99001}
+
+        farm.change_ear_tag(12341, 12342)
+        assert farm.get_deleted_ear_tags() == {99001}
+        assert farm.get_renamed_ear_tags() == {12342: 12341}
+        assert calf_1.is_dirty
+
+        # The stored ear tag is kept until the farm is saved
+        farm.change_ear_tag(12342, 12343)
+        assert farm.get_renamed_ear_tags() == {12343: 12341}
+        farm.delete_calf(12343)
+        assert farm.get_deleted_ear_tags() == {99001, 12341}
+        assert farm.get_renamed_ear_tags() == {}
+
+    def test_track_changes_delete_and_add(self):
+        farm = Farm()
+        farm.add_calf(FatteningCalf("2023-11-15", Gender.from_str("m"), 12341, True))
+        farm.mark_clean()
+
+        # E.g. when the type of a calf is changed
+        farm.delete_calf(12341)
+        farm.add_calf(BreedingCalf("2023-11-15", Gender.from_str("m"), 12341, True))
+        assert farm.get_deleted_ear_tags() == set()
+        assert farm.get_changed_calves() == [farm.get_calf(12341)]
+
+    def test_track_changes_ringworm(self):
+        farm = Farm()
+        calves = [
+            BreedingCalf("2023-11-15", Gender.from_str("m"), 12341 + i, True)
+            for i in range(5)
+        ]
+        farm.add_calves(calves)
+        farm.mark_clean()
+
+        # Regrouping the same calves doesn't change anything
+        farm.set_ringworm()
+        assert farm.get_changed_calves() == []
+
+        # Removing a calf breaks up the group
+        farm.delete_calf(12345)
+        assert len(farm.get_changed_calves()) == 4
+
+    def test_ear_tag_index(self):
+        farm = Farm()
+        calf_1 = BreedingCalf("2023-11-15", Gender.from_str("m"), 12341, True)
+        calf_2 = FatteningCalf("2023-11-16", Gender.from_str("m"), 99001, True)
+        calf_3 = BreedingCalf("2023-11-17", Gender.from_str("m"), 12343, True)
+        farm.add_calves([calf_1, calf_2, calf_3])
+
+        assert farm.has_calf(99001)
+        assert farm.get_calf(99001) is calf_2
+        assert farm.get_fattening_calf(99001) is calf_2
+        with pytest.raises(Exception):
+            farm.get_breeding_calf(99001)
+
+        farm.change_ear_tag(12341, 12342)
+        assert not farm.has_calf(12341)
+        assert farm.get_calf(12342) is calf_1
+        assert farm.get_all_ear_tags() == [99001, 12342, 12343]
+
+        with pytest.raises(Exception) as exc_info:
+            farm.change_ear_tag(12342, 12343)
+        assert str(exc_info.value) == "Ear tag 12343 already exists"
+
+        farm.delete_calves([12342, 99001])
+        assert farm.get_all_ear_tags() == [12343]
+        assert farm.get_calf(12342) is None
+        assert farm.get_calf(99001) is None
+        assert len(farm) == 1
+
+        # The ear tags can be used again
+        farm.add_calf(FatteningCalf("2023-11-16", Gender.from_str("m"), 12342, True))
+        assert farm.get_fattening_calves_ear_tags() == [12342]
+
+    def test_get_jobs_in_week_of_year(self):
+        farm = Farm()
+        calf_1 = BreedingCalf("2023-11-15", Gender.from_str("m"), 12341, False)
+        calf_2 = BreedingCalf("2024-11-13", Gender.from_str("m"), 12342, False)
+        calf_3 = FatteningCalf("2023-11-15", Gender.from_str("m"), 99001, False)
+        farm.add_calves([calf_3, calf_1, calf_2])
+
+        # Bovalto1 of both breeding calves are in week 48, but in different years
+        assert farm.get_jobs_in_week(48, 2023) == [
+            (12341, "Bovalto1", dt.date(2023, 11, 27)),
+            (99001, "Bovalto1", dt.date(2023, 11, 27)),
+        ]
+        assert farm.get_jobs_in_week(48, 2024) == [
+            (12342, "Bovalto1", dt.date(2024, 11, 25)),
+        ]
+        assert len(farm.get_jobs_in_week(48)) == 3
+
+        assert farm.get_jobs_on_day(dt.date(2023, 11, 27)) == [
+            (12341, "Bovalto1", dt.date(2023, 11, 27)),
+            (99001, "Bovalto1", dt.date(2023, 11, 27)),
+        ]
+        assert farm.get_jobs_on_day(dt.date(2023, 11, 28)) == []
+
+    def test_get_jobs_in_week_after_changes(self):
+        farm = Farm()
+        farm.add_calves(
+            [
+                BreedingCalf("2023-11-15", Gender.from_str("m"), 12341, True),
+                BreedingCalf("2023-11-15", Gender.from_str("m"), 12342, True),
+                BreedingCalf("2023-11-16", Gender.from_str("m"), 12343, False),
+                BreedingCalf("2023-11-17", Gender.from_str("m"), 12344, True),
+                BreedingCalf("2023-11-20", Gender.from_str("m"), 12345, True),
+                FatteningCalf("2023-11-15", Gender.from_str("m"), 99001, True),
+            ]
+        )
+
+        farm.edit_calf(12341, Bovalto1, dt.date(2023, 12, 4), True)
+        farm.edit_calf(12343, Dehorn, dt.date(2023, 12, 4), True)
+        farm.edit_calf(99001, Restall, dt.date(2023, 12, 27), True)
+        farm.delete_calf(12345)
+        farm.change_ear_tag(12342, 12346)
+
+        def get_jobs(calendar_week):
+            # Walk all treatments of all calves
+            jobs = []
+            for calf in farm.breeding_calves + farm.fattening_calves:
+                for treatment in calf.treatments:
+                    if treatment is not None and treatment.get_week() == calendar_week:
+                        jobs.append(
+                            (calf.ear_tag, treatment.display_name, treatment.expected_date)
+                        )
+            return jobs
+
+        for calendar_week in range(1, 53):
+            assert farm.get_jobs_in_week(calendar_week) == get_jobs(calendar_week)
+
+    def test_ringworm_cohorts_incremental(self):
+        def get_expected_ringworm_dates(breeding_calves):
+            # Group the calves the way set_ringworm always did, from scratch
+            breeding_calves = sorted(
+                breeding_calves, key=lambda calf: calf.birth.expected_date
+            )
+            slices = []
+            ear_tag_slice = []
+            for j, cur in enumerate(breeding_calves):
+                ear_tag_slice.append(cur)
+                if j == len(breeding_calves) - 1 or (
+                    len(ear_tag_slice) >= 5
+                    and Ringworm1(cur.bovalto_2).get_week()
+                    != Ringworm1(breeding_calves[j + 1].bovalto_2).get_week()
+                ):
+                    slices.append(ear_tag_slice)
+                    ear_tag_slice = []
+
+            dates = {}
+            for calves in slices:
+                max_bovalto2 = max(calves, key=lambda calf: calf.bovalto_2).bovalto_2
+                for calf in calves:
+                    dates[calf.ear_tag] = (
+                        Ringworm1(max_bovalto2).expected_date
+                        if len(calves) >= 5
+                        else None
+                    )
+            return [calf.ear_tag for calf in breeding_calves], dates
+
+        rng = random.Random(0)
+        farm = Farm()
+        next_ear_tag = 1
+        for step in range(400):
+            ear_tags = farm.get_breeding_calves_ear_tags()
+            action = rng.random()
+            if action < 0.5 or not ear_tags:
+                birthday = dt.date(2023, 1, 2) + dt.timedelta(days=rng.randrange(120))
+                farm.add_calf(
+                    BreedingCalf(
+                        str(birthday), Gender.from_str("m"), next_ear_tag, True
+                    )
+                )
+                next_ear_tag += 1
+            elif action < 0.7:
+                farm.delete_calf(rng.choice(ear_tags))
+            elif action < 0.9:
+                ear_tag = rng.choice(ear_tags)
+                calf = farm.get_breeding_calf(ear_tag)
+                farm.edit_calf(
+                    ear_tag,
+                    Bovalto2,
+                    calf.bovalto_2.expected_date
+                    + dt.timedelta(days=rng.randrange(-7, 8)),
+                    True,
+                )
+            elif action < 0.95:
+                ear_tag = rng.choice(ear_tags)
+                farm.edit_calf(ear_tag, Ringworm1, dt.date(2023, 6, 1), True)
+            else:
+                # The calf moves to another position
+                ear_tag = rng.choice(ear_tags)
+                calf = farm.get_breeding_calf(ear_tag)
+                birthday = calf.birth.expected_date + dt.timedelta(
+                    days=rng.randrange(-30, 31)
+                )
+                calf.birth.reset(birthday, calf.birth.get_date())
+                farm.edit_calf(ear_tag, Birth, birthday, True)
+
+            ear_tags, dates = get_expected_ringworm_dates(farm.breeding_calves)
+            assert farm.get_breeding_calves_ear_tags() == ear_tags
+            for calf in farm.breeding_calves:
+                if dates[calf.ear_tag] is None:
+                    assert calf.ringworm_1 is None
+                    assert calf.ringworm_2 is None
+                else:
+                    assert calf.ringworm_1.expected_date == dates[calf.ear_tag]
+                    assert calf.ringworm_1.actual_date is None
+                    assert calf.ringworm_2.actual_date is None
+
+        for calendar_week in range(1, 53):
+            jobs = [
+                (calf.ear_tag, treatment.display_name, treatment.expected_date)
+                for calf in farm.breeding_calves
+                for treatment in calf.treatments
+                if treatment is not None and treatment.get_week() == calendar_week
+            ]
+            assert farm.get_jobs_in_week(calendar_week) == jobs
+
+    def test_refresh_calf(self):
+        farm = Farm()
+        farm.add_calves(
+            [
+                BreedingCalf(dt.date(2023, 11, 6 + i), Gender.Female, 100 + i, True)
+                for i in range(6)
+            ]
+            + [FatteningCalf(dt.date(2023, 11, 6), Gender.Male, 200, True)]
+        )
+
+        ringworms = [farm.get_calf(100 + i).ringworm_1 for i in range(5)]
+
+        # Edited directly, like the overview does
+        calf = farm.get_calf(105)
+        calf.birth.reset(dt.date(2023, 10, 2), None)
+        calf.recalculate_dependents(Birth)
+        farm.refresh_calf(105, set_ringworm=False)
+        farm.get_calf(200).edit_restall(dt.date(2023, 12, 27))
+        farm.refresh_calf(200, set_ringworm=False)
+
+        def assert_jobs_match():
+            for calendar_week in range(1, 53):
+                jobs = [
+                    (calf.ear_tag, treatment.display_name, treatment.expected_date)
+                    for calf in farm.breeding_calves + farm.fattening_calves
+                    for treatment in calf.treatments
+                    if treatment is not None and treatment.get_week() == calendar_week
+                ]
+                assert farm.get_jobs_in_week(calendar_week) == jobs
+
+        # The jobs follow the edits, the cohorts are regrouped by the next change
+        assert_jobs_match()
+        assert farm.get_breeding_calves_ear_tags()[0] == 105
+        assert [farm.get_calf(100 + i).ringworm_1 for i in range(5)] == ringworms
+
+        # Calf 105 starts the cohort, which gets the latest Bovalto2 of calf 103
+        farm.set_ringworm()
+        assert_jobs_match()
+        expected_date = Ringworm1(farm.get_calf(103).bovalto_2).expected_date
+        assert calf.ringworm_1.expected_date == expected_date
+
+    def test_ringworm_cohorts_only_neighbours_regrouped(self):
+        farm = Farm()
+        for i in range(5):
+            farm.add_calf(BreedingCalf("2023-01-02", Gender.from_str("m"), 100 + i, True))
+        for i in range(5):
+            farm.add_calf(BreedingCalf("2023-06-05", Gender.from_str("m"), 200 + i, True))
+
+        ringworms = [calf.ringworm_1 for calf in farm.breeding_calves]
+        farm.mark_clean()
+
+        # A calf born in the summer doesn't touch the cohort from January
+        farm.add_calf(BreedingCalf("2023-06-06", Gender.from_str("m"), 205, True))
+        assert [calf.ringworm_1 for calf in farm.breeding_calves[:5]] == ringworms[:5]
+        assert all(
+            calf.ringworm_1 is ringworm
+            for calf, ringworm in zip(farm.breeding_calves[:5], ringworms[:5])
+        )
+        # The new calf has the latest Bovalto2, so its whole cohort changes
+        assert [calf.ear_tag for calf in farm.get_changed_calves()] == [
+            200, 201, 202, 203, 204, 205
+        ]
+
+        # Deleting two summer calves leaves a last cohort with less than five calves
+        farm.delete_calves([200, 201])
+        assert all(calf.ringworm_1 is None for calf in farm.breeding_calves[5:])
+        assert all(
+            calf.ringworm_1 is ringworm
+            for calf, ringworm in zip(farm.breeding_calves[:5], ringworms[:5])
+        )
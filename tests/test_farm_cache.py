@@ -0,0 +1,190 @@
+from data.db_handler import DatabaseHandler
+from data.farm_cache import FarmCache
+from models.calf import FatteningCalf, BreedingCalf
+from models.farm import Farm
+from models.gender import Gender
+from models.treatment import Restall
+import datetime as dt
+import sys
+import os
+import sqlite3
+import threading
+import time
+import pytest
+
+# This code snippet does the following:
+#     1. It adjusts the Python path to include the parent directory
+#        (which contains models and other packages).
+#        This allows Python to locate and import modules from these directories.
+#     2. Then, it imports the necessary modules from the models package.
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+
+def create_database(db_name: str):
+    farm = Farm()
+    farm.add_calves(
+        [
+            BreedingCalf(dt.date(2023, 11, 20), Gender.Female, 12345, True),
+            FatteningCalf(dt.date(2023, 11, 20), Gender.Male, 99001, True),
+        ]
+    )
+    with DatabaseHandler(db_name=db_name, db_type="sqlite") as dbh:
+        dbh.save_farm(farm)
+
+
+class TestFarmCache:
+    def test_farm_is_cached(self, tmp_path):
+        db_name = str(tmp_path / "calves.sqlite")
+        create_database(db_name)
+        cache = FarmCache()
+
+        farm = cache.get_farm(db_name)
+        assert farm.get_all_ear_tags() == [99001, 12345]
+        assert cache.get_farm(db_name) is farm
+        assert cache.loads == 1
+
+    def test_reload_after_write(self, tmp_path):
+        db_name = str(tmp_path / "calves.sqlite")
+        create_database(db_name)
+        cache = FarmCache()
+        farm = cache.get_farm(db_name)
+
+        with DatabaseHandler(db_name=db_name, db_type="sqlite") as dbh:
+            dbh.delete_calf(99001)
+
+        reloaded_farm = cache.get_farm(db_name)
+        assert reloaded_farm is not farm
+        assert reloaded_farm.get_all_ear_tags() == [12345]
+
+    def test_reload_after_write_by_other_process(self, tmp_path):
+        db_name = str(tmp_path / "calves.sqlite")
+        create_database(db_name)
+        cache = FarmCache()
+        farm = cache.get_farm(db_name)
+
+        # Not written through a DatabaseHandler
+        connection = sqlite3.connect(db_name)
+        connection.execute("DELETE FROM calf WHERE ear_tag = 99001")
+        connection.commit()
+        connection.close()
+        stat = os.stat(db_name)
+        os.utime(db_name, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1))
+
+        assert cache.get_farm(db_name) is not farm
+        assert cache.loads == 2
+
+    def test_unsaved_changes_are_discarded(self, tmp_path):
+        db_name = str(tmp_path / "calves.sqlite")
+        create_database(db_name)
+        cache = FarmCache()
+
+        farm = cache.get_farm(db_name)
+        farm.edit_calf(12345, Restall, dt.date(2023, 12, 12), True)
+
+        reloaded_farm = cache.get_farm(db_name)
+        assert reloaded_farm is not farm
+        assert reloaded_farm.get_calf(12345).restall.actual_date is None
+
+    def test_save_changes_keeps_farm(self, tmp_path):
+        db_name = str(tmp_path / "calves.sqlite")
+        create_database(db_name)
+        cache = FarmCache()
+
+        farm = cache.get_farm(db_name)
+        farm.edit_calf(12345, Restall, dt.date(2023, 12, 12), True)
+        cache.save_changes(farm, db_name)
+
+        assert cache.get_farm(db_name) is farm
+        assert cache.loads == 1
+        with DatabaseHandler(db_name=db_name, db_type="sqlite") as dbh:
+            assert dbh.fetch_calf(12345).restall.actual_date == dt.date(2023, 12, 12)
+
+    def test_direct_treatment_change_is_not_handed_out(self, tmp_path):
+        db_name = str(tmp_path / "calves.sqlite")
+        create_database(db_name)
+        cache = FarmCache()
+
+        farm = cache.get_farm(db_name)
+        assert cache.get_farm(db_name) is farm
+
+        # Changed without the farm
+        farm.get_calf(12345).bovalto_1.update(dt.date(2023, 12, 1))
+        assert cache.get_farm(db_name) is not farm
+
+    def test_cache_hit_does_not_look_at_calves(self, tmp_path, monkeypatch):
+        db_name = str(tmp_path / "calves.sqlite")
+        create_database(db_name)
+        cache = FarmCache()
+        farm = cache.get_farm(db_name)
+        assert cache.get_farm(db_name) is farm
+
+        def has_changes(calf):
+            raise AssertionError("The calves are checked for changes")
+
+        monkeypatch.setattr(BreedingCalf, "has_changes", has_changes)
+        monkeypatch.setattr(FatteningCalf, "has_changes", has_changes)
+        assert cache.get_farm(db_name) is farm
+
+    def test_edit_farm_saves_changes(self, tmp_path):
+        db_name = str(tmp_path / "calves.sqlite")
+        create_database(db_name)
+        cache = FarmCache()
+
+        with cache.edit_farm(db_name) as farm:
+            farm.edit_calf(12345, Restall, dt.date(2023, 12, 12), True)
+
+        assert cache.get_farm(db_name) is farm
+        assert cache.loads == 1
+        with DatabaseHandler(db_name=db_name, db_type="sqlite") as dbh:
+            assert dbh.fetch_calf(12345).restall.actual_date == dt.date(2023, 12, 12)
+
+    def test_edit_farm_discards_changes_on_error(self, tmp_path):
+        db_name = str(tmp_path / "calves.sqlite")
+        create_database(db_name)
+        cache = FarmCache()
+
+        with pytest.raises(ValueError):
+            with cache.edit_farm(db_name) as farm:
+                farm.delete_calf(99001)
+                raise ValueError()
+
+        assert cache.get_farm(db_name).get_all_ear_tags() == [99001, 12345]
+
+    def test_edit_farm_waits_for_other_session(self, tmp_path):
+        db_name = str(tmp_path / "calves.sqlite")
+        create_database(db_name)
+        cache = FarmCache()
+        editing = threading.Event()
+        ear_tags = []
+
+        def first_session():
+            with cache.edit_farm(db_name) as farm:
+                editing.set()
+                # Without the lock, the other session would get the farm before the calf is deleted
+                time.sleep(0.2)
+                farm.delete_calf(99001)
+
+        def second_session():
+            editing.wait()
+            with cache.edit_farm(db_name) as farm:
+                ear_tags.append(farm.get_all_ear_tags())
+                farm.delete_calf(12345)
+
+        threads = [
+            threading.Thread(target=first_session),
+            threading.Thread(target=second_session),
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert ear_tags == [[12345]]
+        with DatabaseHandler(db_name=db_name, db_type="sqlite") as dbh:
+            assert dbh.fetch_all_calves() == []
+
+    def test_memory_database_is_not_cached(self):
+        cache = FarmCache()
+        assert cache.get_farm("memory.db", "memory") is not cache.get_farm(
+            "memory.db", "memory"
+        )
@@ -0,0 +1,144 @@
+from models.calf import FatteningCalf, BreedingCalf
+from models.farm import Farm
+from models.farm_frame import FarmFrame, get_iso_calendar
+from models.gender import Gender
+from models.treatment import Bovalto1, Dehorn, Restall, Bovalto2, Ringworm1
+import numpy as np
+import datetime as dt
+import sys
+import os
+
+# This code snippet does the following:
+#     1. It adjusts the Python path to include the parent directory
+#        (which contains models and other packages).
+#        This allows Python to locate and import modules from these directories.
+#     2. Then, it imports the necessary modules from the models package.
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+
+def create_farm() -> Farm:
+    farm = Farm()
+    farm.add_calves(
+        [
+            BreedingCalf("2023-11-15", Gender.from_str("m"), 12341, True),
+            BreedingCalf("2023-11-15", Gender.from_str("w"), 12342, True),
+            BreedingCalf("2023-11-16", Gender.from_str("m"), 12343, False),
+            BreedingCalf("2023-11-17", Gender.from_str("w"), 12344, True),
+            BreedingCalf("2023-11-20", Gender.from_str("m"), 12345, True),
+            BreedingCalf("2023-12-28", Gender.from_str("m"), 12346, True),
+            FatteningCalf("2023-11-15", Gender.from_str("m"), 99001, True),
+            FatteningCalf("2023-12-01", Gender.from_str("w"), 99002, False),
+        ]
+    )
+    farm.edit_calf(12341, Bovalto1, dt.date(2023, 11, 27), True)
+    farm.edit_calf(12343, Restall, dt.date(2023, 12, 4), False)
+    farm.edit_calf(99001, Dehorn, dt.date(2023, 12, 1), True)
+    return farm
+
+
+def get_dates(calf) -> list:
+    return [
+        (type(treatment), treatment.expected_date, treatment.actual_date)
+        for treatment in [calf.birth] + calf.treatments
+        if treatment is not None
+    ]
+
+
+class TestFarmFrame:
+    def test_round_trip(self):
+        farm = create_farm()
+        frame = FarmFrame.from_farm(farm)
+        assert len(frame) == 8
+        assert list(frame.ear_tags) == farm.get_all_ear_tags()
+
+        copy = frame.to_farm()
+        assert copy.get_all_ear_tags() == farm.get_all_ear_tags()
+        for calf, copied_calf in zip(farm.get_calves(), copy.get_calves()):
+            assert type(copied_calf) is type(calf)
+            assert copied_calf.ear_tag == calf.ear_tag
+            assert copied_calf.gender == calf.gender
+            assert copied_calf.birthday == calf.birthday
+            assert copied_calf.dehorning_required == calf.dehorning_required
+            assert get_dates(copied_calf) == get_dates(calf)
+
+        # The last calf is alone in its cohort and has no ringworm treatments
+        assert copy.get_calf(12346).ringworm_1 is None
+        assert copy.get_calf(12346).ringworm_2 is None
+
+        assert np.array_equal(
+            FarmFrame.from_farm(copy).planned, frame.planned, equal_nan=True
+        )
+
+    def test_filters(self):
+        farm = create_farm()
+        frame = FarmFrame.from_farm(farm)
+
+        assert list(frame[frame.is_type(FatteningCalf)].ear_tags) == [99001, 99002]
+        assert list(frame[frame.has_treatment(Ringworm1)].ear_tags) == [
+            12341,
+            12342,
+            12343,
+            12344,
+            12345,
+        ]
+        assert list(frame[frame.is_done(Bovalto1)].ear_tags) == [12341]
+        assert list(frame[~frame.has_treatment(Dehorn)].ear_tags) == [99002, 12343]
+        assert list(frame[frame.is_open(Restall)].ear_tags) == [
+            99001,
+            99002,
+            12341,
+            12342,
+            12344,
+            12345,
+            12346,
+        ]
+        assert list(
+            frame[frame.is_overdue(Bovalto2, dt.date(2023, 12, 20))].ear_tags
+        ) == [12341, 12342, 12343, 12344]
+
+    def test_jobs_in_week(self):
+        farm = create_farm()
+        frame = FarmFrame.from_farm(farm)
+
+        for calendar_week in range(1, 53):
+            mask = frame.jobs_in_week(calendar_week)
+            jobs = sorted(
+                (int(frame.ear_tags[row]), int(column))
+                for row, column in zip(*np.nonzero(mask))
+            )
+            expected_jobs = sorted(
+                (calf.ear_tag, FarmFrame.column(type(treatment)))
+                for calf in farm.get_calves()
+                for treatment in [calf.birth] + calf.treatments
+                if treatment is not None and treatment.get_week() == calendar_week
+            )
+            assert jobs == expected_jobs
+
+        for year, calendar_week in [(2023, 46), (2023, 52), (2024, 1), (2024, 2)]:
+            ear_tags = [
+                calf.ear_tag
+                for calf in farm.get_calves()
+                if any(
+                    treatment is not None
+                    and treatment.get_calendar_week() == (year, calendar_week)
+                    for treatment in [calf.birth] + calf.treatments
+                )
+            ]
+            assert ear_tags
+            assert (
+                list(frame[frame.has_jobs_in_week(calendar_week, year)].ear_tags)
+                == ear_tags
+            )
+
+    def test_get_iso_calendar(self):
+        days = [dt.date(2020, 12, 25) + dt.timedelta(days=i) for i in range(800)]
+        years, weeks = get_iso_calendar(np.array(days, dtype="datetime64[D]"))
+        assert list(zip(years, weeks)) == [day.isocalendar()[:2] for day in days]
+
+        years, weeks = get_iso_calendar(np.array([None], dtype="datetime64[D]"))
+        assert years[0] == weeks[0] == 0
+
+    def test_memory(self):
+        farm = create_farm()
+        frame = FarmFrame.from_farm(farm)
+        assert frame.nbytes / len(frame) < 200
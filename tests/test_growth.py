@@ -0,0 +1,115 @@
+from data.db_handler import DatabaseHandler
+from data.growth_cache import GrowthCache
+from models.calf import FatteningCalf, BreedingCalf
+from models.farm import Farm
+from models.gender import Gender
+from models.growth import HerdGrowth
+import datetime as dt
+import numpy as np
+import pytest
+import sys
+import os
+
+# This code snippet does the following:
+#     1. It adjusts the Python path to include the parent directory
+#        (which contains models and other packages).
+#        This allows Python to locate and import modules from these directories.
+#     2. Then, it imports the necessary modules from the models package.
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+
+def create_growth() -> HerdGrowth:
+    # 12345 gains 0.8 kg per day, 99001 1.2 kg per day, 99002 was only weighed once
+    dates = np.array(["2023-12-01", "2023-12-11", "2023-12-21"], dtype="datetime64[D]")
+    return HerdGrowth(
+        np.array([99001, 12345, 99001, 12345, 99002, 12345, 99001]),
+        dates[[2, 0, 0, 1, 0, 2, 1]],
+        np.array([74, 40, 50, 48, 45, 56, 62]),
+    )
+
+
+class TestHerdGrowth:
+    def test_daily_gain(self):
+        growth = create_growth()
+
+        assert len(growth) == 3
+        assert growth.ear_tags.tolist() == [12345, 99001, 99002]
+        assert growth.counts.tolist() == [3, 3, 1]
+        assert growth.daily_gains[:2] == pytest.approx([0.8, 1.2])
+        assert np.isnan(growth.daily_gains[2])
+        assert growth.last_weights.tolist() == [56, 74, 45]
+        assert growth.last_dates[1] == np.datetime64("2023-12-21")
+
+    def test_project(self):
+        growth = create_growth()
+        weights = growth.project(
+            np.array([99001, 12345, 99002, 11111]),
+            np.array(["2024-01-10"] * 4, dtype="datetime64[D]"),
+        )
+
+        assert weights[:2] == pytest.approx([50 + 1.2 * 40, 40 + 0.8 * 40])
+        assert np.isnan(weights[2:]).all()
+
+    def test_percentiles(self):
+        growth = create_growth()
+        assert growth.get_percentiles((0, 50, 100)) == pytest.approx(
+            {0: 0.8, 50: 1.0, 100: 1.2}
+        )
+
+        empty_growth = HerdGrowth(np.array([]), np.array([]), np.array([]))
+        assert len(empty_growth) == 0
+        assert np.isnan(empty_growth.get_percentiles()[50])
+        weights = empty_growth.project(
+            np.array([12345]), np.array(["2024-01-10"], dtype="datetime64[D]")
+        )
+        assert np.isnan(weights).all()
+
+
+class TestGrowthCache:
+    def create_database(self, db_name: str):
+        farm = Farm()
+        farm.add_calves(
+            [
+                BreedingCalf(dt.date(2023, 11, 20), Gender.Female, 12345, True),
+                FatteningCalf(dt.date(2023, 11, 20), Gender.Male, 99001, True),
+            ]
+        )
+        with DatabaseHandler(db_name=db_name, db_type="sqlite") as dbh:
+            dbh.save_farm(farm)
+            dbh.save_weights(
+                [
+                    (99001, dt.date(2023, 12, 1), 50),
+                    (99001, dt.date(2023, 12, 11), 62),
+                    (12345, dt.date(2023, 12, 1), 40),
+                    (12345, dt.date(2023, 12, 11), 48),
+                ]
+            )
+
+        return farm
+
+    def test_growth_is_cached_until_write(self, tmp_path):
+        db_name = str(tmp_path / "calves.sqlite")
+        self.create_database(db_name)
+        cache = GrowthCache()
+
+        growth = cache.get_growth(db_name)
+        assert growth.daily_gains == pytest.approx([0.8, 1.2])
+        assert cache.get_growth(db_name) is growth
+        assert cache.loads == 1
+
+        with DatabaseHandler(db_name=db_name, db_type="sqlite") as dbh:
+            dbh.save_calf_weight(12345, dt.date(2023, 12, 21), 60)
+
+        assert cache.get_growth(db_name).daily_gains == pytest.approx([1.0, 1.2])
+        assert cache.loads == 2
+
+    def test_sell_weights(self, tmp_path):
+        db_name = str(tmp_path / "calves.sqlite")
+        farm = self.create_database(db_name)
+        sell_date = farm.get_calf(99001).sell.get_date()
+
+        # Only fattening calves are sold
+        days = (sell_date - dt.date(2023, 12, 1)).days
+        assert GrowthCache().get_sell_weights(db_name) == [
+            (99001, sell_date, pytest.approx(50 + 1.2 * days))
+        ]
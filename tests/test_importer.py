@@ -0,0 +1,234 @@
+from data.db_handler import DatabaseHandler
+from data.farm_cache import farm_cache, get_database_version
+from data.importer import read_chunks, create_calves, import_herd, update_herd
+from models.calf import FatteningCalf, BreedingCalf
+from models.farm import Farm
+from models.gender import Gender
+import datetime as dt
+import pytest
+import sys
+import os
+
+# This code snippet does the following:
+#     1. It adjusts the Python path to include the parent directory
+#        (which contains models and other packages).
+#        This allows Python to locate and import modules from these directories.
+#     2. Then, it imports the necessary modules from the models package.
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+# Five calves per cohort, so there are enough calves for ringworm
+ROWS = [
+    (12340 + i, dt.date(2023, 11, 1) + dt.timedelta(days=3 * i), "w" if i % 2 else "m")
+    for i in range(10)
+] + [(99001, dt.date(2023, 11, 20), "m")]
+
+
+def write_csv(path, delimiter: str = ",", date_format: str = "%Y-%m-%d"):
+    lines = [delimiter.join(["Gender", "Ear Tag", "Birthdate"])]
+    for ear_tag, birthday, gender in ROWS:
+        lines.append(
+            delimiter.join([gender, str(ear_tag), birthday.strftime(date_format)])
+        )
+
+    path.write_text("\n".join(lines) + "\n\n", encoding="utf-8")
+    return str(path)
+
+
+def create_reference_farm() -> Farm:
+    # Farm of the same calves, added one by one
+    farm = Farm()
+    for ear_tag, birthday, gender in ROWS:
+        calf_class = FatteningCalf if ear_tag > 99000 else BreedingCalf
+        farm.add_calf(calf_class(birthday, Gender.from_str(gender), ear_tag, True))
+
+    return farm
+
+
+def fetch_calves_as_tuple(db_name: str) -> list[tuple]:
+    with DatabaseHandler(db_name=db_name, db_type="sqlite") as dbh:
+        return sorted(calf.as_tuple() for calf in dbh.fetch_all_calves())
+
+
+class TestImporter:
+    def test_read_chunks(self, tmp_path):
+        path = write_csv(tmp_path / "herd.csv", ";", "%d.%m.%Y")
+        chunks = list(read_chunks(path, chunk_size=4))
+
+        assert [len(chunk) for chunk in chunks] == [4, 4, 3]
+        assert chunks[0][0] == ("12340", "01.11.2023", "m")
+
+    def test_create_calves(self):
+        calves = create_calves([(12345.0, dt.datetime(2023, 11, 20), "W"), ("99001", "2023-11-20", "m")])
+
+        assert isinstance(calves[0], BreedingCalf)
+        assert calves[0].ear_tag == 12345
+        assert calves[0].gender == Gender.Female
+        assert isinstance(calves[1], FatteningCalf)
+        assert calves[1].birthday == dt.date(2023, 11, 20)
+
+        with pytest.raises(ValueError):
+            create_calves([(12345, "20/11/2023", "w")])
+
+    def test_invalid_file(self, tmp_path):
+        path = tmp_path / "herd.csv"
+        path.write_text("Ear Tag,Gender\n12345,w\n")
+        with pytest.raises(ValueError, match="Birthdate"):
+            list(read_chunks(str(path)))
+
+        with pytest.raises(ValueError):
+            list(read_chunks(str(tmp_path / "herd.txt")))
+
+    def test_import_csv(self, tmp_path):
+        path = write_csv(tmp_path / "herd.csv")
+        db_name = str(tmp_path / "calves.sqlite")
+
+        result = import_herd(path, db_name=db_name, chunk_size=3)
+        assert result.inserted == 11
+
+        # Grouping the cohorts once gives the same treatments as adding the calves one by one
+        assert fetch_calves_as_tuple(db_name) == sorted(
+            create_reference_farm().get_calves_as_tuple()
+        )
+
+    @pytest.mark.parametrize("layout", ["tables", "events"])
+    def test_import_cohorts_across_chunks(self, tmp_path, monkeypatch, layout):
+        # Unordered birthdays, several calves per day, cohorts spanning the chunks
+        # and a last cohort which is too small for ringworm
+        rows = (
+            [
+                (10000 + i, dt.date(2023, 1, 1) + dt.timedelta(days=(i * 37) % 120), "w")
+                for i in range(150)
+            ]
+            + [(10200 + i, dt.date(2023, 11, 1) + dt.timedelta(days=i), "w") for i in range(3)]
+            + [(99000 + i, dt.date(2023, 1, 1) + dt.timedelta(days=i), "m") for i in range(1, 20)]
+        )
+        monkeypatch.setattr(sys.modules[__name__], "ROWS", rows)
+        path = write_csv(tmp_path / "herd.csv")
+        db_name = str(tmp_path / "calves.sqlite")
+        with DatabaseHandler(db_name=db_name, db_type="sqlite", layout=layout):
+            pass
+
+        # The calves are planned in batches, without creating them
+        reference_farm = create_reference_farm()
+
+        def create_calf(*args):
+            raise AssertionError("A calf was created")
+
+        monkeypatch.setattr(BreedingCalf, "__init__", create_calf)
+        monkeypatch.setattr(FatteningCalf, "__init__", create_calf)
+        import_herd(path, db_name=db_name, chunk_size=7)
+        monkeypatch.undo()
+
+        assert fetch_calves_as_tuple(db_name) == sorted(reference_farm.get_calves_as_tuple())
+        assert reference_farm.get_calf(10200).ringworm_1 is None
+
+    def test_import_nothing_if_invalid(self, tmp_path):
+        path = write_csv(tmp_path / "herd.csv")
+        db_name = str(tmp_path / "calves.sqlite")
+        with open(path, "a") as file:
+            file.write("w,12340,2023-11-30\n")
+
+        with pytest.raises(ValueError, match="more than once"):
+            import_herd(path, db_name=db_name, chunk_size=3)
+        with DatabaseHandler(db_name=db_name, db_type="sqlite") as dbh:
+            assert dbh.count_calves() == 0
+
+        # A database with calves is updated instead
+        import_herd(write_csv(tmp_path / "herd.csv"), db_name=db_name)
+        with pytest.raises(ValueError, match="update_herd"):
+            import_herd(path, db_name=db_name)
+
+    def test_import_xlsx(self, tmp_path):
+        openpyxl = pytest.importorskip("openpyxl")
+        workbook = openpyxl.Workbook()
+        sheet = workbook.active
+        sheet.title = "Kaelberliste"
+        sheet.append(["Kälberliste"])
+        sheet.append([None, "Ear Tag", "Birthdate", "Gender"])
+        for ear_tag, birthday, gender in ROWS:
+            sheet.append([None, ear_tag, dt.datetime.combine(birthday, dt.time()), gender])
+        path = str(tmp_path / "herd.xlsx")
+        workbook.save(path)
+
+        db_name = str(tmp_path / "calves.sqlite")
+        import_herd(path, db_name=db_name)
+
+        assert fetch_calves_as_tuple(db_name) == sorted(
+            create_reference_farm().get_calves_as_tuple()
+        )
+
+
+class TestUpdateHerd:
+    def test_insert_and_skip(self, tmp_path):
+        path = write_csv(tmp_path / "herd.csv")
+        db_name = str(tmp_path / "calves.sqlite")
+
+        result = update_herd(path, db_name=db_name)
+        assert (result.inserted, result.updated, result.skipped) == (11, 0, 0)
+
+        # Nothing is written if the file didn't change
+        version = get_database_version(db_name)
+        result = update_herd(path, db_name=db_name)
+        assert (result.inserted, result.updated, result.skipped) == (0, 0, 11)
+        assert str(result) == "0 inserted, 0 updated, 11 skipped"
+        assert get_database_version(db_name) == version
+
+    def test_update_changed_calves(self, tmp_path):
+        path = write_csv(tmp_path / "herd.csv")
+        db_name = str(tmp_path / "calves.sqlite")
+        update_herd(path, db_name=db_name)
+
+        # Treatments which were done must be kept
+        with DatabaseHandler(db_name=db_name, db_type="sqlite") as dbh:
+            for ear_tag, date in [
+                (12349, dt.date(2023, 12, 1)),
+                (12340, dt.date(2023, 11, 14)),
+            ]:
+                calf = dbh.fetch_calf(ear_tag)
+                calf.bovalto_1.update(date)
+                dbh.save_calf(calf)
+
+        # The type of a calf was changed in the app
+        farm = farm_cache.get_farm(db_name)
+        calf = farm.get_calf(12342)
+        farm.delete_calf(12342)
+        farm.add_calf(FatteningCalf(calf.birthday, calf.gender, 12342, True))
+        farm_cache.save_changes(farm, db_name)
+
+        # One birthday and one gender changed, and a calf was born
+        lines = open(path).read().splitlines()
+        lines[1] = "m,12340,2023-11-02"
+        lines[2] = "m,12341,2023-11-04"
+        lines.append("w,12350,2023-11-30")
+        with open(path, "w") as file:
+            file.write("\n".join(lines))
+
+        result = update_herd(path, db_name=db_name)
+        assert (result.inserted, result.updated, result.skipped) == (1, 2, 9)
+
+        with DatabaseHandler(db_name=db_name, db_type="sqlite") as dbh:
+            calves = {calf.ear_tag: calf for calf in dbh.fetch_all_calves()}
+
+        assert calves[12340].birthday == dt.date(2023, 11, 2)
+        assert calves[12340].bovalto_1.actual_date == dt.date(2023, 11, 14)
+        assert isinstance(calves[12342], FatteningCalf)
+        assert calves[12341].gender == Gender.Male
+        assert isinstance(calves[12350], BreedingCalf)
+        assert calves[12349].bovalto_1.get_date() == dt.date(2023, 12, 1)
+
+        # The ringworm cohorts are grouped as if the calves were added one by one
+        reference_calves = create_calves(list(read_chunks(path))[0])
+        for calf in reference_calves:
+            if calf.ear_tag == 12340:
+                # Created again, the following treatments are planned after the actual date
+                calf.edit_bovalto1(dt.date(2023, 11, 14))
+            elif calf.ear_tag == 12349:
+                # Skipped and kept as it was, without planning the following treatments again
+                calf.bovalto_1.update(dt.date(2023, 12, 1))
+        reference_farm = Farm()
+        reference_farm.add_calves(
+            [calf for calf in reference_calves if calf.ear_tag != 12342]
+        )
+        for calf in reference_farm.get_calves():
+            if isinstance(calf, BreedingCalf):
+                assert calves[calf.ear_tag].as_tuple() == calf.as_tuple()
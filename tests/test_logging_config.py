@@ -0,0 +1,66 @@
+from logging_config import configure_logging, LOGGER_NAMES
+from models.calf import BreedingCalf
+from models.farm import Farm
+from models.gender import Gender
+import datetime as dt
+import logging
+import sys
+import os
+
+# This code snippet does the following:
+#     1. It adjusts the Python path to include the parent directory
+#        (which contains models and other packages).
+#        This allows Python to locate and import modules from these directories.
+#     2. Then, it imports the necessary modules from the models package.
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+
+def create_farm() -> Farm:
+    farm = Farm()
+    farm.add_calves(
+        [
+            BreedingCalf(dt.date(2023, 11, 20 + i), Gender.Female, 12340 + i, True)
+            for i in range(6)
+        ],
+        set_ringworm=False,
+    )
+    return farm
+
+
+class TestLogging:
+    def test_configure_logging(self, monkeypatch):
+        monkeypatch.setenv("CALF_LOG_LEVEL", "debug")
+        try:
+            configure_logging()
+            configure_logging()
+            for name in LOGGER_NAMES:
+                assert logging.getLogger(name).level == logging.DEBUG
+                assert len(logging.getLogger(name).handlers) == 1
+
+            configure_logging(logging.WARNING)
+            assert logging.getLogger("models").level == logging.WARNING
+        finally:
+            for name in LOGGER_NAMES:
+                logger = logging.getLogger(name)
+                logger.setLevel(logging.NOTSET)
+                logger.handlers.clear()
+
+    def test_nothing_printed(self, capsys):
+        farm = create_farm()
+        farm.set_ringworm()
+        farm.get_calf(1)
+
+        assert capsys.readouterr().out == ""
+
+    def test_debug_messages(self, caplog):
+        farm = create_farm()
+        with caplog.at_level(logging.DEBUG, logger="models"):
+            farm.set_ringworm()
+            farm.get_calf(1)
+
+        messages = [(record.name, record.getMessage()) for record in caplog.records]
+        assert (
+            "models.ringworm",
+            "Ear tags in this week: [12340, 12341, 12342, 12343, 12344, 12345]",
+        ) in messages
+        assert ("models.farm", "Calf with ear tag 1 not found") in messages
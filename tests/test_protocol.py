@@ -0,0 +1,153 @@
+from models.protocol import PROTOCOL, PLAN, compile_protocol, load_protocol
+from models import day
+from hypothesis import given, strategies as st
+import datetime as dt
+import json
+import pytest
+import sqlite3
+import subprocess
+import sys
+import os
+
+# This code snippet does the following:
+#     1. It adjusts the Python path to include the parent directory
+#        (which contains models and other packages).
+#        This allows Python to locate and import modules from these directories.
+#     2. Then, it imports the necessary modules from the models package.
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+dates = st.dates(min_value=dt.date(1960, 1, 1), max_value=dt.date(2100, 12, 31))
+
+# Plans a herd with the calves and with the vectorized schedule, which must agree
+PLAN_HERD = """
+import datetime as dt
+import numpy as np
+from models.farm_frame import FarmFrame, CALF_TYPES
+from models.gender import Gender
+from models.schedule import calculate_schedule
+
+calves = [
+    calf_type(dt.date(2023, 1, 1) + dt.timedelta(days=day), Gender.Male, ear_tag, day % 3 > 0)
+    for ear_tag, (day, calf_type) in enumerate(
+        (day, calf_type) for day in range(14) for calf_type in CALF_TYPES
+    )
+]
+planned = calculate_schedule(
+    np.array([calf.birthday for calf in calves], dtype="datetime64[D]"),
+    np.array([calf.dehorning_required for calf in calves]),
+    np.array([CALF_TYPES.index(type(calf)) for calf in calves]),
+)
+for row, calf in enumerate(calves):
+    expected = np.full(planned.shape[1], np.datetime64("NaT", "D"))
+    for treatment in [calf.birth] + calf.treatments:
+        if treatment is not None:
+            expected[FarmFrame.column(type(treatment))] = treatment.expected_date
+    assert np.array_equal(planned[row], expected, equal_nan=True), calf
+
+print(calves[2].sell.expected_date)
+"""
+
+
+class TestProtocolPlan:
+    def test_order(self):
+        assert PLAN.order == (
+            "birth",
+            "bovalto1",
+            "dehorn",
+            "restall",
+            "sell",
+            "bovalto2",
+            "ringworm1",
+            "ringworm2",
+        )
+        assert PLAN.dependents["bovalto2"] == ("ringworm1", "ringworm2")
+        assert PLAN.get_step("birth") is None
+
+    @given(dates)
+    def test_same_as_rest_days_and_weekends(self, date):
+        for step in PLAN.steps:
+            expected = day.handle_weekends(date + dt.timedelta(days=step.rest_days))
+            if step.name == "sell":
+                expected = day.get_next_tuesday(expected)
+            assert step.calculate(date) == expected
+
+    @given(st.lists(dates, min_size=1, max_size=20))
+    def test_sql_same_as_calculate(self, days):
+        epoch = dt.date(1970, 1, 1)
+        connection = sqlite3.connect(":memory:")
+        for step in PLAN.steps:
+            for date in days:
+                (result,) = connection.execute(
+                    f"SELECT {step.to_sql('?1')}", ((date - epoch).days,)
+                ).fetchone()
+                assert epoch + dt.timedelta(days=result) == step.calculate(date)
+        connection.close()
+
+    def test_custom_protocol(self, tmp_path):
+        # Sold on a Friday two weeks after the birth, everything else as before
+        protocol = [dict(row) for row in PROTOCOL]
+        protocol[3] = {
+            "treatment": "sell",
+            "after": ["birth"],
+            "rest_days": 14,
+            "weekdays": ["Friday"],
+            "calves": "fattening",
+        }
+        path = tmp_path / "protocol.json"
+        path.write_text(json.dumps(protocol))
+
+        plan = compile_protocol(load_protocol(str(path)))
+        assert plan.get_step("sell").calculate(dt.date(2023, 11, 20)) == dt.date(2023, 12, 8)
+        assert plan.get_step("dehorn").offsets == PLAN.get_step("dehorn").offsets
+
+    def test_custom_protocol_drives_every_path(self, tmp_path):
+        # Sold a week after the dehorning, dehorned a week later than by default
+        protocol = [dict(row) for row in PROTOCOL]
+        protocol[1] = {**protocol[1], "rest_days": 12}
+        protocol[3] = {**protocol[3], "after": ["dehorn", "bovalto1"], "rest_days": 7}
+        path = tmp_path / "protocol.json"
+        path.write_text(json.dumps(protocol))
+
+        root = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+        result = subprocess.run(
+            [sys.executable, "-c", PLAN_HERD],
+            cwd=root,
+            env={**os.environ, "CALF_PROTOCOL": str(path)},
+            capture_output=True,
+            text=True,
+        )
+        assert result.returncode == 0, result.stderr
+        # Born on Monday, Bovalto1 on Thursday, dehorned and sold on the Tuesdays after
+        assert result.stdout.strip() == "2023-01-31"
+
+    def test_invalid_protocols(self):
+        def change(index, **fields):
+            protocol = list(PROTOCOL)
+            protocol[index] = {**protocol[index], **fields}
+            return protocol
+
+        with pytest.raises(ValueError):
+            compile_protocol(PROTOCOL + PROTOCOL[:1])
+        with pytest.raises(ValueError):
+            # Without ringworm2, the calves would miss a treatment
+            compile_protocol(PROTOCOL[:-1])
+        with pytest.raises(ValueError):
+            compile_protocol(change(3, treatment="weaning"))
+        with pytest.raises(ValueError):
+            compile_protocol(change(0, after=("weaning",)))
+        with pytest.raises(ValueError):
+            compile_protocol(change(0, calves="heifers"))
+        with pytest.raises(ValueError):
+            # Fattening calves have no Bovalto2
+            compile_protocol(change(4, calves="all"))
+        with pytest.raises(ValueError):
+            # The cohorts are grouped by the ringworm after the Bovalto2
+            compile_protocol(change(5, after=("restall",)))
+        with pytest.raises(ValueError):
+            compile_protocol(change(5, cohort=False))
+        with pytest.raises(ValueError):
+            compile_protocol(change(2, cohort=True))
+        with pytest.raises(ValueError):
+            protocol = change(1, after=("restall",))
+            protocol[2] = {**protocol[2], "after": ("dehorn",)}
+            compile_protocol(protocol)
@@ -0,0 +1,120 @@
+from data.db_handler import DatabaseHandler
+from data.query_stats import (
+    QueryStats,
+    ProfilingCursor,
+    enable_query_stats,
+    disable_query_stats,
+    set_thread_query_stats,
+)
+from models.calf import FatteningCalf, BreedingCalf
+from models.farm import Farm
+from models.gender import Gender
+import datetime as dt
+import sys
+import os
+import sqlite3
+import threading
+
+# This code snippet does the following:
+#     1. It adjusts the Python path to include the parent directory
+#        (which contains models and other packages).
+#        This allows Python to locate and import modules from these directories.
+#     2. Then, it imports the necessary modules from the models package.
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+
+def create_farm() -> Farm:
+    farm = Farm()
+    farm.add_calves(
+        [
+            BreedingCalf(dt.date(2023, 11, 20), Gender.Female, 12345, True),
+            FatteningCalf(dt.date(2023, 11, 20), Gender.Male, 99001, True),
+        ]
+    )
+    return farm
+
+
+class TestQueryStats:
+    def test_record_statements_and_methods(self):
+        stats = QueryStats()
+        with DatabaseHandler(db_type="memory", stats=stats) as dbh:
+            assert isinstance(dbh.cursor, ProfilingCursor)
+            dbh.save_farm(create_farm())
+            calves = dbh.fetch_all_calves()
+            dbh.fetch_calf(12345)
+
+        assert len(calves) == 2
+        summary = stats.summary()
+        assert summary.get_method_calls() == {
+            "save_farm": 1,
+            "fetch_all_calves": 1,
+            "fetch_calf": 1,
+        }
+
+        calf_inserts = [
+            statement
+            for statement in summary.statements
+            if statement.sql.startswith("INSERT INTO calf")
+        ]
+        assert len(calf_inserts) == 1
+        assert calf_inserts[0].calls == 1
+        assert calf_inserts[0].rows == 2
+
+        # Ordered by time, the time of fetching counts towards the statement
+        totals = [statement.total_seconds for statement in summary.statements]
+        assert totals == sorted(totals, reverse=True)
+        assert summary.total_queries == sum(s.calls for s in summary.statements)
+        assert max(s.rows for s in summary.statements if "FROM calf" in s.sql) >= 2
+
+    def test_reset(self):
+        stats = QueryStats()
+        stats.record_statement("SELECT 1", 0.5, 1)
+        stats.record_method("fetch_calf", 0.5)
+        stats.reset()
+
+        summary = stats.summary()
+        assert summary.statements == []
+        assert summary.methods == []
+
+    def test_process_stats(self, tmp_path):
+        db_name = str(tmp_path / "calves.sqlite")
+        stats = enable_query_stats()
+        try:
+            assert enable_query_stats() is stats
+            with DatabaseHandler(db_name=db_name, db_type="sqlite") as dbh:
+                dbh.save_farm(create_farm())
+        finally:
+            disable_query_stats()
+
+        assert stats.summary().get_method_calls() == {"save_farm": 1}
+
+    def test_thread_stats(self, tmp_path):
+        db_name = str(tmp_path / "calves.sqlite")
+        stats = QueryStats()
+        set_thread_query_stats(stats)
+        try:
+            with DatabaseHandler(db_name=db_name, db_type="sqlite") as dbh:
+                dbh.save_farm(create_farm())
+
+            # Other threads, e.g. other sessions of the app, don't record into them
+            def fetch_calves():
+                with DatabaseHandler(db_name=db_name, db_type="sqlite") as dbh:
+                    dbh.fetch_all_calves()
+
+            thread = threading.Thread(target=fetch_calves)
+            thread.start()
+            thread.join()
+        finally:
+            set_thread_query_stats(None)
+
+        assert stats.summary().get_method_calls() == {"save_farm": 1}
+
+    def test_disabled_stats(self, tmp_path):
+        db_name = str(tmp_path / "calves.sqlite")
+        with DatabaseHandler(db_name=db_name, db_type="sqlite") as dbh:
+            # The plain cursor and methods are used
+            assert type(dbh.cursor) is sqlite3.Cursor
+            assert "save_farm" not in vars(dbh)
+            dbh.save_farm(create_farm())
+
+        assert dbh.stats is None
@@ -0,0 +1,159 @@
+from models.calf import FatteningCalf, BreedingCalf
+from models.farm_frame import FarmFrame, TREATMENTS, CALF_TYPES
+from models.gender import Gender
+from models.schedule import calculate_schedule
+from models.treatment import (
+    Birth,
+    Bovalto1,
+    Dehorn,
+    Restall,
+    Sell,
+    Bovalto2,
+    Ringworm1,
+    Ringworm2,
+)
+from hypothesis import given, strategies as st
+import numpy as np
+import datetime as dt
+import sys
+import os
+
+# This code snippet does the following:
+#     1. It adjusts the Python path to include the parent directory
+#        (which contains models and other packages).
+#        This allows Python to locate and import modules from these directories.
+#     2. Then, it imports the necessary modules from the models package.
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+dates = st.dates(min_value=dt.date(2000, 1, 1), max_value=dt.date(2100, 12, 31))
+calves = st.lists(
+    st.tuples(dates, st.booleans(), st.sampled_from(CALF_TYPES)), max_size=30
+)
+
+
+def get_planned_dates(calf_list, actual=None):
+    return calculate_schedule(
+        np.array([birthday for birthday, _, _ in calf_list], dtype="datetime64[D]"),
+        np.array([dehorning_required for _, dehorning_required, _ in calf_list]),
+        np.array([CALF_TYPES.index(calf_type) for _, _, calf_type in calf_list]),
+        actual,
+    )
+
+
+class TestSchedule:
+    @given(calves)
+    def test_same_as_new_calves(self, calf_list):
+        planned = get_planned_dates(calf_list)
+
+        herd = [
+            calf_type(birthday, Gender.Male, ear_tag, dehorning_required)
+            for ear_tag, (birthday, dehorning_required, calf_type) in enumerate(
+                calf_list
+            )
+        ]
+        expected = np.full_like(planned, np.datetime64("NaT", "D"))
+        for row, calf in enumerate(herd):
+            for treatment in [calf.birth] + calf.treatments:
+                if treatment is not None:
+                    expected[row, FarmFrame.column(type(treatment))] = (
+                        treatment.expected_date
+                    )
+
+        assert np.array_equal(planned, expected, equal_nan=True)
+
+    @given(
+        calves.flatmap(
+            lambda calf_list: st.tuples(
+                st.just(calf_list),
+                st.lists(
+                    st.lists(
+                        st.none() | st.integers(min_value=-3, max_value=10),
+                        min_size=len(TREATMENTS),
+                        max_size=len(TREATMENTS),
+                    ),
+                    min_size=len(calf_list),
+                    max_size=len(calf_list),
+                ),
+            )
+        )
+    )
+    def test_same_as_done_treatments(self, data):
+        calf_list, delays = data
+
+        expected = []
+        actual = []
+        for (birthday, dehorning_required, calf_type), calf_delays in zip(
+            calf_list, delays
+        ):
+            # Create the treatments one after the other,
+            # each one done a few days after it was planned
+            done = {}
+
+            def create(treatment):
+                delay = calf_delays[TREATMENTS.index(type(treatment))]
+                if delay is not None:
+                    treatment.update(
+                        treatment.expected_date + dt.timedelta(days=delay)
+                    )
+                done[type(treatment)] = treatment
+                return treatment
+
+            birth = create(Birth(birthday))
+            bovalto1 = create(Bovalto1(birth))
+            dehorn = create(Dehorn(bovalto1)) if dehorning_required else None
+            create(Restall(dehorn or bovalto1))
+            if calf_type is FatteningCalf:
+                create(Sell(birth))
+            else:
+                ringworm1 = create(Ringworm1(create(Bovalto2(bovalto1))))
+                create(Ringworm2(ringworm1))
+
+            expected.append(
+                [
+                    done[treatment].expected_date if treatment in done else None
+                    for treatment in TREATMENTS
+                ]
+            )
+            actual.append(
+                [
+                    done[treatment].actual_date if treatment in done else None
+                    for treatment in TREATMENTS
+                ]
+            )
+
+        planned = get_planned_dates(
+            calf_list,
+            np.array(actual, dtype="datetime64[D]").reshape(-1, len(TREATMENTS)),
+        )
+        expected = np.array(expected, dtype="datetime64[D]").reshape(
+            -1, len(TREATMENTS)
+        )
+        assert np.array_equal(planned, expected, equal_nan=True)
+
+    def test_calf_types(self):
+        planned = get_planned_dates(
+            [
+                (dt.date(2023, 11, 15), True, FatteningCalf),
+                (dt.date(2023, 11, 15), False, BreedingCalf),
+            ]
+        )
+        assert planned[0].tolist() == [
+            dt.date(2023, 11, 15),
+            dt.date(2023, 11, 27),
+            dt.date(2023, 12, 4),
+            dt.date(2023, 12, 11),
+            dt.date(2023, 12, 19),
+            None,
+            None,
+            None,
+        ]
+        assert planned[1].tolist() == [
+            dt.date(2023, 11, 15),
+            dt.date(2023, 11, 27),
+            None,
+            dt.date(2023, 12, 4),
+            None,
+            dt.date(2023, 12, 18),
+            dt.date(2023, 12, 25),
+            dt.date(2024, 1, 8),
+        ]
@@ -285,3 +285,79 @@ class TestTreatmentOperations:
             Birth(dt.date(2023, 11, 23)),
             Birth(dt.date(2023, 11, 24)),
         ]
+
+
+class TestTreatmentChanges:
+    def test_new_treatment_is_dirty(self, setup_bovalto1):
+        assert setup_bovalto1.is_dirty
+
+        setup_bovalto1.mark_clean()
+        assert not setup_bovalto1.is_dirty
+
+    def test_update(self, setup_bovalto1):
+        setup_bovalto1.mark_clean()
+
+        setup_bovalto1.update(setup_bovalto1.actual_date)
+        assert not setup_bovalto1.is_dirty
+
+        setup_bovalto1.update(dt.date(2023, 12, 1))
+        assert setup_bovalto1.is_dirty
+
+    def test_reset(self, setup_bovalto1):
+        setup_bovalto1.mark_clean()
+
+        setup_bovalto1.reset(dt.date(2023, 11, 30), None)
+        assert not setup_bovalto1.is_dirty
+
+        setup_bovalto1.reset(dt.date(2023, 11, 30), dt.date(2023, 12, 1))
+        assert setup_bovalto1.is_dirty
+
+    def test_has_same_dates(self, setup_birth, setup_bovalto1):
+        assert setup_bovalto1.has_same_dates(Bovalto1(setup_birth))
+        assert not setup_bovalto1.has_same_dates(None)
+        assert not setup_bovalto1.has_same_dates(Dehorn(setup_birth))
+
+        setup_bovalto1.update(setup_bovalto1.expected_date)
+        assert not setup_bovalto1.has_same_dates(Bovalto1(setup_birth))
+
+    def test_recalculate(self, setup_birth, setup_sell):
+        setup_sell.update(dt.date(2023, 12, 20))
+        setup_sell.mark_clean()
+
+        # The actual date is cleared, the expected date is still the next Tuesday
+        assert setup_sell.recalculate(setup_birth)
+        assert setup_sell.expected_date == dt.date(2023, 12, 19)
+        assert setup_sell.actual_date is None
+        assert setup_sell.is_dirty
+
+        setup_sell.mark_clean()
+        assert not setup_sell.recalculate(setup_birth)
+        assert not setup_sell.is_dirty
+
+
+class TestTreatmentGraph:
+    def test_order(self):
+        assert TREATMENT_ORDER == [
+            Birth,
+            Bovalto1,
+            Dehorn,
+            Restall,
+            Sell,
+            Bovalto2,
+            Ringworm1,
+            Ringworm2,
+        ]
+
+    def test_dependents(self):
+        assert DEPENDENT_TREATMENTS[Birth] == TREATMENT_ORDER[1:]
+        assert DEPENDENT_TREATMENTS[Bovalto1] == [
+            Dehorn,
+            Restall,
+            Bovalto2,
+            Ringworm1,
+            Ringworm2,
+        ]
+        assert DEPENDENT_TREATMENTS[Dehorn] == [Restall]
+        assert DEPENDENT_TREATMENTS[Bovalto2] == [Ringworm1, Ringworm2]
+        assert DEPENDENT_TREATMENTS[Restall] == []
+        assert DEPENDENT_TREATMENTS[Sell] == []
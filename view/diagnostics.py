@@ -0,0 +1,65 @@
+import os
+import sys
+
+# This code snippet does the following:
+#     1. It adjusts the Python path to include the parent directory
+#        (which contains models and other packages).
+#        This allows Python to locate and import modules from these directories.
+#     2. Then, it imports the necessary modules from the models package.
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from data.query_stats import QueryStats, set_thread_query_stats
+
+import streamlit as st
+
+
+def show_diagnostics():
+    """
+    Shows the time spent in the database in the sidebar.
+
+    The stats are only recorded for the session in which they are turned on, from that run on, and
+    kept in its session state. They are shown at the start of a run, so they contain the queries of
+    the earlier runs.
+    :return: None
+    """
+    with st.sidebar.expander("Diagnostics"):
+        if not st.checkbox("Record database queries", key="record_query_stats"):
+            st.session_state.pop("query_stats", None)
+            set_thread_query_stats(None)
+            return
+
+        stats = st.session_state.setdefault("query_stats", QueryStats())
+        set_thread_query_stats(stats)
+        summary = stats.summary()
+        st.write(
+            f"{summary.total_queries} queries in {summary.total_seconds * 1e3:.1f} ms"
+        )
+
+        st.dataframe(
+            [
+                {
+                    "Method": method.name,
+                    "Calls": method.calls,
+                    "Total (ms)": round(method.total_seconds * 1e3, 2),
+                }
+                for method in summary.methods
+            ],
+            hide_index=True,
+        )
+        st.dataframe(
+            [
+                {
+                    "Statement": statement.sql,
+                    "Calls": statement.calls,
+                    "Rows": statement.rows,
+                    "Total (ms)": round(statement.total_seconds * 1e3, 2),
+                    "Mean (ms)": round(statement.mean_seconds * 1e3, 2),
+                    "Max (ms)": round(statement.max_seconds * 1e3, 2),
+                }
+                for statement in summary.statements
+            ],
+            hide_index=True,
+        )
+
+        if st.button("Reset"):
+            stats.reset()
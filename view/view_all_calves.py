@@ -25,6 +25,9 @@ from data.db_handler import DatabaseHandler
 
 import streamlit as st
 import datetime as dt
+import logging
+
+logger = logging.getLogger("view.all_calves")
 
 COLUMN_TO_TREATMENT = {
     "0": None,  # Delete
@@ -138,7 +141,7 @@ def view_all_calves(farm: Farm) -> Farm | None:
     st.write(st.session_state["st_edited_calf_data"])
 
     st_edited_rows = st.session_state["st_edited_calf_data"]["edited_rows"]
-    print(f"st_edited_rows: {st_edited_rows}")
+    logger.debug("st_edited_rows: %s", st_edited_rows)
     delete_rows = []
     edited_rows = []
 
@@ -180,8 +183,8 @@ def view_all_calves(farm: Farm) -> Farm | None:
                         continue
                     edited_rows.append(row_number)
 
-    print(f"delete_rows: {delete_rows}")
-    print(f"edited_rows: {edited_rows}")
+    logger.debug("delete_rows: %s", delete_rows)
+    logger.debug("edited_rows: %s", edited_rows)
 
     if len(delete_rows) > 0 or len(edited_rows) > 0:
         if st.button("Submit"):
@@ -193,7 +196,7 @@ def view_all_calves(farm: Farm) -> Farm | None:
                     ear_tag = displayed_data[row][1]
                     delete_ear_tags.append(ear_tag)
 
-                print(f"Delete calves: {delete_ear_tags}")
+                logger.debug("Delete calves: %s", delete_ear_tags)
                 farm.delete_calves(delete_ear_tags)
 
             if len(edited_rows) > 0:
@@ -211,10 +214,10 @@ def view_all_calves(farm: Farm) -> Farm | None:
                     if "0" in edited_cells:
                         del edited_cells["0"]
 
-                    print(f"Edit calf: {ear_tag} - {edited_cells}")
+                    logger.debug("Edit calf: %s - %s", ear_tag, edited_cells)
                     for key, value in edited_cells.items():
                         calf = farm.get_calf(ear_tag)
-                        print(f"Edit calf: {ear_tag} - {key} - {value}")
+                        logger.debug("Edit calf: %s - %s - %s", ear_tag, key, value)
 
                         # TODO: Check if I can use a match statement here
                         #       It might be a problem that we need to edit the calf in a certain order
@@ -222,7 +225,7 @@ def view_all_calves(farm: Farm) -> Farm | None:
                             # Calf type changed
                             # We need to delete the calf and add it again with the new type
                             # This needs to be done first, because we need to retrieve the old calf
-                            print(f"Delete calf: {farm.get_calf(ear_tag)}")
+                            logger.debug("Delete calf: %s", farm.get_calf(ear_tag))
                             # Before we delete the calf, we need to retrieve all available treatments
                             farm.delete_calf(ear_tag, set_ringworm=False)
                             if value == "breeding":
@@ -249,12 +252,13 @@ def view_all_calves(farm: Farm) -> Farm | None:
                             new_calf.dehorn = calf.dehorn
                             new_calf.restall = calf.restall
 
-                            print(f"Add calf: {new_calf}")
+                            logger.debug("Add calf: %s", new_calf)
                             farm.add_calf(new_calf)
 
                         elif key == "1":
                             # Ear tag changes
-                            calf.change_ear_tag(value)
+                            farm.change_ear_tag(ear_tag, value)
+                            ear_tag = value
 
                         elif key == "3":
                             date = dt.datetime.strptime(value, "%Y-%m-%d").date()
@@ -331,9 +335,13 @@ def view_all_calves(farm: Farm) -> Farm | None:
                                 # A fattening calf does not have a ringworm
                                 continue
 
-                        print(f"Edited calf: {calf}")
+                        logger.debug("Edited calf: %s", calf)
+
+                    # The calf was edited directly, so the jobs of the farm are updated.
+                    # The ringworm treatments are kept as entered.
+                    farm.refresh_calf(ear_tag, set_ringworm=False)
 
-            print(f"New farm: {farm}")
+            logger.debug("New farm: %s", farm)
             return (
                 farm,
                 None if len(delete_ear_tags) == 0 else delete_ear_tags,